@@ -0,0 +1,158 @@
+"""
+Bulk analysis of EPD and PGN files.
+
+Positions are read lazily from the input (every line of an EPD file, or
+every position of every game in a PGN file), searched across a pool of
+worker processes a batch at a time and written out as JSON lines as soon as
+each batch is done, so memory use does not grow with the size of the input.
+
+    python src/analyze.py positions.epd --depth 5 --workers 4 --output out.jsonl
+    python src/analyze.py games.pgn --movetime 200 --min-ply 10
+
+For EPD lines with a "bm" (best move) operation the output records whether
+the engine found it, so tactical test suites can be scored.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import sys
+import time
+
+from engine import BACKENDS, MAX_PLY, Search
+from notation import read_pgn, parse_movetext, parse_epd, san_line, san_to_move
+from position import Position, START_FEN, WHITE, move_to_uci
+from transposition import TranspositionTable
+
+# Positions handed to each worker per batch
+BATCH_PER_WORKER = 16
+
+def epd_positions(lines):
+    """Yields (id, fen, operations) for each EPD line."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if line and not line.startswith("#"):
+            fen, operations = parse_epd(line)
+            yield operations.get("id", str(number)), fen, operations
+
+def pgn_positions(lines, min_ply=0):
+    """Yields ('game:ply', fen, {}) for every position of every game from min_ply on."""
+    for number, (headers, movetext) in enumerate(read_pgn(lines), 1):
+        pos = Position.from_fen(headers.get("FEN", START_FEN))
+        try:
+            moves = parse_movetext(pos, movetext)
+        except ValueError as e:
+            print(f"Game {number}: {e}", file=sys.stderr)
+            continue
+        for ply, move in enumerate(moves + [None]):
+            if ply >= min_ply and pos.legal_moves():
+                yield f"{number}:{ply}", pos.to_fen(), {}
+            if move is not None:
+                pos.make_move(move)
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+def _init_worker(options):
+    _worker["options"] = options
+    _worker["tt"] = TranspositionTable(options["tt_size_mb"])
+
+def analyze_position(task):
+    position_id, fen, operations = task
+    options = _worker["options"]
+    pos = BACKENDS[options["backend"]].from_fen(fen)
+    search = Search(_worker["tt"], options["time_ms"], options["nodes"],
+                    ordering=options["ordering"], quiescence=options["quiescence"])
+    last = {}
+    search.info = last.update
+    started = time.perf_counter()
+    score, move = search.iterate(pos, options["depth"])
+    elapsed = time.perf_counter() - started
+    result = {"id": position_id, "fen": fen}
+    if move is None:
+        result["bestmove"] = None
+        return result
+    pv = last.get("pv", [move])
+    result.update(
+        depth=last.get("depth", 0),
+        # Reported from the side to move's point of view, as in UCI
+        score=score if pos.side == WHITE else -score,
+        bestmove=move_to_uci(move),
+        san=san_line(pos, [move])[0],
+        pv=san_line(pos, pv),
+        nodes=search.nodes,
+        ms=int(elapsed * 1000),
+    )
+    if "bm" in operations:
+        best = []
+        legal = pos.legal_moves()
+        for san in operations["bm"].split():
+            try:
+                best.append(san_to_move(pos, san, legal))
+            except ValueError:
+                pass
+        result["solved"] = move in best
+    return result
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+def analyze(positions, options, workers, out):
+    """
+    Searches each (id, fen, operations) from positions and writes one JSON
+    line per position to out. Returns (positions, nodes, seconds, solved, tried).
+    """
+    count = nodes = solved = tried = 0
+    started = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        for batch in _batches(positions, workers * BATCH_PER_WORKER):
+            for result in pool.imap(analyze_position, batch):
+                out.write(json.dumps(result) + "\n")
+                count += 1
+                nodes += result.get("nodes", 0)
+                if "solved" in result:
+                    tried += 1
+                    solved += result["solved"]
+            out.flush()
+            print(f"\rAnalyzed {count} positions", end="", file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return count, nodes, time.perf_counter() - started, solved, tried
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze every position in an EPD or PGN file")
+    parser.add_argument("input", help=".epd or .pgn file")
+    parser.add_argument("--format", choices=("epd", "pgn"), help="default: from the file extension")
+    parser.add_argument("--output", help="JSON lines output (default: stdout)")
+    parser.add_argument("--depth", type=int)
+    parser.add_argument("--movetime", type=int, help="ms per position")
+    parser.add_argument("--nodes", type=int, help="nodes per position")
+    parser.add_argument("--min-ply", type=int, default=0, help="PGN: skip the opening plies")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mailbox")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table MB per worker")
+    args = parser.parse_args()
+    if not (args.depth or args.movetime or args.nodes):
+        parser.error("give --depth, --movetime or --nodes")
+
+    options = {"depth": args.depth or MAX_PLY, "time_ms": args.movetime, "nodes": args.nodes,
+               "backend": args.backend, "tt_size_mb": args.hash,
+               "ordering": True, "quiescence": True}
+    file_format = args.format or ("pgn" if args.input.lower().endswith(".pgn") else "epd")
+    out = open(args.output, "w") if args.output else sys.stdout
+    with open(args.input) as f:
+        positions = epd_positions(f) if file_format == "epd" else pgn_positions(f, args.min_ply)
+        count, nodes, seconds, solved, tried = analyze(positions, options, args.workers, out)
+    if out is not sys.stdout:
+        out.close()
+    summary = f"{count} positions, {nodes} nodes in {seconds:.1f}s ({int(nodes / max(seconds, 1e-9))} nps)"
+    if tried:
+        summary += f", best move found in {solved}/{tried}"
+    print(summary, file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Batch evaluation with NumPy, for scoring large position sets offline and
+for Texel tuning of the material values in evaluation.py.
+
+Positions are packed into an (N, 64) int8 array of position.py piece codes,
+one row per position in position.py square order, and evaluate() computes
+the same tapered piece-square score as evaluation.evaluate_full for all of
+them with a handful of array operations.
+
+Datasets for tuning are flat files of RECORD rows (the 64 piece codes and
+the game result from white's point of view: 1, 0.5 or 0), 68 bytes per
+position. They are written a chunk at a time and read back with np.memmap,
+so millions of positions never need to fit in memory as Python objects.
+
+    python src/batch_eval.py build games.pgn --output positions.dat --min-ply 8
+    python src/batch_eval.py build quiet-labeled.epd --output positions.dat
+    python src/batch_eval.py check positions.dat --limit 100000
+    python src/batch_eval.py tune positions.dat --epochs 500
+
+EPD input takes the result from a c9 operation ('c9 "1-0";'). Positions with
+the side to move in check are left out, as they are rarely quiet. Needs
+NumPy (pip install -r requirements-tuning.txt); the game itself does not
+import this module.
+"""
+import argparse
+import math
+import sys
+import time
+
+import numpy as np
+
+import evaluation
+from evaluation import MAX_PHASE
+from notation import read_pgn, parse_movetext, parse_epd
+from position import Position, CHAR_TO_PIECE, START_FEN
+
+# One dataset row: piece codes by square, then the result for white
+RECORD = np.dtype([("board", np.int8, 64), ("result", np.float32)])
+
+# Rows written or processed at a time
+CHUNK = 65536
+
+# Game results as scores for white
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+
+# The middlegame, endgame and phase terms of each (square, piece code) packed
+# into one int64, (mg << 42) + (eg << 21) + phase, so a single gather and sum
+# over the 64 squares gives all three. The sums stay far inside 21 bits.
+FIELD = 1 << 21
+PACKED_TABLE = ((np.array(evaluation.MG_TABLE, dtype=np.int64) * FIELD
+                 + evaluation.EG_TABLE) * FIELD
+                + np.array(evaluation.PHASE_TABLE)[:, None]).T.ravel()
+# Added to a row of piece codes to index PACKED_TABLE
+SQUARE_OFFSETS = np.arange(64) * len(evaluation.MG_TABLE)
+
+# Piece types whose material values are tuned (pawn .. queen)
+TUNED_TYPES = range(1, 6)
+
+def board_bytes(item):
+    """64 piece codes for a Position, a FEN string or a list-of-lists board."""
+    if isinstance(item, str):
+        return bytes(Position.from_fen(item).board)
+    if isinstance(item, list):
+        return bytes(CHAR_TO_PIECE.get(piece, 0) for row in item for piece in row)
+    return bytes(item.board)
+
+def pack(positions):
+    """(N, 64) int8 array for an iterable of positions (see board_bytes)."""
+    data = b"".join(board_bytes(item) for item in positions)
+    return np.frombuffer(data, dtype=np.int8).reshape(-1, 64)
+
+def terms(boards):
+    """(mg, eg, phase) arrays for an (N, 64) array, like evaluation.compute_terms."""
+    total = np.take(PACKED_TABLE, boards + SQUARE_OFFSETS).sum(axis=1)
+    phase = total % FIELD
+    total //= FIELD
+    eg = (total + FIELD // 2) % FIELD - FIELD // 2
+    mg = (total - eg) // FIELD
+    return mg, eg, np.minimum(phase, MAX_PHASE)
+
+def evaluate(boards):
+    """Scores in centipawns from white's point of view, equal to evaluation.evaluate_full."""
+    mg, eg, phase = terms(boards)
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+def evaluate_all(boards):
+    """evaluate() over a large (e.g. memory-mapped) array, CHUNK rows at a time."""
+    return np.concatenate([np.empty(0, dtype=np.int64)]
+                          + [evaluate(boards[i:i + CHUNK]) for i in range(0, len(boards), CHUNK)])
+
+# -----------------------------------------------------------------------------
+# Datasets
+# -----------------------------------------------------------------------------
+
+def pgn_samples(lines, min_ply=0):
+    """Yields (board bytes, result) for the positions of every finished game."""
+    for number, (headers, movetext) in enumerate(read_pgn(lines), 1):
+        result = RESULTS.get(headers.get("Result"))
+        if result is None:
+            continue
+        pos = Position.from_fen(headers.get("FEN", START_FEN))
+        try:
+            moves = parse_movetext(pos, movetext)
+        except ValueError as e:
+            print(f"Game {number}: {e}", file=sys.stderr)
+            continue
+        for ply, move in enumerate(moves):
+            if ply >= min_ply and not pos.in_check():
+                yield bytes(pos.board), result
+            pos.make_move(move)
+
+def epd_samples(lines):
+    """Yields (board bytes, result) for EPD lines with a c9 result."""
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fen, operations = parse_epd(line)
+        result = RESULTS.get(operations.get("c9"))
+        if result is None:
+            continue
+        pos = Position.from_fen(fen)
+        if not pos.in_check():
+            yield bytes(pos.board), result
+
+def write_dataset(samples, path):
+    """Writes (board bytes, result) samples to path as RECORD rows; returns the count."""
+    count = 0
+    with open(path, "wb") as f:
+        while True:
+            chunk = [sample for _, sample in zip(range(CHUNK), samples)]
+            if not chunk:
+                break
+            rows = np.empty(len(chunk), dtype=RECORD)
+            rows["board"] = np.frombuffer(b"".join(board for board, _ in chunk),
+                                          dtype=np.int8).reshape(-1, 64)
+            rows["result"] = [result for _, result in chunk]
+            rows.tofile(f)
+            count += len(chunk)
+    return count
+
+def load_dataset(path):
+    """The RECORD rows of a dataset file, memory-mapped read-only."""
+    return np.memmap(path, dtype=RECORD, mode="r")
+
+# -----------------------------------------------------------------------------
+# Texel tuning
+# -----------------------------------------------------------------------------
+
+def features(boards):
+    """
+    Splits the score into the tuned material and the rest. Returns
+    (counts, mg_rest, eg_rest, phase): counts[:, i] is white minus black
+    pieces of type TUNED_TYPES[i], the rest is everything else (piece-square
+    bonuses and untuned material).
+    """
+    mg, eg, phase = terms(boards)
+    codes = boards.astype(np.intp)
+    counts = np.stack([(codes == kind).sum(axis=1) - (codes == kind | 8).sum(axis=1)
+                       for kind in TUNED_TYPES], axis=1)
+    mg_values = np.array([evaluation.MG_VALUES[kind] for kind in TUNED_TYPES])
+    eg_values = np.array([evaluation.EG_VALUES[kind] for kind in TUNED_TYPES])
+    return counts, mg - counts @ mg_values, eg - counts @ eg_values, phase
+
+def win_probability(scores, k):
+    """Texel's expected result for a white-relative centipawn score."""
+    return 1 / (1 + np.power(10.0, -k * scores / 400))
+
+def texel_error(scores, results, k):
+    return float(np.mean((results - win_probability(scores, k)) ** 2))
+
+def fit_scale(scores, results, low=0.05, high=5.0, steps=60):
+    """The K that best maps the current scores to the results (ternary search)."""
+    for _ in range(steps):
+        a, b = low + (high - low) / 3, high - (high - low) / 3
+        if texel_error(scores, results, a) < texel_error(scores, results, b):
+            high = b
+        else:
+            low = a
+    return (low + high) / 2
+
+class TexelTuner:
+    """
+    Fits the middlegame and endgame values of pawn .. queen to game results
+    by gradient descent (Adam) on Texel's mean squared error. The score is
+    linear in those values for a fixed position, so each step is two matrix
+    products over the whole dataset.
+    """
+
+    def __init__(self, dataset):
+        parts = [features(dataset["board"][i:i + CHUNK]) for i in range(0, len(dataset), CHUNK)]
+        counts, mg_rest, eg_rest, phase = (np.concatenate(column) for column in zip(*parts))
+        mg_weight = phase / MAX_PHASE
+        eg_weight = 1 - mg_weight
+        # score = design @ values + offset, values = MG values then EG values
+        self.design = np.hstack([counts * mg_weight[:, None], counts * eg_weight[:, None]])
+        self.offset = mg_rest * mg_weight + eg_rest * eg_weight
+        self.results = np.asarray(dataset["result"], dtype=np.float64)
+        self.values = np.array([evaluation.MG_VALUES[kind] for kind in TUNED_TYPES]
+                               + [evaluation.EG_VALUES[kind] for kind in TUNED_TYPES],
+                               dtype=np.float64)
+        self.k = fit_scale(self.scores(), self.results)
+
+    def scores(self, values=None):
+        return self.design @ (self.values if values is None else values) + self.offset
+
+    def error(self):
+        return texel_error(self.scores(), self.results, self.k)
+
+    def tune(self, epochs=500, rate=1.0, on_epoch=None):
+        """Runs epochs of Adam; on_epoch(epoch, error) is called every 50 epochs."""
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+        moment = np.zeros_like(self.values)
+        velocity = np.zeros_like(self.values)
+        scale = math.log(10) * self.k / 400
+        for epoch in range(1, epochs + 1):
+            p = win_probability(self.scores(), self.k)
+            slope = 2 * (p - self.results) * p * (1 - p) * scale
+            grad = self.design.T @ slope / len(self.results)
+            moment = beta1 * moment + (1 - beta1) * grad
+            velocity = beta2 * velocity + (1 - beta2) * grad * grad
+            step = (moment / (1 - beta1 ** epoch)) / (np.sqrt(velocity / (1 - beta2 ** epoch)) + eps)
+            self.values -= rate * step
+            if on_epoch is not None and epoch % 50 == 0:
+                on_epoch(epoch, self.error())
+        return self.tables()
+
+    def tables(self):
+        """(MG_VALUES, EG_VALUES) tuples in evaluation.py layout, king and empty at 0."""
+        n = len(TUNED_TYPES)
+        mg = tuple([0] + [int(round(v)) for v in self.values[:n]] + [0])
+        eg = tuple([0] + [int(round(v)) for v in self.values[n:]] + [0])
+        return mg, eg
+
+# -----------------------------------------------------------------------------
+# Command line
+# -----------------------------------------------------------------------------
+
+def check(dataset, limit=None):
+    """Compares evaluate() with evaluation.evaluate_full and times both."""
+    boards = dataset["board"][:limit]
+    started = time.perf_counter()
+    fast = evaluate_all(boards)
+    batch_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    slow = [evaluation.taper(*evaluation.compute_terms(row.tobytes())) for row in boards]
+    loop_seconds = time.perf_counter() - started
+    mismatches = int(np.count_nonzero(fast != np.array(slow)))
+    print(f"{len(boards)} positions, {mismatches} mismatches")
+    print(f"batch {len(boards) / max(batch_seconds, 1e-9):,.0f} positions/s, "
+          f"per position {len(boards) / max(loop_seconds, 1e-9):,.0f} positions/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch evaluation and Texel tuning")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    build = sub.add_parser("build", help="write a dataset from a PGN or EPD file")
+    build.add_argument("input", help=".pgn or .epd file")
+    build.add_argument("--format", choices=("epd", "pgn"), help="default: from the file extension")
+    build.add_argument("--output", required=True)
+    build.add_argument("--min-ply", type=int, default=0, help="PGN: skip the opening plies")
+    check_mode = sub.add_parser("check", help="check and time evaluate() on a dataset")
+    check_mode.add_argument("dataset")
+    check_mode.add_argument("--limit", type=int)
+    tune = sub.add_parser("tune", help="Texel-tune the material values on a dataset")
+    tune.add_argument("dataset")
+    tune.add_argument("--epochs", type=int, default=500)
+    tune.add_argument("--rate", type=float, default=1.0, help="Adam step size in centipawns")
+    args = parser.parse_args()
+
+    if args.mode == "build":
+        file_format = args.format or ("pgn" if args.input.lower().endswith(".pgn") else "epd")
+        started = time.perf_counter()
+        with open(args.input) as f:
+            samples = pgn_samples(f, args.min_ply) if file_format == "pgn" else epd_samples(f)
+            count = write_dataset(samples, args.output)
+        print(f"{count} positions written to {args.output} in {time.perf_counter() - started:.1f}s")
+    elif args.mode == "check":
+        check(load_dataset(args.dataset), args.limit)
+    else:
+        started = time.perf_counter()
+        tuner = TexelTuner(load_dataset(args.dataset))
+        print(f"{len(tuner.results)} positions, K {tuner.k:.3f}, error {tuner.error():.6f}")
+        mg, eg = tuner.tune(args.epochs, args.rate,
+                            lambda epoch, error: print(f"epoch {epoch}: error {error:.6f}"))
+        print(f"Tuned in {time.perf_counter() - started:.1f}s")
+        print(f"MG_VALUES = {mg}")
+        print(f"EG_VALUES = {eg}")
+
+if __name__ == "__main__":
+    main()
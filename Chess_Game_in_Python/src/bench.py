@@ -0,0 +1,187 @@
+"""
+Bench: a fixed, deterministic search workload for tracking engine speed and
+catching unintended changes to the search.
+
+Every position of BENCH_POSITIONS is searched to the same depth with a
+fresh transposition table and no time limit, so the total node count
+depends only on the code. It is printed as the bench signature: a change
+that alters it changes what the engine searches, while a pure speed-up
+keeps it and only moves the time and nps.
+
+    python src/bench.py                                  # depth 5
+    python src/bench.py --depth 6 --runs 3 --json bench.json
+    python src/bench.py --compare base.json              # run, compare with base.json
+    python src/bench.py --compare base.json new.json --threshold 3
+
+With --compare the exit status is non-zero if nps dropped by more than
+--threshold percent; a different signature is reported but is not a
+failure, since many intended changes alter it. To compare two commits,
+write --json on each and compare the files.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from engine import BACKENDS, SELECTIVITY, Search
+from position import move_to_uci
+from transposition import TranspositionTable
+
+# Openings and middlegames, then endgames; all with a legal move to make
+BENCH_POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 10",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 11",
+    "4rrk1/pp1n3p/3q2pQ/2p1pb2/2PP4/2P3N1/P2B2PP/4RRK1 b - - 7 19",
+    "rq3rk1/ppp2ppp/1bnpb3/3N2B1/3NP3/7P/PPPQ1PP1/2KR3R w - - 7 14",
+    "r1bq1r1k/1pp1n1pp/1p1p4/4p2Q/4Pp2/1BNP4/PPP2PPP/3R1RK1 w - - 2 14",
+    "r3r1k1/2p2ppp/p1p1bn2/8/1q2P3/2NPQN2/PPP3PP/R4RK1 b - - 2 15",
+    "r1bbk1nr/pp3p1p/2n5/1N4p1/2Np1B2/8/PPP2PPP/2KR1B1R w kq - 0 13",
+    "r1bq1rk1/ppp1nppp/4n3/3p3Q/3P4/1BP1B3/PP1N2PP/R4RK1 w - - 1 16",
+    "4r1k1/r1q2ppp/ppp2n2/4P3/5Rb1/1N1BQ3/PPP3PP/R5K1 w - - 1 17",
+    "2rqkb1r/ppp2p2/2npb1p1/1N1Nn2p/2P1PP2/8/PP2B1PP/R1BQK2R b KQ - 0 11",
+    "r1bq1r1k/b1p1npp1/p2p3p/1p6/3PP3/1B2NN2/PP3PPP/R2Q1RK1 w - - 1 16",
+    "3r1rk1/p5pp/bpp1pp2/8/q1PP1P2/b3P3/P2NQRPP/1R2B1K1 b - - 6 22",
+    "r1q2rk1/2p1bppp/2Pp4/p6b/Q1PNp3/4B3/PP1R1PPP/2K4R w - - 2 18",
+    "4k2r/1pb2ppp/1p2p3/1R1p4/3P4/2r1PN2/P4PPP/1R4K1 b - - 3 22",
+    "3q2k1/pb3p1p/4pbp1/2r5/PpN2N2/1P2P2P/5PP1/Q2R2K1 b - - 4 26",
+    "6k1/6p1/6Pp/ppp5/3pn2P/1P3K2/1PP2P2/3N4 b - - 0 1",
+    "3b4/5kp1/1p1p1p1p/pP1PpP1P/P1P1P3/3KN3/8/8 w - - 0 1",
+    "2K5/p7/7P/5pR1/8/5k2/r7/8 w - - 0 1",
+    "8/6pk/1p6/8/PP3p1p/5P2/4KP1q/3Q4 w - - 0 1",
+    "7k/3p2pp/4q3/8/4Q3/5Kp1/P6b/8 w - - 0 1",
+    "8/2p5/8/2kPKp1p/2p4P/2P5/3P4/8 w - - 0 1",
+    "8/1p3pp1/7p/5P1P/2k3P1/8/2K2P2/8 w - - 0 1",
+    "8/pp2r1k1/2p1p3/3pP2p/1P1P1P1P/P5KR/8/8 w - - 0 1",
+    "8/3p4/p1bk3p/Pp6/1Kp1PpPp/2P2P1P/2P5/5B2 b - - 0 1",
+    "5k2/7R/4P2p/5K2/p1r2P1p/8/8/8 b - - 0 1",
+    "6k1/6p1/P6p/r1N5/5p2/7P/1b3PP1/4R1K1 w - - 0 1",
+    "1r3k2/4q3/2Pp3b/3Bp3/2Q2p2/1p1P2P1/1P2KP2/3N4 w - - 0 1",
+    "6k1/4pp1p/3p2p1/P1pPb3/R7/1r2P1PP/3B1P2/6K1 w - - 0 1",
+    "8/3p3B/5p2/5P2/p7/PP5b/k7/6K1 w - - 0 1",
+    "5rk1/q6p/2p3bR/1pPp1rP1/1P1Pp3/P3B1Q1/1K3P2/R7 w - - 93 90",
+    "4rrk1/1p1nq3/p7/2p1P1pp/3P2bp/3Q1Bn1/PPPB4/1K2R1NR w - - 40 21",
+    "r3k2r/3nnpbp/q2pp1p1/p7/Pp1PPPP1/4BNN1/1P5P/R2Q1RK1 w kq - 0 16",
+    "3Qb1k1/1r2ppb1/pN1n2q1/Pp1Pp1Pr/4P2p/4BP2/4B1R1/1R5K b - - 11 40",
+    "4k3/3q1r2/1N2r1b1/3ppN2/2nPP3/1B1R2n1/2R1Q3/3K4 w - - 5 1",
+    "8/8/8/8/5kp1/P7/8/1K1N4 w - - 0 1",
+    "8/8/8/5N2/8/p7/8/2NK3k w - - 0 1",
+    "8/3k4/8/8/8/4B3/4KB2/2B5 w - - 0 1",
+    "8/8/1P6/5pr1/8/4R3/7k/2K5 w - - 0 1",
+    "8/2p4P/8/kr6/6R1/8/8/1K6 w - - 0 1",
+    "8/8/3P3k/8/1p6/8/1P6/1K3n2 b - - 0 1",
+    "8/R7/2q5/8/6k1/8/1P5p/K6R w - - 0 124",
+]
+
+DEFAULT_DEPTH = 5
+
+def bench_position(fen, depth, backend="mailbox", tt_size_mb=16):
+    """Searches one position; returns {fen, nodes, seconds, nps, move}."""
+    pos = BACKENDS[backend].from_fen(fen)
+    search = Search(TranspositionTable(tt_size_mb), **dict.fromkeys(SELECTIVITY, True))
+    started = time.perf_counter()
+    _, move = search.iterate(pos, depth)
+    seconds = time.perf_counter() - started
+    return {
+        "fen": fen,
+        "nodes": search.nodes,
+        "seconds": round(seconds, 4),
+        "nps": int(search.nodes / seconds) if seconds > 0 else 0,
+        "move": move_to_uci(move) if move is not None else None,
+    }
+
+def run_bench(depth=DEFAULT_DEPTH, backend="mailbox", tt_size_mb=16, runs=1):
+    """
+    Searches every bench position runs times and keeps the fastest time of
+    each. Raises RuntimeError if two runs disagree on a node count, which
+    means the search is not deterministic.
+    """
+    results = None
+    for _ in range(runs):
+        run = [bench_position(fen, depth, backend, tt_size_mb) for fen in BENCH_POSITIONS]
+        if results is None:
+            results = run
+            continue
+        for best, r in zip(results, run):
+            if r["nodes"] != best["nodes"]:
+                raise RuntimeError(f"Node count changed between runs: {r['fen']}")
+            if r["seconds"] < best["seconds"]:
+                best.update(seconds=r["seconds"], nps=r["nps"])
+    nodes = sum(r["nodes"] for r in results)
+    seconds = sum(r["seconds"] for r in results)
+    return {
+        "backend": backend,
+        "depth": depth,
+        "tt_size_mb": tt_size_mb,
+        "runs": runs,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "signature": nodes,
+        "total_seconds": round(seconds, 4),
+        "nps": int(nodes / seconds) if seconds > 0 else 0,
+        "results": results,
+    }
+
+def print_bench(summary):
+    print(f"{'#':>3} {'nodes':>9} {'seconds':>8} {'nps':>7} {'move':>6}")
+    for number, r in enumerate(summary["results"], 1):
+        print(f"{number:>3} {r['nodes']:>9} {r['seconds']:>8.3f} {r['nps']:>7} {r['move'] or '-':>6}")
+    print(f"\nSignature: {summary['signature']}")
+    print(f"Total time: {summary['total_seconds']:.2f}s")
+    print(f"Nodes/second: {summary['nps']}")
+
+def compare(base, new, threshold):
+    """Prints how new differs from base; returns True if nps fell by more than threshold %."""
+    for key in ("depth", "backend", "tt_size_mb"):
+        if base[key] != new[key]:
+            print(f"Warning: {key} differs ({base[key]} vs {new[key]}), the runs are not comparable")
+    if base["signature"] == new["signature"]:
+        print(f"Signature unchanged: {new['signature']}")
+    else:
+        print(f"Signature changed: {base['signature']} -> {new['signature']} "
+              f"(the search explores a different tree)")
+        changed = [number for number, (a, b) in enumerate(zip(base["results"], new["results"]), 1)
+                   if a["nodes"] != b["nodes"]]
+        print(f"Positions with different node counts: {' '.join(map(str, changed)) or 'none'}")
+    change = (new["nps"] - base["nps"]) / base["nps"] * 100 if base["nps"] else 0.0
+    print(f"Nodes/second: {base['nps']} -> {new['nps']} ({change:+.1f}%)")
+    regressed = change < -threshold
+    if regressed:
+        print(f"Speed regression: more than {threshold:g}% slower")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic search benchmark")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mailbox")
+    parser.add_argument("--hash", type=int, default=16, help="transposition table MB")
+    parser.add_argument("--runs", type=int, default=1, help="keep the fastest of this many runs")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="base results, and optionally new results instead of running now")
+    parser.add_argument("--threshold", type=float, default=5.0,
+                        help="compare: nps drop in percent that counts as a regression")
+    args = parser.parse_args()
+    if args.compare and len(args.compare) > 2:
+        parser.error("--compare takes one or two files")
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[1]) as f:
+            summary = json.load(f)
+    else:
+        summary = run_bench(args.depth, args.backend, args.hash, args.runs)
+        print_bench(summary)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(summary, f, indent=2)
+            print(f"Written to {args.json}")
+    if args.compare:
+        with open(args.compare[0]) as f:
+            base = json.load(f)
+        print()
+        return 1 if compare(base, summary, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,440 @@
+"""
+Bitboard move generation backend, kept for cross-checking the mailbox
+generator rather than for speed.
+
+BitboardPosition keeps the mailbox board from position.py (so make/unmake,
+castling, evaluation and the list-of-lists adapters are shared) and
+additionally keeps one 64-bit integer per piece code plus per-colour
+occupancy. Bit n corresponds to square n of the mailbox, i.e.
+``row * 8 + col`` with row 0 being rank 8.
+
+Every move updates both representations, and with Python integers and bit
+loops this backend runs at roughly half the speed of the mailbox one (see
+perft.py --backend). Its value is as an independent implementation of the
+move rules: compare_backends and perft check one generator against the
+other.
+
+Knight, king and pawn attacks come from precomputed tables. Sliding attacks
+use hyperbola quintessence on files and diagonals and a first-rank lookup
+table for ranks.
+"""
+import random
+
+from position import (
+    Position, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK,
+    KNIGHT_TARGETS, KING_TARGETS, PAWN_CAPTURES, QUEEN_RAYS, CASTLING_ROOKS,
+    E1, E8, WHITE_KINGSIDE, WHITE_QUEENSIDE, BLACK_KINGSIDE, BLACK_QUEENSIDE, PROMOTION_FLAGS,
+    make_piece,
+)
+
+FULL = 0xFFFFFFFFFFFFFFFF
+RANK_8 = 0xFF            # row 0
+RANK_1 = 0xFF << 56      # row 7
+RANK_2 = 0xFF << 48      # row 6, white pawns start here
+RANK_7 = 0xFF << 8       # row 1, black pawns start here
+FILE_A = 0x0101010101010101
+FILE_H = FILE_A << 7
+
+def _mask(squares):
+    bits = 0
+    for sq in squares:
+        bits |= 1 << sq
+    return bits
+
+def _flip(bits):
+    """Mirrors a bitboard vertically (byte swap)."""
+    return int.from_bytes(bits.to_bytes(8, "little"), "big")
+
+# -----------------------------------------------------------------------------
+# Attack tables
+# -----------------------------------------------------------------------------
+
+KNIGHT_ATTACKS = [_mask(targets) for targets in KNIGHT_TARGETS]
+KING_ATTACKS = [_mask(targets) for targets in KING_TARGETS]
+PAWN_ATTACKS = [[_mask(targets) for targets in PAWN_CAPTURES[color]] for color in (WHITE, BLACK)]
+
+SQUARE_BITS = [1 << sq for sq in range(64)]
+FLIPPED_BITS = [_flip(1 << sq) for sq in range(64)]
+
+def _line_masks():
+    files, diagonals, anti_diagonals = [], [], []
+    for sq in range(64):
+        row, col = sq >> 3, sq & 7
+        files.append(_mask(r * 8 + col for r in range(8) if r != row))
+        diagonals.append(_mask(r * 8 + c for r in range(8) for c in range(8)
+                               if r - c == row - col and r != row))
+        anti_diagonals.append(_mask(r * 8 + c for r in range(8) for c in range(8)
+                                    if r + c == row + col and r != row))
+    return files, diagonals, anti_diagonals
+
+FILE_MASKS, DIAGONAL_MASKS, ANTI_DIAGONAL_MASKS = _line_masks()
+
+def _first_rank_attacks():
+    # FIRST_RANK_ATTACKS[col][occupancy] -> attacked columns as an 8-bit mask
+    table = []
+    for col in range(8):
+        row = []
+        for occ in range(256):
+            attacks = 0
+            for step in (-1, 1):
+                c = col + step
+                while 0 <= c < 8:
+                    attacks |= 1 << c
+                    if occ & (1 << c):
+                        break
+                    c += step
+            row.append(attacks)
+        table.append(row)
+    return table
+
+FIRST_RANK_ATTACKS = _first_rank_attacks()
+
+def _line_attacks(occ, sq, mask):
+    o = occ & mask
+    forward = o - (SQUARE_BITS[sq] << 1)
+    reverse = _flip((_flip(o) - (FLIPPED_BITS[sq] << 1)) & FULL)
+    return (forward ^ reverse) & mask
+
+def _rank_attacks(occ, sq):
+    shift = sq & 56
+    return FIRST_RANK_ATTACKS[sq & 7][(occ >> shift) & 0xFF] << shift
+
+def bishop_attacks(occ, sq):
+    return _line_attacks(occ, sq, DIAGONAL_MASKS[sq]) | _line_attacks(occ, sq, ANTI_DIAGONAL_MASKS[sq])
+
+def rook_attacks(occ, sq):
+    return _line_attacks(occ, sq, FILE_MASKS[sq]) | _rank_attacks(occ, sq)
+
+def queen_attacks(occ, sq):
+    return bishop_attacks(occ, sq) | rook_attacks(occ, sq)
+
+def _between():
+    # BETWEEN[a][b] holds the squares strictly between two aligned squares
+    table = [[0] * 64 for _ in range(64)]
+    for sq in range(64):
+        for ray in QUEEN_RAYS[sq]:
+            line = 0
+            for target in ray:
+                table[sq][target] = line
+                line |= 1 << target
+    return table
+
+BETWEEN = _between()
+
+def iter_bits(bits):
+    while bits:
+        lsb = bits & -bits
+        yield lsb.bit_length() - 1
+        bits ^= lsb
+
+# -----------------------------------------------------------------------------
+# Position
+# -----------------------------------------------------------------------------
+
+class BitboardPosition(Position):
+    __slots__ = ("bb", "occ")
+
+    def __init__(self):
+        Position.__init__(self)
+        self.bb = [0] * 15
+        self.occ = [0, 0]
+
+    def _setup(self):
+        Position._setup(self)
+        self._init_bitboards()
+
+    def copy(self):
+        pos = Position.copy(self)
+        pos.bb = list(self.bb)
+        pos.occ = list(self.occ)
+        return pos
+
+    def _init_bitboards(self):
+        self.bb = [0] * 15
+        self.occ = [0, 0]
+        for sq, piece in enumerate(self.board):
+            if piece:
+                self.bb[piece] |= 1 << sq
+                self.occ[piece >> 3] |= 1 << sq
+
+    def make_move(self, move):
+        board = self.board
+        frm = move & 63
+        to = (move >> 6) & 63
+        piece = board[frm]
+        captured = board[to]
+        undo = Position.make_move(self, move)
+        self._update_bitboards(frm, to, piece, board[to], captured)
+        if to == undo[6] and piece & 7 == PAWN:
+            self._toggle_en_passant_victim(to, piece >> 3)
+        return undo
+
+    def unmake_move(self, move, undo):
+        board = self.board
+        frm = move & 63
+        to = (move >> 6) & 63
+        placed = board[to]
+        Position.unmake_move(self, move, undo)
+        piece = board[frm]
+        self._update_bitboards(frm, to, piece, placed, undo[0])
+        if to == undo[6] and piece & 7 == PAWN:
+            self._toggle_en_passant_victim(to, piece >> 3)
+
+    def has_non_pawn_material(self, color):
+        bb = self.bb
+        base = color << 3
+        return bool(bb[base | KNIGHT] | bb[base | BISHOP] | bb[base | ROOK] | bb[base | QUEEN])
+
+    def _toggle_en_passant_victim(self, to, color):
+        victim_sq = to + 8 if color == WHITE else to - 8
+        bit = 1 << victim_sq
+        self.bb[make_piece(color ^ 1, PAWN)] ^= bit
+        self.occ[color ^ 1] ^= bit
+
+    def _update_bitboards(self, frm, to, piece, placed, captured):
+        # XOR updates are their own inverse, so make and unmake share this.
+        bb = self.bb
+        occ = self.occ
+        from_bit = 1 << frm
+        to_bit = 1 << to
+        color = piece >> 3
+        bb[piece] ^= from_bit
+        bb[placed] ^= to_bit
+        occ[color] ^= from_bit | to_bit
+        if captured:
+            bb[captured] ^= to_bit
+            occ[captured >> 3] ^= to_bit
+        if piece & 7 == KING and (to - frm == 2 or frm - to == 2):
+            rook_from, rook_to = CASTLING_ROOKS[to]
+            rook_bits = (1 << rook_from) | (1 << rook_to)
+            bb[make_piece(color, ROOK)] ^= rook_bits
+            occ[color] ^= rook_bits
+
+    # -------------------------------------------------------------------------
+    # Move generation
+    # -------------------------------------------------------------------------
+
+    def pseudo_legal_moves(self):
+        bb = self.bb
+        side = self.side
+        own = self.occ[side]
+        enemy = self.occ[side ^ 1]
+        occ = own | enemy
+        empty = ~occ & FULL
+        targets = ~own & FULL
+        moves = []
+        append = moves.append
+
+        # Pawns, set-wise
+        pawns = bb[make_piece(side, PAWN)]
+        if side == WHITE:
+            single = (pawns >> 8) & empty
+            double = ((single & (RANK_2 >> 8)) >> 8) & empty
+            left = ((pawns & ~FILE_A) >> 9) & enemy
+            right = ((pawns & ~FILE_H) >> 7) & enemy
+            last_rank = RANK_8
+            push, left_step, right_step = 8, 9, 7
+        else:
+            single = (pawns << 8) & empty
+            double = ((single & (RANK_7 << 8)) << 8) & empty
+            left = ((pawns & ~FILE_A) << 7) & enemy
+            right = ((pawns & ~FILE_H) << 9) & enemy
+            last_rank = RANK_1
+            push, left_step, right_step = -8, -7, -9
+        for bits, step in ((single, push), (left, left_step), (right, right_step)):
+            for to in iter_bits(bits & ~last_rank):
+                append((to + step) | to << 6)
+            for to in iter_bits(bits & last_rank):
+                for promo in PROMOTION_FLAGS:
+                    append((to + step) | to << 6 | promo)
+        for to in iter_bits(double):
+            append((to + 2 * push) | to << 6)
+        self._en_passant_moves(pawns, append)
+
+        for frm in iter_bits(bb[make_piece(side, KNIGHT)]):
+            for to in iter_bits(KNIGHT_ATTACKS[frm] & targets):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, BISHOP)]):
+            for to in iter_bits(bishop_attacks(occ, frm) & targets):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, ROOK)]):
+            for to in iter_bits(rook_attacks(occ, frm) & targets):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, QUEEN)]):
+            for to in iter_bits(queen_attacks(occ, frm) & targets):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, KING)]):
+            for to in iter_bits(KING_ATTACKS[frm] & targets):
+                append(frm | to << 6)
+            self._castling_moves(frm, append, occ)
+        return moves
+
+    def pseudo_legal_captures(self):
+        bb = self.bb
+        side = self.side
+        own = self.occ[side]
+        enemy = self.occ[side ^ 1]
+        occ = own | enemy
+        moves = []
+        append = moves.append
+
+        pawns = bb[make_piece(side, PAWN)]
+        if side == WHITE:
+            pushes = (pawns >> 8) & ~occ & RANK_8
+            left = ((pawns & ~FILE_A) >> 9) & enemy
+            right = ((pawns & ~FILE_H) >> 7) & enemy
+            for to in iter_bits(pushes):
+                append((to + 8) | to << 6 | QUEEN << 12)
+            for to in iter_bits(left):
+                append((to + 9) | to << 6 | (QUEEN << 12 if to < 8 else 0))
+            for to in iter_bits(right):
+                append((to + 7) | to << 6 | (QUEEN << 12 if to < 8 else 0))
+        else:
+            pushes = (pawns << 8) & ~occ & RANK_1
+            left = ((pawns & ~FILE_A) << 7) & enemy
+            right = ((pawns & ~FILE_H) << 9) & enemy
+            for to in iter_bits(pushes):
+                append((to - 8) | to << 6 | QUEEN << 12)
+            for to in iter_bits(left):
+                append((to - 7) | to << 6 | (QUEEN << 12 if to >= 56 else 0))
+            for to in iter_bits(right):
+                append((to - 9) | to << 6 | (QUEEN << 12 if to >= 56 else 0))
+        self._en_passant_moves(pawns, append)
+
+        for frm in iter_bits(bb[make_piece(side, KNIGHT)]):
+            for to in iter_bits(KNIGHT_ATTACKS[frm] & enemy):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, BISHOP)]):
+            for to in iter_bits(bishop_attacks(occ, frm) & enemy):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, ROOK)]):
+            for to in iter_bits(rook_attacks(occ, frm) & enemy):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, QUEEN)]):
+            for to in iter_bits(queen_attacks(occ, frm) & enemy):
+                append(frm | to << 6)
+        for frm in iter_bits(bb[make_piece(side, KING)]):
+            for to in iter_bits(KING_ATTACKS[frm] & enemy):
+                append(frm | to << 6)
+        return moves
+
+    def _en_passant_moves(self, pawns, append):
+        ep = self.ep
+        if ep >= 0:
+            for frm in iter_bits(PAWN_ATTACKS[self.side ^ 1][ep] & pawns):
+                append(frm | ep << 6)
+
+    def _castling_moves(self, frm, append, occ):
+        rights = self.castling
+        if self.side == WHITE:
+            if frm != E1:
+                return
+            if rights & WHITE_KINGSIDE and not occ & 0x60 << 56:
+                append(E1 | 62 << 6)
+            if rights & WHITE_QUEENSIDE and not occ & 0x0E << 56:
+                append(E1 | 58 << 6)
+        else:
+            if frm != E8:
+                return
+            if rights & BLACK_KINGSIDE and not occ & 0x60:
+                append(E8 | 6 << 6)
+            if rights & BLACK_QUEENSIDE and not occ & 0x0E:
+                append(E8 | 2 << 6)
+
+    # -------------------------------------------------------------------------
+    # Attacks
+    # -------------------------------------------------------------------------
+
+    def attackers_to(self, sq, by, occ):
+        """Bitboard of the pieces of colour by attacking sq given occupancy occ."""
+        bb = self.bb
+        base = by << 3
+        queens = bb[base | QUEEN]
+        return ((PAWN_ATTACKS[by ^ 1][sq] & bb[base | PAWN])
+                | (KNIGHT_ATTACKS[sq] & bb[base | KNIGHT])
+                | (KING_ATTACKS[sq] & bb[base | KING])
+                | (bishop_attacks(occ, sq) & (bb[base | BISHOP] | queens))
+                | (rook_attacks(occ, sq) & (bb[base | ROOK] | queens)))
+
+    def is_square_attacked(self, sq, by, occ=None):
+        if sq < 0:
+            return True
+        bb = self.bb
+        base = by << 3
+        if PAWN_ATTACKS[by ^ 1][sq] & bb[base | PAWN]:
+            return True
+        if KNIGHT_ATTACKS[sq] & bb[base | KNIGHT]:
+            return True
+        if KING_ATTACKS[sq] & bb[base | KING]:
+            return True
+        if occ is None:
+            occ = self.occ[0] | self.occ[1]
+        queens = bb[base | QUEEN]
+        if bishop_attacks(occ, sq) & (bb[base | BISHOP] | queens):
+            return True
+        return bool(rook_attacks(occ, sq) & (bb[base | ROOK] | queens))
+
+    def _attacked_without_king(self, sq, by, king):
+        occ = (self.occ[0] | self.occ[1]) ^ (1 << king)
+        return self.is_square_attacked(sq, by, occ)
+
+    def check_and_pin_masks(self):
+        bb = self.bb
+        side = self.side
+        opp = side ^ 1
+        king = self.king_sq[side]
+        own = self.occ[side]
+        enemy = self.occ[opp]
+        occ = own | enemy
+
+        evasion = FULL
+        checkers = self.attackers_to(king, opp, occ)
+        if checkers:
+            if checkers & (checkers - 1):
+                evasion = 0
+            else:
+                evasion = BETWEEN[king][checkers.bit_length() - 1] | checkers
+
+        # Sliders that would attack the king if only enemy pieces blocked
+        pins = {}
+        base = opp << 3
+        queens = bb[base | QUEEN]
+        snipers = ((rook_attacks(enemy, king) & (bb[base | ROOK] | queens))
+                   | (bishop_attacks(enemy, king) & (bb[base | BISHOP] | queens)))
+        for sniper in iter_bits(snipers):
+            line = BETWEEN[king][sniper]
+            blockers = line & occ
+            if blockers and not blockers & (blockers - 1) and blockers & own:
+                pins[blockers.bit_length() - 1] = line | (1 << sniper)
+        return evasion, pins
+
+# -----------------------------------------------------------------------------
+# Cross-check against the mailbox generator
+# -----------------------------------------------------------------------------
+
+def compare_backends(games=50, plies=150, seed=0):
+    """
+    Plays random games and checks that both backends produce the same legal
+    move lists in every position reached. Returns the number of positions.
+    """
+    from game import init_board
+    rng = random.Random(seed)
+    checked = 0
+    for _ in range(games):
+        mailbox = Position.from_board(init_board())
+        bitboard = BitboardPosition.from_board(init_board())
+        for _ in range(plies):
+            expected = sorted(mailbox.legal_moves())
+            actual = sorted(bitboard.legal_moves())
+            if expected != actual:
+                raise AssertionError(f"move lists differ in {mailbox.to_board()}")
+            checked += 1
+            if not expected:
+                break
+            move = rng.choice(expected)
+            mailbox.make_move(move)
+            bitboard.make_move(move)
+    return checked
+
+if __name__ == "__main__":
+    print("Positions checked:", compare_backends())
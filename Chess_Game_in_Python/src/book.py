@@ -0,0 +1,196 @@
+"""
+Opening book in the Polyglot .bin format.
+
+A book is a file of 16-byte big-endian entries (key, move, weight, learn)
+sorted by key. OpeningBook maps the file with mmap and binary-searches it,
+so only the pages actually probed are read from disk.
+
+Keys are standard Polyglot keys (polyglot.py), so third-party .bin books
+can be used and books built here work in other programs. Books can be
+built from PGN with this module:
+
+    python src/book.py build games.pgn more.pgn --output book.bin --plies 20
+    python src/book.py probe "<fen>" --book book.bin
+
+Moves use the Polyglot encoding (castling as king-takes-rook) and are
+checked against the legal moves before they are played.
+"""
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from notation import read_pgn, parse_movetext, move_to_san
+from polyglot import polyglot_key
+from position import Position, START_FEN, KING, QUEEN, WHITE, move_to_tuple
+
+ENTRY = struct.Struct(">QHHI")
+
+BOOK_MODES = ("weighted", "best")
+
+# Polyglot promotion codes 1..4 are knight, bishop, rook, queen; our piece
+# types are one higher.
+_PROMO_OFFSET = 1
+
+def book_key(pos):
+    return polyglot_key(pos)
+
+def encode_book_move(pos, move):
+    frm = move & 63
+    to = (move >> 6) & 63
+    promo = move >> 12
+    if pos.board[frm] & 7 == KING and (to - frm == 2 or frm - to == 2):
+        to = (to & ~7) | (7 if to > frm else 0)
+    # Polyglot rows count from rank 1, ours from rank 8.
+    return ((to & 7) | (7 - (to >> 3)) << 3 | (frm & 7) << 6 | (7 - (frm >> 3)) << 9
+            | (promo - _PROMO_OFFSET if promo else 0) << 12)
+
+def decode_book_move(pos, code):
+    """Legal move for a Polyglot move code in pos, or None."""
+    for move in pos.legal_moves():
+        if encode_book_move(pos, move) == code:
+            return move
+    return None
+
+class OpeningBook:
+    def __init__(self, path, mode="weighted", seed=None):
+        if mode not in BOOK_MODES:
+            raise ValueError(f"Unknown book mode: {mode}")
+        self.mode = mode
+        self.rng = random.Random(seed)
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.count = size // ENTRY.size
+        # mmap cannot map an empty file
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.hits = 0
+        self.probes = 0
+
+    def close(self):
+        if self.data:
+            self.data.close()
+        self.file.close()
+
+    def _key_at(self, index):
+        return ENTRY.unpack_from(self.data, index * ENTRY.size)[0]
+
+    def entries(self, key):
+        """(move_code, weight) pairs stored for key, read straight from the map."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        found = []
+        while lo < self.count:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.data, lo * ENTRY.size)
+            if entry_key != key:
+                break
+            found.append((move, weight))
+            lo += 1
+        return found
+
+    def moves(self, pos):
+        """Legal book moves for pos as (move, weight), best first."""
+        moves = []
+        for code, weight in self.entries(book_key(pos)):
+            move = decode_book_move(pos, code)
+            if move is not None:
+                moves.append((move, weight))
+        moves.sort(key=lambda m: m[1], reverse=True)
+        return moves
+
+    def choose(self, pos):
+        """A book move for pos according to the mode, or None when out of book."""
+        self.probes += 1
+        moves = [m for m in self.moves(pos) if m[1] > 0]
+        if not moves:
+            return None
+        self.hits += 1
+        if self.mode == "best":
+            return moves[0][0]
+        return self.rng.choices([m for m, _ in moves], weights=[w for _, w in moves])[0]
+
+    def choose_tuple(self, board, color):
+        """choose() for a list-of-lists board, as a ((row, col), (row, col)) move or None."""
+        pos = Position.from_board(board, color)
+        move = self.choose(pos)
+        # The board can only promote to a queen.
+        if move is None or move >> 12 not in (0, QUEEN):
+            return None
+        return move_to_tuple(move)
+
+# -----------------------------------------------------------------------------
+# Building a book from PGN
+# -----------------------------------------------------------------------------
+
+def build_book(pgn_paths, output, max_plies=20, min_games=1):
+    """
+    Writes a book of the first max_plies moves of every game in the PGN
+    files. Each move is weighted 2 per win and 1 per draw for the side that
+    played it; moves seen in fewer than min_games games are dropped.
+    Returns the number of entries written.
+    """
+    stats = {}
+    for path in pgn_paths:
+        with open(path) as f:
+            for headers, movetext in read_pgn(f):
+                result = headers.get("Result", "*")
+                try:
+                    pos = Position.from_fen(headers.get("FEN", START_FEN))
+                    moves = parse_movetext(pos, movetext)[:max_plies]
+                except ValueError:
+                    continue
+                for move in moves:
+                    won = result == ("1-0" if pos.side == WHITE else "0-1")
+                    points = 2 if won else 1 if result == "1/2-1/2" else 0
+                    slot = stats.setdefault((book_key(pos), encode_book_move(pos, move)), [0, 0])
+                    slot[0] += 1
+                    slot[1] += points
+                    pos.make_move(move)
+
+    entries = [(key, code, points) for (key, code), (games, points) in stats.items()
+               if games >= min_games]
+    top = max((points for _, _, points in entries), default=0)
+    scale = 65535 / top if top > 65535 else 1
+    entries.sort(key=lambda e: (e[0], -e[2]))
+    with open(output, "wb") as f:
+        for key, code, points in entries:
+            # Moves that never scored are written with weight 0: probe lists
+            # them, but choose() never plays them.
+            f.write(ENTRY.pack(key, code, max(1, int(points * scale)) if points else 0, 0))
+    return len(entries)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or probe an opening book")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build a book from PGN files")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("--output", default="book.bin")
+    build.add_argument("--plies", type=int, default=20)
+    build.add_argument("--min-games", type=int, default=1)
+    probe = commands.add_parser("probe", help="list the book moves for a position")
+    probe.add_argument("fen", nargs="?", default=START_FEN)
+    probe.add_argument("--book", default="book.bin")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count = build_book(args.pgn, args.output, args.plies, args.min_games)
+        print(f"Wrote {count} entries to {args.output}")
+        return
+    book = OpeningBook(args.book)
+    pos = Position.from_fen(args.fen)
+    moves = book.moves(pos)
+    total = sum(w for _, w in moves) or 1
+    for move, weight in moves:
+        print(f"{move_to_san(pos, move):<8} {weight:>6} {weight / total:>6.1%}")
+    if not moves:
+        print("Position not in book", file=sys.stderr)
+    book.close()
+
+if __name__ == "__main__":
+    main()
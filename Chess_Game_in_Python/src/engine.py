@@ -1,40 +1,618 @@
-from game import generate_moves, make_move, piece_values
+import time
+
+from game import piece_values
+from position import Position, PAWN, PIECE_CHARS, WHITE, move_to_tuple
+from bitboard import BitboardPosition
+from game_state import GameState
+from transposition import EXACT, LOWER, UPPER
+from search_stats import SearchStats, new_timers, timed_position_class, timed_evaluate
+import evaluation
+
+# Move generation backends selectable through config.json "move_generator"
+BACKENDS = {"mailbox": Position, "bitboard": BitboardPosition}
+
+# piece_values indexed by the integer piece codes used in position.py
+PIECE_SCORES = [piece_values.get(c, 0) for c in PIECE_CHARS]
+
+# How many nodes are searched between clock checks
+CHECK_INTERVAL = 1024
+
+# Deepest ply killer moves are kept for
+MAX_PLY = 64
+
+# Move ordering bands: hash move, then captures (MVV-LVA), then killers,
+# then quiet moves by history score.
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 28
+KILLER_SCORE = 1 << 27
+
+# Quiescence delta pruning: skip captures that cannot lift the score back
+# to alpha even with this much positional compensation.
+DELTA_MARGIN = 200
+
+# Score of a tablebase win before the distance to mate is taken off, well
+# above anything the evaluation produces. Checkmate on the board scores the
+# same as a tablebase mate: TB_WIN less the plies to it.
+TB_WIN = 20000
+
+# Scores beyond this are mates (on the board or from tablebases), which the
+# pruning below must not cut off on.
+MATE_BOUND = TB_WIN - 2 * MAX_PLY - 256
+
+INF = float("inf")
+
+# Aspiration windows: from ASPIRATION_MIN_DEPTH the root is searched in a
+# window around the previous iteration's score, widened by ASPIRATION_GROWTH
+# each time the score falls outside.
+ASPIRATION_WINDOW = 50
+ASPIRATION_GROWTH = 4
+ASPIRATION_MIN_DEPTH = 3
+
+# Null-move pruning: depth reduction (one more from NULL_MOVE_DEEP) and the
+# minimum depth it is tried at.
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_DEEP = 6
+NULL_MOVE_MIN_DEPTH = 3
+
+# Late move reductions: quiet moves from the LMR_MIN_MOVES-th on are searched
+# a ply shallower (two from LMR_DEEP_MOVES) at depth LMR_MIN_DEPTH and up.
+LMR_MIN_DEPTH = 3
+LMR_MIN_MOVES = 3
+LMR_DEEP_MOVES = 6
+
+# Futility pruning: at these remaining depths quiet moves are skipped when
+# the static score plus the margin cannot reach alpha.
+FUTILITY_MARGINS = (0, 150, 350)
+
+# Search keywords (and config.json keys) switching the selective search
+SELECTIVITY = ("pvs", "aspiration", "null_move", "lmr", "futility")
 
 def evaluate_board(board):
-    score = 0
-    for row in board:
-        for piece in row:
-            score += piece_values.get(piece, 0)
+    return evaluation.evaluate_full(Position.from_board(board))
+
+def evaluate_position(pos, debug=False):
+    """
+    Tapered piece-square score kept up to date by make/unmake. With debug set
+    the incremental terms are checked against a full recompute first.
+    """
+    if debug:
+        evaluation.verify(pos)
+    return evaluation.evaluate(pos)
+
+def tablebase_score(value, ply):
+    """
+    Centipawn score for the side to move from a tablebase value (see
+    tablebase.py); nearer mates score further from zero.
+    """
+    if value > 0:
+        return TB_WIN - ply - value
+    if value < 0:
+        return -(TB_WIN - ply + value + 1)
+    return 0
+
+def score_to_tt(score, ply):
+    """
+    Mate scores count plies from the root; the table keeps them as plies
+    from the node, so they stay right when the node is reached at another ply.
+    """
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
     return score
 
-def minimax(board, depth, alpha, beta, maximizing):
-    color = "white" if maximizing else "black"
-    legal_moves = generate_moves(board, color)
-    if depth == 0 or not legal_moves:
-        return evaluate_board(board), None
-
-    best_move = None
-    if maximizing:
-        max_eval = -float("inf")
-        for move in legal_moves:
-            new_board = make_move(board, move)
-            eval_score, _ = minimax(new_board, depth - 1, alpha, beta, False)
-            if eval_score > max_eval:
-                max_eval = eval_score
-                best_move = move
-            alpha = max(alpha, eval_score)
-            if beta <= alpha:
-                break
-        return max_eval, best_move
+def score_from_tt(score, ply):
+    """Inverse of score_to_tt: a stored mate score back to plies from the root."""
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+def mvv_lva(victim, attacker):
+    """Most valuable victim first, least valuable attacker breaking ties."""
+    return 10 * abs(PIECE_SCORES[victim]) - abs(PIECE_SCORES[attacker])
+
+def minimax(board, depth, alpha, beta, maximizing, backend="mailbox", tt=None):
+    """Single fixed-depth search; scores are from white's point of view."""
+    pos = BACKENDS[backend].from_board(board, "white" if maximizing else "black")
+    if tt is not None:
+        tt.new_search()
+    score, move = Search(tt).alphabeta(pos, depth, alpha, beta, maximizing)
+    return score, (move_to_tuple(move) if move is not None else None)
+
+def iterative_deepening(board, max_depth, maximizing, backend="mailbox", tt=None,
+                        time_ms=None, nodes=None, info=None, ordering=True, debug_eval=False,
+                        quiescence=True, stop_event=None, tablebases=None, timing=False,
+                        on_stats=None, pvs=True, aspiration=True, null_move=True, lmr=True,
+                        futility=True, root_moves=None, ponder_hit=None):
+    """
+    Searches depth 1, 2, ... up to max_depth within an optional time (ms) or
+    node budget and returns the score and move of the last completed depth.
+    info, if given, is called with a dict after every completed iteration.
+    Setting stop_event (a threading/multiprocessing Event) ends the search
+    early the same way an exhausted budget does. tablebases, a
+    tablebase.Tablebases, is probed at the root and inside the tree.
+    on_stats, if given, is called with the search's SearchStats at the end;
+    timing adds the time spent in each hot path to them. pvs, aspiration,
+    null_move, lmr and futility switch the search techniques of those names.
+    root_moves, the legal moves of the root position if the caller already
+    has them, restricts the search to those moves. ponder_hit, an Event,
+    makes this a ponder search: time_ms is not enforced until it is set.
+
+    board is a list-of-lists board or a GameState. A GameState keeps its
+    castling rights, en passant square and halfmove clock, and its earlier
+    positions count as repetitions; maximizing is then taken from it.
+    """
+    if isinstance(board, GameState):
+        pos = BACKENDS[backend].from_fen(board.to_fen())
+        history = board.previous_keys()
     else:
-        min_eval = float("inf")
-        for move in legal_moves:
-            new_board = make_move(board, move)
-            eval_score, _ = minimax(new_board, depth - 1, alpha, beta, True)
-            if eval_score < min_eval:
-                min_eval = eval_score
-                best_move = move
-            beta = min(beta, eval_score)
-            if beta <= alpha:
+        pos = BACKENDS[backend].from_board(board, "white" if maximizing else "black")
+        history = ()
+    search = Search(tt, time_ms, nodes, info, ordering, debug_eval, quiescence, stop_event,
+                    tablebases, timing, pvs, aspiration, null_move, lmr, futility, ponder_hit)
+    score, move = search.iterate(pos, max_depth, root_moves, history)
+    if on_stats is not None:
+        on_stats(search.stats())
+    return score, (move_to_tuple(move) if move is not None else None)
+
+class SearchAborted(Exception):
+    """Raised inside the search when the time or node budget runs out."""
+
+class Search:
+    """
+    Negamax alpha-beta search state: the transposition table, limits,
+    counters (see stats()), the selective search switches and the principal
+    variation of the last completed iteration.
+
+    Selectivity, each switchable:
+      pvs         principal variation search: moves after the first get a
+                  null-window search and a full re-search only if they beat alpha
+      aspiration  root windows around the previous iteration's score
+      null_move   pass the move and prune if a reduced search still beats beta;
+                  never in check or with only king and pawns (zugzwang)
+      lmr         late, quiet moves searched shallower, re-searched if they beat alpha
+      futility    near the leaves, skip quiet moves that cannot reach alpha
+
+    Pondering: with a ponder_hit Event the search runs on the opponent's
+    time and ignores time_ms until the event is set, that is until the
+    opponent plays the move that was pondered. time_ms still counts from
+    the start of the search, so a long ponder answers at once.
+    """
+
+    def __init__(self, tt=None, time_ms=None, nodes=None, info=None, ordering=True,
+                 debug_eval=False, quiescence=True, stop_event=None, tablebases=None,
+                 timing=False, pvs=True, aspiration=True, null_move=True, lmr=True,
+                 futility=True, ponder_hit=None):
+        self.tt = tt
+        self.tablebases = tablebases
+        self.stop_event = stop_event
+        self.use_quiescence = quiescence
+        self.use_pvs = pvs
+        self.use_aspiration = aspiration
+        self.use_null_move = null_move
+        self.use_lmr = lmr
+        self.use_futility = futility
+        self.ordering = ordering
+        self.debug_eval = debug_eval
+        self.time_ms = time_ms
+        self.node_limit = nodes
+        self.node_budget = nodes or float("inf")
+        self.info = info
+        self.timing = timing
+        self.evaluate = evaluate_position
+        self.timers = None
+        self.seconds = 0.0
+        self.ponder_hit = ponder_hit
+        self.pondering = False
+        self.start_time = None
+        self.deadline = None
+        self.abortable = False
+        self.pv_moves = {}
+        self.root_move = None
+        self.root_moves = None
+        # Occurrences of each position key in the game before the root and
+        # on the line being searched, for repetition draws
+        self.key_counts = {}
+        self.reset_ordering()
+        self.reset_stats()
+
+    def reset_ordering(self):
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.history = [[0] * 4096, [0] * 4096]
+
+    def reset_stats(self):
+        self.nodes = 0
+        self.qnodes = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.expanded = 0
+        self.children = 0
+        self.iteration_nodes = []
+
+    def stats(self):
+        """SearchStats for the last iterate() call."""
+        tt = self.tt
+        return SearchStats(self.nodes, self.qnodes, self.seconds, self.cutoffs,
+                           self.first_move_cutoffs, self.expanded, self.children,
+                           tt.probes if tt is not None else 0, tt.hits if tt is not None else 0,
+                           self.iteration_nodes,
+                           dict(self.timers) if self.timers is not None else None)
+
+    def first_move_cutoff_rate(self):
+        """Share of beta cutoffs produced by the first move searched."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def order_moves(self, pos, moves, hash_move, ply):
+        board = pos.board
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        history = self.history[pos.side]
+
+        def score(move):
+            if move == hash_move:
+                return HASH_MOVE_SCORE
+            victim = board[(move >> 6) & 63]
+            if victim or move >> 12:
+                return CAPTURE_SCORE + mvv_lva(victim, board[move & 63]) + abs(PIECE_SCORES[move >> 12])
+            if move in killers:
+                return KILLER_SCORE
+            return history[move & 4095]
+
+        moves.sort(key=score, reverse=True)
+
+    def _record_cutoff(self, pos, move, depth, ply, index):
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if pos.board[(move >> 6) & 63] or move >> 12:
+            return
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[pos.side][move & 4095] += depth * depth
+
+    def iterate(self, pos, max_depth, root_moves=None, history=()):
+        """
+        Iterative deepening from pos. root_moves, if given, replaces the
+        legal move list of the root. history holds the keys of the earlier
+        positions of the game (GameState.previous_keys()); returning to one
+        scores as a draw. Returns (score, move), the score from white's
+        point of view.
+        """
+        # Work on a copy: an abort unwinds the recursion without unmaking moves.
+        pos = pos.copy()
+        self.root_moves = root_moves
+        self.set_history(history)
+        maximizing = pos.side == WHITE
+        if self.tt is not None:
+            self.tt.new_search()
+        self.start_time = time.perf_counter()
+        if self.time_ms:
+            self.deadline = self.start_time + self.time_ms / 1000
+        self.pondering = self.ponder_hit is not None and not self.ponder_hit.is_set()
+        self.abortable = False
+        self.reset_ordering()
+        self.reset_stats()
+        if self.timing:
+            self.timers = new_timers()
+            pos.__class__ = timed_position_class(type(pos), self.timers)
+            self.evaluate = timed_evaluate(evaluate_position, self.timers)
+
+        if self.tablebases is not None:
+            found = self.tablebases.best_move(pos)
+            if found is not None:
+                result = self._tablebase_result(pos, *found)
+                self.seconds = time.perf_counter() - self.start_time
+                return result
+
+        best_score, best_move = None, None
+        for depth in range(1, max_depth + 1):
+            nodes_before = self.nodes
+            try:
+                score = self._search_root(pos, depth, best_score)
+            except SearchAborted:
+                break
+            move = self.root_move
+            if not maximizing:
+                score = -score
+            self.iteration_nodes.append(self.nodes - nodes_before)
+            best_score, best_move = score, move
+            pv = self._collect_pv(pos.copy(), move, depth)
+            elapsed = time.perf_counter() - self.start_time
+            if self.info is not None:
+                self.info({
+                    "depth": depth,
+                    "score": score,
+                    "nodes": self.nodes,
+                    "time_ms": int(elapsed * 1000),
+                    "nps": int(self.nodes / elapsed) if elapsed > 0 else 0,
+                    "pv": pv,
+                    "first_move_cutoff_rate": self.first_move_cutoff_rate(),
+                })
+            if move is None:
                 break
-        return min_eval, best_move
+            # From now on there is a move to fall back on.
+            self.abortable = True
+            if self.pondering:
+                self.pondering = not self.ponder_hit.is_set()
+            # The next iteration takes several times longer than this one, so
+            # do not start it when more than half the budget is gone.
+            if self.time_ms and not self.pondering and elapsed * 1000 > self.time_ms / 2:
+                break
+        self.seconds = time.perf_counter() - self.start_time
+        return best_score, best_move
+
+    def set_history(self, keys):
+        """
+        Positions (Zobrist keys) that were played before the node searched
+        from; returning to one of them scores as a draw.
+        """
+        self.key_counts = {}
+        for key in keys:
+            self.key_counts[key] = self.key_counts.get(key, 0) + 1
+
+    def _search_root(self, pos, depth, previous):
+        """
+        Searches the root to depth and returns the score for the side to
+        move, with the best move left in root_move. previous is the last
+        iteration's score from white's point of view.
+        """
+        self.root_move = None
+        if (not self.use_aspiration or previous is None or depth < ASPIRATION_MIN_DEPTH
+                or abs(previous) >= MATE_BOUND):
+            return self.negamax(pos, depth, -INF, INF, 0)
+        if pos.side != WHITE:
+            previous = -previous
+        window = ASPIRATION_WINDOW
+        alpha, beta = previous - window, previous + window
+        while True:
+            score = self.negamax(pos, depth, alpha, beta, 0)
+            if alpha < score < beta:
+                return score
+            # Outside the window: widen it on the side that failed.
+            window *= ASPIRATION_GROWTH
+            if score <= alpha:
+                alpha = score - window if window < MATE_BOUND else -INF
+            else:
+                beta = score + window if window < MATE_BOUND else INF
+
+    def _tablebase_result(self, pos, move, value):
+        score = tablebase_score(value, 0)
+        if pos.side != WHITE:
+            score = -score
+        if self.info is not None:
+            self.info({
+                "depth": 0,
+                "score": score,
+                "nodes": self.nodes,
+                "time_ms": int((time.perf_counter() - self.start_time) * 1000),
+                "nps": 0,
+                "pv": [move],
+                "first_move_cutoff_rate": 0.0,
+            })
+        return score, move
+
+    def _collect_pv(self, pos, move, depth):
+        """
+        Walks the best moves from the root and remembers them by position key
+        so the next iteration searches them first.
+        """
+        self.pv_moves = {}
+        pv = []
+        while move is not None and len(pv) < depth:
+            self.pv_moves[pos.key] = move
+            pv.append(move)
+            pos.make_move(move)
+            move = self._best_move_after(pos)
+        return pv
+
+    def _best_move_after(self, pos):
+        if self.tt is None:
+            return None
+        move = self.tt.best_move(pos.key)
+        if move is None or move not in pos.legal_moves():
+            return None
+        return move
+
+    def _check_limits(self):
+        if self.pondering:
+            self.pondering = not self.ponder_hit.is_set()
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if (self.deadline is not None and not self.pondering
+                and time.perf_counter() >= self.deadline):
+            raise SearchAborted()
+        if self.stop_event is not None and self.stop_event.is_set():
+            raise SearchAborted()
+
+    def alphabeta(self, pos, depth, alpha, beta, maximizing, ply=0):
+        """
+        negamax() with scores from white's point of view. Returns (score,
+        move); the move is only known at the root (ply 0).
+        """
+        if maximizing:
+            score = self.negamax(pos, depth, alpha, beta, ply)
+        else:
+            score = -self.negamax(pos, depth, -beta, -alpha, ply)
+        return score, (self.root_move if ply == 0 else None)
+
+    def negamax(self, pos, depth, alpha, beta, ply, null_ok=True):
+        """
+        Alpha-beta on a Position using make/unmake in place. Scores are from
+        the side to move's point of view. At ply 0 the best move is left in
+        root_move. null_ok is cleared right after a null move so two are
+        never played in a row.
+        """
+        self.nodes += 1
+        if self.abortable and (self.nodes >= self.node_budget or not self.nodes % CHECK_INTERVAL):
+            self._check_limits()
+        if ply and (pos.halfmove >= 100 or self.key_counts.get(pos.key)):
+            # A repetition of a position in the game or on the current line
+            # (or the fifty-move rule) is a draw; nothing to search.
+            return 0
+        if self.tablebases is not None and ply:
+            value = self.tablebases.probe(pos)
+            if value is not None:
+                return tablebase_score(value, ply)
+        if depth <= 0:
+            if self.use_quiescence:
+                return self.quiescence(pos, alpha, beta)
+            score = self.evaluate(pos, self.debug_eval)
+            return score if pos.side == WHITE else -score
+
+        tt = self.tt
+        alpha_orig = alpha
+        hash_move = None
+        if tt is not None:
+            entry = tt.probe(pos.key)
+            if entry is not None:
+                hash_move = entry[4]
+                # The root always searches, so that it has a move to return.
+                if ply and entry[1] >= depth:
+                    score, flag = score_from_tt(entry[2], ply), entry[3]
+                    if flag == EXACT:
+                        return score
+                    if flag == LOWER:
+                        alpha = max(alpha, score)
+                    else:
+                        beta = min(beta, score)
+                    if beta <= alpha:
+                        return score
+
+        in_check = pos.in_check()
+        pv_node = beta - alpha > 1
+        futile = False
+        if not pv_node and not in_check and abs(beta) < MATE_BOUND:
+            static_eval = self.evaluate(pos, self.debug_eval)
+            if pos.side != WHITE:
+                static_eval = -static_eval
+            if (self.use_null_move and null_ok and depth >= NULL_MOVE_MIN_DEPTH
+                    and static_eval >= beta and pos.has_non_pawn_material(pos.side)):
+                reduction = NULL_MOVE_REDUCTION + (depth >= NULL_MOVE_DEEP)
+                undo = pos.make_null_move()
+                score = -self.negamax(pos, depth - 1 - reduction, -beta, -beta + 1, ply + 1, False)
+                pos.unmake_null_move(undo)
+                if score >= beta:
+                    # Do not trust a mate found after passing.
+                    return beta if score >= MATE_BOUND else score
+            futile = (self.use_futility and depth < len(FUTILITY_MARGINS)
+                      and static_eval + FUTILITY_MARGINS[depth] <= alpha)
+
+        if ply or self.root_moves is None:
+            legal_moves = pos.legal_moves()
+        else:
+            legal_moves = list(self.root_moves)
+        if not legal_moves:
+            # Checkmated (scored like a tablebase loss) or stalemate
+            return -(TB_WIN - ply) if in_check else 0
+        pv_move = self.pv_moves.get(pos.key)
+        if pv_move is not None:
+            hash_move = pv_move
+        if self.ordering:
+            self.order_moves(pos, legal_moves, hash_move, ply)
+        elif hash_move in legal_moves:
+            legal_moves.remove(hash_move)
+            legal_moves.insert(0, hash_move)
+
+        board = pos.board
+        killers = self.killers[ply] if ply < MAX_PLY else ()
+        key_counts = self.key_counts
+        key = pos.key
+        key_counts[key] = key_counts.get(key, 0) + 1
+        best_score = -INF
+        best_move = None
+        for index, move in enumerate(legal_moves):
+            to = (move >> 6) & 63
+            # En passant captures onto an empty square but is not quiet.
+            quiet = (not board[to] and not move >> 12
+                     and not (to == pos.ep and board[move & 63] & 7 == PAWN))
+            undo = pos.make_move(move)
+            if futile and index and quiet and not pos.in_check():
+                pos.unmake_move(move, undo)
+                continue
+
+            reduction = 0
+            if (self.use_lmr and depth >= LMR_MIN_DEPTH and index >= LMR_MIN_MOVES and quiet
+                    and not in_check and move not in killers and not pos.in_check()):
+                reduction = 1 if index < LMR_DEEP_MOVES or depth < 5 else 2
+            if reduction:
+                score = -self.negamax(pos, depth - 1 - reduction, -alpha - 1, -alpha, ply + 1)
+                full_depth = score > alpha
+            else:
+                full_depth = True
+            if full_depth:
+                if self.use_pvs and index:
+                    score = -self.negamax(pos, depth - 1, -alpha - 1, -alpha, ply + 1)
+                    if alpha < score < beta:
+                        score = -self.negamax(pos, depth - 1, -beta, -alpha, ply + 1)
+                else:
+                    score = -self.negamax(pos, depth - 1, -beta, -alpha, ply + 1)
+            pos.unmake_move(move, undo)
+
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        self._record_cutoff(pos, move, depth, ply, index)
+                        break
+        key_counts[key] -= 1
+        self.children += index + 1
+        self.expanded += 1
+
+        if tt is not None:
+            if best_score <= alpha_orig:
+                flag = UPPER
+            elif best_score >= beta:
+                flag = LOWER
+            else:
+                flag = EXACT
+            tt.store(pos.key, depth, score_to_tt(best_score, ply), flag, best_move)
+        if not ply:
+            self.root_move = best_move
+        return best_score
+
+    def quiescence(self, pos, alpha, beta):
+        """
+        Capture-only search below the horizon, from the side to move's point
+        of view. The side to move may stand pat on the static score; captures
+        that cannot reach alpha even with DELTA_MARGIN to spare are skipped.
+        """
+        self.nodes += 1
+        self.qnodes += 1
+        if self.abortable and (self.nodes >= self.node_budget or not self.nodes % CHECK_INTERVAL):
+            self._check_limits()
+        stand_pat = self.evaluate(pos, self.debug_eval)
+        if pos.side != WHITE:
+            stand_pat = -stand_pat
+        if stand_pat >= beta:
+            return stand_pat
+        if stand_pat > alpha:
+            alpha = stand_pat
+
+        board = pos.board
+        captures = pos.legal_captures()
+        captures.sort(key=lambda m: mvv_lva(board[(m >> 6) & 63], board[m & 63]), reverse=True)
+        best = stand_pat
+        for move in captures:
+            to = (move >> 6) & 63
+            victim = board[to] & 7
+            if to == pos.ep and board[move & 63] & 7 == PAWN:
+                victim = PAWN  # en passant: the captured pawn is not on the target square
+            gain = evaluation.MG_VALUES[victim] + evaluation.MG_VALUES[move >> 12]
+            if stand_pat + gain + DELTA_MARGIN < alpha:
+                continue
+            undo = pos.make_move(move)
+            score = -self.quiescence(pos, -beta, -alpha)
+            pos.unmake_move(move, undo)
+            if score > best:
+                best = score
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+        return best
@@ -0,0 +1,158 @@
+"""
+Tapered piece-square evaluation.
+
+Every piece contributes a middlegame and an endgame value (material plus a
+piece-square bonus). Position keeps the running white-minus-black sums and the
+game phase up to date in make_move/unmake_move, so evaluate() is O(1). The
+tables below are written from white's point of view with rank 8 first, which
+is exactly the square order used by position.py; black uses the vertical
+mirror (square ^ 56).
+
+Piece codes follow position.py (type | color << 3). They are spelled out here
+rather than imported because position.py imports this module.
+"""
+
+# Material, indexed by piece type (pawn .. king)
+MG_VALUES = (0, 100, 320, 330, 500, 900, 0)
+EG_VALUES = (0, 120, 300, 320, 520, 920, 0)
+
+# Contribution of each piece type to the game phase; 24 means all minor and
+# major pieces are on the board, 0 means only kings and pawns are left.
+PHASE_WEIGHTS = (0, 0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+
+PAWN_MG = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     10,  10,  20,  30,  30,  20,  10,  10,
+      5,   5,  10,  25,  25,  10,   5,   5,
+      0,   0,   0,  20,  20,   0,   0,   0,
+      5,  -5, -10,   0,   0, -10,  -5,   5,
+      5,  10,  10, -20, -20,  10,  10,   5,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+
+PAWN_EG = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+     80,  80,  80,  80,  80,  80,  80,  80,
+     50,  50,  50,  50,  50,  50,  50,  50,
+     30,  30,  30,  30,  30,  30,  30,  30,
+     20,  20,  20,  20,  20,  20,  20,  20,
+     10,  10,  10,  10,  10,  10,  10,  10,
+     10,  10,  10,  10,  10,  10,  10,  10,
+      0,   0,   0,   0,   0,   0,   0,   0,
+)
+
+KNIGHT_MG = (
+    -50, -40, -30, -30, -30, -30, -40, -50,
+    -40, -20,   0,   0,   0,   0, -20, -40,
+    -30,   0,  10,  15,  15,  10,   0, -30,
+    -30,   5,  15,  20,  20,  15,   5, -30,
+    -30,   0,  15,  20,  20,  15,   0, -30,
+    -30,   5,  10,  15,  15,  10,   5, -30,
+    -40, -20,   0,   5,   5,   0, -20, -40,
+    -50, -40, -30, -30, -30, -30, -40, -50,
+)
+
+BISHOP_MG = (
+    -20, -10, -10, -10, -10, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,  10,  10,   5,   0, -10,
+    -10,   5,   5,  10,  10,   5,   5, -10,
+    -10,   0,  10,  10,  10,  10,   0, -10,
+    -10,  10,  10,  10,  10,  10,  10, -10,
+    -10,   5,   0,   0,   0,   0,   5, -10,
+    -20, -10, -10, -10, -10, -10, -10, -20,
+)
+
+ROOK_MG = (
+      0,   0,   0,   0,   0,   0,   0,   0,
+      5,  10,  10,  10,  10,  10,  10,   5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+     -5,   0,   0,   0,   0,   0,   0,  -5,
+      0,   0,   0,   5,   5,   0,   0,   0,
+)
+
+QUEEN_MG = (
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+    -10,   0,   0,   0,   0,   0,   0, -10,
+    -10,   0,   5,   5,   5,   5,   0, -10,
+     -5,   0,   5,   5,   5,   5,   0,  -5,
+      0,   0,   5,   5,   5,   5,   0,  -5,
+    -10,   5,   5,   5,   5,   5,   0, -10,
+    -10,   0,   5,   0,   0,   0,   0, -10,
+    -20, -10, -10,  -5,  -5, -10, -10, -20,
+)
+
+KING_MG = (
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -30, -40, -40, -50, -50, -40, -40, -30,
+    -20, -30, -30, -40, -40, -30, -30, -20,
+    -10, -20, -20, -20, -20, -20, -20, -10,
+     20,  20,   0,   0,   0,   0,  20,  20,
+     20,  30,  10,   0,   0,  10,  30,  20,
+)
+
+KING_EG = (
+    -50, -40, -30, -20, -20, -30, -40, -50,
+    -30, -20, -10,   0,   0, -10, -20, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  30,  40,  40,  30, -10, -30,
+    -30, -10,  20,  30,  30,  20, -10, -30,
+    -30, -30,   0,   0,   0,   0, -30, -30,
+    -50, -30, -30, -30, -30, -30, -30, -50,
+)
+
+# Piece-square bonuses by piece type; minor and major pieces use the same
+# table in both phases.
+MG_PST = (None, PAWN_MG, KNIGHT_MG, BISHOP_MG, ROOK_MG, QUEEN_MG, KING_MG)
+EG_PST = (None, PAWN_EG, KNIGHT_MG, BISHOP_MG, ROOK_MG, QUEEN_MG, KING_EG)
+
+def _combined_tables(values, pst):
+    # tables[piece_code][square] -> signed material + bonus, white positive
+    tables = [[0] * 64 for _ in range(15)]
+    for kind in range(1, 7):
+        for sq in range(64):
+            tables[kind][sq] = values[kind] + pst[kind][sq]
+            tables[kind | 8][sq] = -(values[kind] + pst[kind][sq ^ 56])
+    return tables
+
+MG_TABLE = _combined_tables(MG_VALUES, MG_PST)
+EG_TABLE = _combined_tables(EG_VALUES, EG_PST)
+PHASE_TABLE = [PHASE_WEIGHTS[code & 7] if code & 7 < 7 else 0 for code in range(15)]
+
+def compute_terms(board):
+    """Recomputes (mg, eg, phase) for a 64-square board from scratch."""
+    mg = eg = phase = 0
+    for sq, piece in enumerate(board):
+        if piece:
+            mg += MG_TABLE[piece][sq]
+            eg += EG_TABLE[piece][sq]
+            phase += PHASE_TABLE[piece]
+    return mg, eg, phase
+
+def taper(mg, eg, phase):
+    if phase > MAX_PHASE:
+        phase = MAX_PHASE
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+def evaluate(pos):
+    """Score in centipawns from white's point of view, from the incremental terms."""
+    return taper(pos.mg, pos.eg, pos.phase)
+
+def evaluate_full(pos):
+    """Same score recomputed over all 64 squares, for checking evaluate()."""
+    return taper(*compute_terms(pos.board))
+
+def verify(pos):
+    """Raises AssertionError if the incremental terms disagree with a recompute."""
+    expected = compute_terms(pos.board)
+    actual = (pos.mg, pos.eg, pos.phase)
+    if actual != expected:
+        raise AssertionError(f"incremental eval {actual} != recomputed {expected}")
@@ -1,4 +1,5 @@
-import copy
+from position import Position, WHITE, BLACK, QUEEN, move_to_tuple
+from game_state import GameState
 
 # Pieces values and board evaluation values are used in engine.py too.
 piece_values = {
@@ -38,121 +39,12 @@ def opponent(color):
 # -----------------------------------------------------------------------------
 
 def generate_moves(board, color):
-    moves = []
-    directions = {
-        'N': [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)],
-        'B': [(-1, -1), (-1, 1), (1, -1), (1, 1)],
-        'R': [(-1, 0), (1, 0), (0, -1), (0, 1)],
-        'Q': [(-1, -1), (-1, 1), (1, -1), (1, 1), (-1, 0), (1, 0), (0, -1), (0, 1)],
-        'K': [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-    }
-    
-    for i in range(8):
-        for j in range(8):
-            piece = board[i][j]
-            if piece == '.' or get_piece_color(piece) != color:
-                continue
-            start = (i, j)
-            # Pawn moves
-            if piece.upper() == 'P':
-                d = -1 if color == "white" else 1
-                next_row = i + d
-                if on_board(next_row, j) and board[next_row][j] == '.':
-                    moves.append((start, (next_row, j)))
-                    if (color == "white" and i == 6) or (color == "black" and i == 1):
-                        next_row2 = i + 2*d
-                        if on_board(next_row2, j) and board[next_row2][j] == '.':
-                            moves.append((start, (next_row2, j)))
-                for dj in [-1, 1]:
-                    next_col = j + dj
-                    if on_board(next_row, next_col):
-                        target = board[next_row][next_col]
-                        if target != '.' and get_piece_color(target) == opponent(color):
-                            moves.append((start, (next_row, next_col)))
-            # Knight moves
-            elif piece.upper() == 'N':
-                for d in directions['N']:
-                    ni, nj = i + d[0], j + d[1]
-                    if on_board(ni, nj):
-                        target = board[ni][nj]
-                        if target == '.' or get_piece_color(target) == opponent(color):
-                            moves.append((start, (ni, nj)))
-            # Bishop moves
-            elif piece.upper() == 'B':
-                for d in directions['B']:
-                    ni, nj = i, j
-                    while True:
-                        ni += d[0]
-                        nj += d[1]
-                        if not on_board(ni, nj):
-                            break
-                        target = board[ni][nj]
-                        if target == '.':
-                            moves.append((start, (ni, nj)))
-                        else:
-                            if get_piece_color(target) == opponent(color):
-                                moves.append((start, (ni, nj)))
-                            break
-            # Rook moves
-            elif piece.upper() == 'R':
-                for d in directions['R']:
-                    ni, nj = i, j
-                    while True:
-                        ni += d[0]
-                        nj += d[1]
-                        if not on_board(ni, nj):
-                            break
-                        target = board[ni][nj]
-                        if target == '.':
-                            moves.append((start, (ni, nj)))
-                        else:
-                            if get_piece_color(target) == opponent(color):
-                                moves.append((start, (ni, nj)))
-                            break
-            # Queen moves
-            elif piece.upper() == 'Q':
-                for d in directions['Q']:
-                    ni, nj = i, j
-                    while True:
-                        ni += d[0]
-                        nj += d[1]
-                        if not on_board(ni, nj):
-                            break
-                        target = board[ni][nj]
-                        if target == '.':
-                            moves.append((start, (ni, nj)))
-                        else:
-                            if get_piece_color(target) == opponent(color):
-                                moves.append((start, (ni, nj)))
-                            break
-            # King moves including simplified castling
-            elif piece.upper() == 'K':
-                for d in directions['K']:
-                    ni, nj = i + d[0], j + d[1]
-                    if on_board(ni, nj):
-                        target = board[ni][nj]
-                        if target == '.' or get_piece_color(target) == opponent(color):
-                            moves.append((start, (ni, nj)))
-                if color == "white" and i == 7 and j == 4 and board[7][4] == 'K':
-                    if board[7][5] == '.' and board[7][6] == '.' and board[7][7] == 'R':
-                        moves.append((start, (7, 6)))
-                    if board[7][3] == '.' and board[7][2] == '.' and board[7][1] == '.' and board[7][0] == 'R':
-                        moves.append((start, (7, 2)))
-                elif color == "black" and i == 0 and j == 4 and board[0][4] == 'k':
-                    if board[0][5] == '.' and board[0][6] == '.' and board[0][7] == 'r':
-                        moves.append((start, (0, 6)))
-                    if board[0][3] == '.' and board[0][2] == '.' and board[0][1] == '.' and board[0][0] == 'r':
-                        moves.append((start, (0, 2)))
-    
-    legal_moves = []
-    for move in moves:
-        new_board = make_move(board, move)
-        if not is_in_check(new_board, color):
-            legal_moves.append(move)
-    return legal_moves
+    pos = Position.from_board(board, color)
+    # The board always promotes to a queen, so underpromotions are left out.
+    return [move_to_tuple(move) for move in pos.legal_moves() if move >> 12 in (0, QUEEN)]
 
 def make_move(board, move):
-    new_board = copy.deepcopy(board)
+    new_board = [row[:] for row in board]
     (start, end) = move
     piece = new_board[start[0]][start[1]]
     new_board[end[0]][end[1]] = piece
@@ -177,106 +69,27 @@ def make_move(board, move):
     return new_board
 
 def is_in_check(board, color):
-    king = 'K' if color == "white" else 'k'
-    king_pos = None
-    for i in range(8):
-        for j in range(8):
-            if board[i][j] == king:
-                king_pos = (i, j)
-                break
-        if king_pos:
-            break
-    if king_pos is None:
-        return True
+    return Position.from_board(board, color).in_check()
 
-    opp_color = opponent(color)
-    opp_moves = generate_pseudo_legal_moves(board, opp_color)
-    for move in opp_moves:
-        if move[1] == king_pos:
-            return True
-    return False
+def is_square_attacked(board, square, by_color):
+    """True if any piece of by_color attacks square, given as (row, col)."""
+    pos = Position.from_board(board, by_color)
+    by = WHITE if by_color == "white" else BLACK
+    return pos.is_square_attacked(square[0] * 8 + square[1], by)
 
 def generate_pseudo_legal_moves(board, color):
-    moves = []
-    directions = {
-        'N': [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)],
-        'B': [(-1, -1), (-1, 1), (1, -1), (1, 1)],
-        'R': [(-1, 0), (1, 0), (0, -1), (0, 1)],
-        'Q': [(-1, -1), (-1, 1), (1, -1), (1, 1), (-1, 0), (1, 0), (0, -1), (0, 1)],
-        'K': [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
-    }
-    
-    for i in range(8):
-        for j in range(8):
-            piece = board[i][j]
-            if piece == '.' or get_piece_color(piece) != color:
-                continue
-            start = (i, j)
-            if piece.upper() == 'P':
-                d = -1 if color == "white" else 1
-                next_row = i + d
-                if on_board(next_row, j):
-                    if board[next_row][j] == '.':
-                        moves.append((start, (next_row, j)))
-                    for dj in [-1, 1]:
-                        next_col = j + dj
-                        if on_board(next_row, next_col):
-                            target = board[next_row][next_col]
-                            if target != '.' and get_piece_color(target) == opponent(color):
-                                moves.append((start, (next_row, next_col)))
-            elif piece.upper() == 'N':
-                for d in directions['N']:
-                    ni, nj = i + d[0], j + d[1]
-                    if on_board(ni, nj):
-                        moves.append((start, (ni, nj)))
-            elif piece.upper() == 'B':
-                for d in directions['B']:
-                    ni, nj = i, j
-                    while True:
-                        ni += d[0]
-                        nj += d[1]
-                        if not on_board(ni, nj):
-                            break
-                        moves.append((start, (ni, nj)))
-                        if board[ni][nj] != '.':
-                            break
-            elif piece.upper() == 'R':
-                for d in directions['R']:
-                    ni, nj = i, j
-                    while True:
-                        ni += d[0]
-                        nj += d[1]
-                        if not on_board(ni, nj):
-                            break
-                        moves.append((start, (ni, nj)))
-                        if board[ni][nj] != '.':
-                            break
-            elif piece.upper() == 'Q':
-                for d in directions['Q']:
-                    ni, nj = i, j
-                    while True:
-                        ni += d[0]
-                        nj += d[1]
-                        if not on_board(ni, nj):
-                            break
-                        moves.append((start, (ni, nj)))
-                        if board[ni][nj] != '.':
-                            break
-            elif piece.upper() == 'K':
-                for d in directions['K']:
-                    ni, nj = i + d[0], j + d[1]
-                    if on_board(ni, nj):
-                        moves.append((start, (ni, nj)))
-    return moves
+    pos = Position.from_board(board, color)
+    return [move_to_tuple(move) for move in pos.pseudo_legal_moves()]
 
-def is_game_over(board, color):
-    moves = generate_moves(board, color)
-    if not moves:
-        if is_in_check(board, color):
-            return True, "checkmate"
-        else:
-            return True, "stalemate"
-    return False, None
+def is_game_over(state, color=None):
+    """
+    (over, reason) for a GameState, or for a board and color (which has no
+    history, so repetitions are not seen). reason is "checkmate" or one of
+    game_state.DRAW_REASONS.
+    """
+    if not isinstance(state, GameState):
+        state = GameState.from_board(state, color)
+    return state.game_over()
 
 # For text input fallback (if needed for console debug)
 def user_move_text():
@@ -0,0 +1,136 @@
+"""
+Game state: a Position together with the history of the game.
+
+Position already carries the side to move, castling rights, en passant
+square and halfmove clock. GameState adds the moves played and a stack of
+the Zobrist keys of every position so far, with a count per key, so that
+repetitions are found with one dict lookup. It reports every way a game
+can end (checkmate, stalemate, fifty-move rule, threefold repetition and
+insufficient material) and hands the earlier keys to the search
+(Search.iterate(history=...)) so the engine sees repetitions too.
+"""
+from position import Position, START_FEN, WHITE, KNIGHT, BISHOP, KING
+
+# Game over reasons that are draws
+DRAW_REASONS = ("stalemate", "fifty-move rule", "threefold repetition", "insufficient material")
+
+def insufficient_material(pos):
+    """Neither side can mate: bare kings, or kings and one minor piece."""
+    pieces = [p & 7 for p in pos.board if p and p & 7 != KING]
+    return not pieces or (len(pieces) == 1 and pieces[0] in (KNIGHT, BISHOP))
+
+class GameState:
+    def __init__(self, pos):
+        self.pos = pos
+        self.moves = []
+        self.undos = []
+        # Keys of every position so far, the current one last
+        self.history = [pos.key]
+        self.counts = {pos.key: 1}
+
+    @classmethod
+    def from_fen(cls, fen=START_FEN, position_class=Position):
+        return cls(position_class.from_fen(fen))
+
+    @classmethod
+    def from_board(cls, board, color="white", position_class=Position):
+        """State for a list-of-lists board with no history; castling is inferred."""
+        return cls(position_class.from_board(board, color))
+
+    def copy(self):
+        state = GameState(self.pos.copy())
+        state.moves = list(self.moves)
+        state.undos = list(self.undos)
+        state.history = list(self.history)
+        state.counts = dict(self.counts)
+        return state
+
+    @property
+    def color(self):
+        return self.pos.color
+
+    def to_board(self):
+        return self.pos.to_board()
+
+    def to_fen(self):
+        return self.pos.to_fen()
+
+    def push(self, move):
+        """Plays move (position.py encoding)."""
+        self.undos.append(self.pos.make_move(move))
+        self.moves.append(move)
+        key = self.pos.key
+        self.history.append(key)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    def push_tuple(self, move):
+        """Plays a ((row, col), (row, col)) move; pawns promote to queens."""
+        self.push(self.pos.move_from_tuple(move))
+
+    def pop(self):
+        """Takes back the last move and returns it."""
+        key = self.history.pop()
+        self.counts[key] -= 1
+        move = self.moves.pop()
+        self.pos.unmake_move(move, self.undos.pop())
+        return move
+
+    def repetitions(self):
+        """How many times the current position has occurred, this time included."""
+        return self.counts[self.pos.key]
+
+    def previous_keys(self):
+        """
+        Keys of the earlier positions that can still repeat: those since the
+        last capture or pawn move, which the halfmove clock counts.
+        """
+        return self.history[max(0, len(self.history) - 1 - self.pos.halfmove):-1]
+
+    def game_over(self, legal_moves=None):
+        """
+        (over, reason): reason is "checkmate", one of DRAW_REASONS or None.
+        legal_moves may be passed in when the caller already has them.
+        """
+        pos = self.pos
+        if legal_moves is None:
+            legal_moves = pos.legal_moves()
+        if not legal_moves:
+            return True, ("checkmate" if pos.in_check() else "stalemate")
+        if pos.halfmove >= 100:
+            return True, "fifty-move rule"
+        if self.counts[pos.key] >= 3:
+            return True, "threefold repetition"
+        if insufficient_material(pos):
+            return True, "insufficient material"
+        return False, None
+
+    def result(self, legal_moves=None):
+        """(PGN result, reason) if the game is over, else None."""
+        over, reason = self.game_over(legal_moves)
+        if not over:
+            return None
+        if reason == "checkmate":
+            return ("0-1" if self.pos.side == WHITE else "1-0"), reason
+        return "1/2-1/2", reason
+
+# -----------------------------------------------------------------------------
+# Self-check
+# -----------------------------------------------------------------------------
+
+# A threefold repetition whose first occurrence follows a double pawn push
+REPETITION_CHECK = "e2e4 g8f6 g1f3 f6g8 f3g1 g8f6 g1f3 f6g8 f3g1"
+
+def check_repetition(moves=REPETITION_CHECK):
+    """
+    Plays UCI moves from the start position and checks that the last
+    position is scored as a threefold repetition. Returns the count.
+    """
+    state = GameState.from_fen()
+    for text in moves.split():
+        state.push(state.pos.move_from_uci(text))
+    if state.game_over() != (True, "threefold repetition"):
+        raise AssertionError(f"repetition missed: {state.repetitions()} occurrences of {state.to_fen()}")
+    return state.repetitions()
+
+if __name__ == "__main__":
+    print("Repetitions:", check_repetition())
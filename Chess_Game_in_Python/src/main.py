@@ -1,22 +1,83 @@
 import sys
 import json
+import logging
 import pygame
 import threading
-from move_history_window import start_move_history_window, move_history  # Shared move_history list
-from game import init_board, opponent, make_move, is_game_over
+from move_history_window import start_move_history_window, publish_move
 from game import get_move_string
 from ui import GameUI, show_instructions
-from engine import minimax
+from search_worker import SearchWorker
+from book import OpeningBook
+from search_stats import SearchStats
+from session import GameSession, format_search_info
 
 # Load configuration from config.json
 with open("config.json", "r") as f:
     CONFIG = json.load(f)
 
+log = logging.getLogger("chess")
+
+def setup_logging():
+    """Turns on logging at config["log_level"] (e.g. "INFO"); off when null."""
+    if CONFIG["log_level"]:
+        logging.basicConfig(level=CONFIG["log_level"],
+                            format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    else:
+        log.addHandler(logging.NullHandler())
+        log.propagate = False
+
+def record_move(ply, side, move):
+    """Sends a played move to the history window and the log."""
+    move_str = get_move_string(move)
+    publish_move(move_str)
+    log.info("move ply=%d side=%s move=%s", ply, side, move_str)
+
+def log_search_info(info):
+    """Engine progress, one line per completed iteration (log level DEBUG)."""
+    log.debug("search %s nodes %d nps %d time %dms first-move cutoffs %.0f%%",
+              format_search_info(info), info["nodes"], info["nps"], info["time_ms"],
+              info["first_move_cutoff_rate"] * 100)
+
+def search_options():
+    return {
+        "max_depth": CONFIG["ai_depth"],
+        "tt_size_mb": CONFIG["tt_size_mb"],
+        "tt_replacement": CONFIG["tt_replacement"],
+        "backend": CONFIG["move_generator"],
+        "time_ms": CONFIG["time_ms"],
+        "nodes": CONFIG["nodes"],
+        "ordering": CONFIG["move_ordering"],
+        "debug_eval": CONFIG["debug_eval"],
+        "quiescence": CONFIG["quiescence"],
+        "search_workers": CONFIG["search_workers"],
+        "tablebase_path": CONFIG["tablebase_path"],
+        "timing": CONFIG["search_timing"],
+        "profile_dir": CONFIG["profile_dir"],
+        "pvs": CONFIG["pvs"],
+        "aspiration": CONFIG["aspiration"],
+        "null_move": CONFIG["null_move"],
+        "lmr": CONFIG["lmr"],
+        "futility": CONFIG["futility"],
+    }
+
+def warn_parallel_options():
+    """Logs the options that a parallel search ("search_workers" above 1) ignores."""
+    if CONFIG["search_workers"] > 1:
+        for name in ("profile_dir", "print_search_stats"):
+            if CONFIG[name]:
+                log.warning("%s is ignored with search_workers=%d", name, CONFIG["search_workers"])
+
+def log_search_result(tt_report, stats):
+    """TT report at DEBUG; the full statistics are printed if "print_search_stats" is set."""
+    log.debug("search done: %s", tt_report)
+    if CONFIG["print_search_stats"] and stats is not None:
+        print(SearchStats.from_dict(stats).report())
+
 def main():
+    setup_logging()
     pygame.init()
     screen = pygame.display.set_mode((CONFIG["screen_width"], CONFIG["screen_height"]))
     pygame.display.set_caption("Chess Game with AI")
-    clock = pygame.time.Clock()
 
     # Start move history window in a separate thread
     threading.Thread(target=start_move_history_window, daemon=True).start()
@@ -25,51 +86,22 @@ def main():
     ui = GameUI(screen, CONFIG["square_size"])
     show_instructions(screen, CONFIG["screen_width"], CONFIG["screen_height"])
 
-    board = init_board()
-    turn = "white"  # White starts
-    game_over = False
-
-    while not game_over:
-        ui.draw_board(board)
-        pygame.display.flip()
-
-        over, reason = is_game_over(board, turn)
-        if over:
-            if reason == "checkmate":
-                end_msg = "Checkmate! Black wins!" if turn == "white" else "Checkmate! White wins!"
-            else:
-                end_msg = "Stalemate! The game is drawn."
-            ui.show_end_message(end_msg)
-            game_over = True
-            continue
-
-        if turn == "white":
-            move = ui.get_player_move(board)
-            if move is None:
-                continue
-            board = make_move(board, move)
-
-            # Record move
-            move_str = get_move_string(move)
-            move_history.append(move_str)
-            print("Move history:", move_history)
-        else:
-            ui.show_message("Computer is thinking...", 2)
-            score, move = minimax(board, CONFIG["ai_depth"], -float("inf"), float("inf"), False)
-            if move is None:
-                ui.show_message("No legal moves available for computer!", 2)
-                break
-            board = make_move(board, move)
-
-            # Record move
-            move_str = get_move_string(move)
-            move_history.append(move_str)
-            print("Move history:", move_history)
+    warn_parallel_options()
+    worker = SearchWorker(search_options())
+    book = OpeningBook(CONFIG["book_path"], CONFIG["book_mode"]) if CONFIG["book_path"] else None
 
-        turn = opponent(turn)
-        clock.tick(CONFIG["fps"])
+    session = GameSession(ui, worker, book, on_move=record_move,
+                          on_search_info=log_search_info, on_search_done=log_search_result,
+                          ponder=CONFIG["ponder"])
+    end_msg = session.run()
+    if CONFIG["ponder"]:
+        log.info("ponder %s", session.ponder_stats.report())
+    if end_msg is not None:
+        ui.show_end_message(end_msg)
 
-    pygame.time.wait(3000)
+    worker.close()
+    if book is not None:
+        book.close()
     pygame.quit()
     sys.exit()
 
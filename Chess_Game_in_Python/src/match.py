@@ -0,0 +1,256 @@
+"""
+Headless engine-vs-engine matches for comparing search settings.
+
+Two engine configurations (A and B) play each opening twice, once with each
+colour, spread over a pool of worker processes. Finished games are streamed
+as they come in: PGN to one file, one JSON object per line to another. The
+summary gives A's score, the Elo difference with a 95% interval and the
+aggregate search speed.
+
+    python src/match.py --games 200 --workers 4 \\
+        --engine-a depth=4 --engine-b depth=4 quiescence=false --movetime 100
+
+Engine settings are key=value pairs: depth, time_ms, nodes, ordering,
+quiescence, pvs, aspiration, null_move, lmr, futility, backend, tt_size_mb. --movetime and --nodes set the per-move
+limits for both sides unless an engine overrides them.
+"""
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import time
+
+from engine import BACKENDS, MAX_PLY, Search
+from notation import format_pgn, parse_epd, san_line
+from game_state import GameState
+from position import START_FEN, WHITE, move_to_uci
+from transposition import TranspositionTable
+
+# Openings as moves from the initial position, each played with both colours
+DEFAULT_OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6 f1b5",
+    "e2e4 e7e5 g1f3 b8c6 f1c4 g8f6",
+    "e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4 g8f6",
+    "e2e4 c7c5 b1c3 b8c6 g2g3",
+    "e2e4 e7e6 d2d4 d7d5 b1c3 g8f6",
+    "e2e4 c7c6 d2d4 d7d5 e4e5 c8f5",
+    "d2d4 d7d5 c2c4 e7e6 b1c3 g8f6",
+    "d2d4 d7d5 c2c4 c7c6 g1f3 g8f6",
+    "d2d4 g8f6 c2c4 g7g6 b1c3 f8g7 e2e4 d7d6",
+    "d2d4 g8f6 c2c4 e7e6 b1c3 f8b4",
+    "c2c4 e7e5 b1c3 g8f6 g2g3",
+    "g1f3 d7d5 g2g3 g8f6 f1g2",
+]
+
+DEFAULT_ENGINE = {"depth": MAX_PLY, "time_ms": None, "nodes": None, "ordering": True,
+                  "quiescence": True, "pvs": True, "aspiration": True, "null_move": True,
+                  "lmr": True, "futility": True, "backend": "mailbox", "tt_size_mb": 4}
+
+# Settings passed straight through to engine.Search
+SEARCH_SWITCHES = ("ordering", "quiescence", "pvs", "aspiration", "null_move", "lmr", "futility")
+
+# Games longer than this are scored as draws
+MAX_GAME_PLIES = 400
+
+def parse_engine(pairs, defaults):
+    """Turns ["depth=4", "quiescence=false"] into an engine settings dict."""
+    engine = dict(defaults)
+    for pair in pairs or ():
+        name, _, value = pair.partition("=")
+        if name not in DEFAULT_ENGINE:
+            raise ValueError(f"Unknown engine setting: {name}")
+        try:
+            engine[name] = json.loads(value)
+        except ValueError:
+            engine[name] = value
+    if engine["depth"] == MAX_PLY and not engine["time_ms"] and not engine["nodes"]:
+        raise ValueError("Each engine needs a depth, time_ms or nodes limit")
+    return engine
+
+def load_openings(path):
+    """
+    Opening positions from a file, read lazily: one FEN/EPD per line, or a
+    line of coordinate moves from the initial position. Blank lines and
+    lines starting with # are skipped.
+    """
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+def _opening_position(opening, backend):
+    position_class = BACKENDS[backend]
+    if "/" in opening:
+        fields = opening.split()
+        if len(fields) == 6 and all(field.isdigit() for field in fields[4:]):
+            return position_class.from_fen(opening), []
+        # EPD: four position fields, then operations (counters from hmvc/fmvn)
+        fen, _ = parse_epd(opening)
+        return position_class.from_fen(fen), []
+    pos = position_class.from_fen(START_FEN)
+    moves = []
+    for text in opening.split():
+        move = pos.move_from_uci(text)
+        pos.make_move(move)
+        moves.append(move)
+    return pos, moves
+
+def play_game(task):
+    """Plays one game; task is (index, opening, a_is_white, engine_a, engine_b)."""
+    index, opening, a_is_white, engine_a, engine_b = task
+    engines = {"A": engine_a, "B": engine_b}
+    colours = ("A", "B") if a_is_white else ("B", "A")
+    tables = {name: TranspositionTable(e["tt_size_mb"]) for name, e in engines.items()}
+    nodes = {"A": 0, "B": 0}
+    seconds = {"A": 0.0, "B": 0.0}
+
+    pos, book_moves = _opening_position(opening, engine_a["backend"])
+    start_fen = pos.to_fen() if not book_moves else START_FEN
+    start_pos = pos.copy() if not book_moves else BACKENDS[engine_a["backend"]].from_fen(START_FEN)
+    moves = list(book_moves)
+    state = GameState(pos)
+    outcome = state.result()
+    while outcome is None:
+        if len(moves) - len(book_moves) >= MAX_GAME_PLIES:
+            outcome = ("1/2-1/2", "move limit")
+            break
+        name = colours[pos.side]
+        engine = engines[name]
+        search = Search(tables[name], engine["time_ms"], engine["nodes"],
+                        **{key: engine[key] for key in SEARCH_SWITCHES})
+        started = time.perf_counter()
+        _, move = search.iterate(pos, engine["depth"], history=state.previous_keys())
+        seconds[name] += time.perf_counter() - started
+        nodes[name] += search.nodes
+        state.push(move)
+        moves.append(move)
+        outcome = state.result()
+
+    result, reason = outcome
+    white, black = colours
+    headers = {"Event": "Engine match", "Round": str(index + 1),
+               "White": white, "Black": black, "Result": result}
+    black_first = False
+    if start_fen != START_FEN:
+        headers.update(SetUp="1", FEN=start_fen)
+        black_first = start_pos.side != WHITE
+    return {
+        "game": index,
+        "opening": opening,
+        "white": white,
+        "black": black,
+        "result": result,
+        "reason": reason,
+        "plies": len(moves),
+        "moves": [move_to_uci(m) for m in moves],
+        "nodes": nodes,
+        "seconds": {name: round(s, 3) for name, s in seconds.items()},
+        "pgn": format_pgn(headers, san_line(start_pos, moves), result,
+                          start_pos.fullmove, black_first),
+    }
+
+def elo_estimate(wins, draws, losses):
+    """
+    Elo difference implied by the score, with a 95% interval from the
+    per-game score variance. Returns (elo, low, high); infinite when one
+    side scored everything.
+    """
+    games = wins + draws + losses
+    if not games:
+        return 0.0, -math.inf, math.inf
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2
+                + losses * score ** 2) / games
+    margin = 1.96 * math.sqrt(variance / games)
+
+    def elo(s):
+        if s <= 0:
+            return -math.inf
+        if s >= 1:
+            return math.inf
+        return 400 * math.log10(s / (1 - s))
+
+    return elo(score), elo(score - margin), elo(score + margin)
+
+def run_match(engine_a, engine_b, openings, games, workers, pgn_path, jsonl_path):
+    """
+    Plays games games (openings repeated as needed, colours alternating) and
+    streams each result to the output files as it finishes. Returns the
+    summary dict.
+    """
+    def tasks():
+        for index, opening in zip(range(games), itertools.cycle(openings_with_colours())):
+            yield (index, opening[0], opening[1], engine_a, engine_b)
+
+    def openings_with_colours():
+        for opening in openings:
+            yield opening, True
+            yield opening, False
+
+    wins = draws = losses = 0
+    nodes = 0
+    seconds = 0.0
+    started = time.perf_counter()
+    with open(pgn_path, "w") as pgn, open(jsonl_path, "w") as jsonl, \
+            multiprocessing.Pool(workers) as pool:
+        for finished, game in enumerate(pool.imap_unordered(play_game, tasks()), 1):
+            pgn.write(game.pop("pgn") + "\n")
+            jsonl.write(json.dumps(game) + "\n")
+            pgn.flush()
+            jsonl.flush()
+            if game["result"] == "1/2-1/2":
+                draws += 1
+            elif (game["result"] == "1-0") == (game["white"] == "A"):
+                wins += 1
+            else:
+                losses += 1
+            nodes += sum(game["nodes"].values())
+            seconds += sum(game["seconds"].values())
+            elo, low, high = elo_estimate(wins, draws, losses)
+            print(f"\rGames {finished}/{games}  A: +{wins} ={draws} -{losses}  "
+                  f"Elo {elo:+.0f} [{low:+.0f}, {high:+.0f}]", end="", flush=True)
+    print()
+    elo, low, high = elo_estimate(wins, draws, losses)
+    return {
+        "games": wins + draws + losses,
+        "wins": wins, "draws": draws, "losses": losses,
+        "score": (wins + 0.5 * draws) / max(1, wins + draws + losses),
+        "elo": elo, "elo_low": low, "elo_high": high,
+        "nodes": nodes,
+        "nps": int(nodes / seconds) if seconds > 0 else 0,
+        "wall_seconds": round(time.perf_counter() - started, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Engine-vs-engine match runner")
+    parser.add_argument("--engine-a", nargs="*", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--engine-b", nargs="*", default=[], metavar="KEY=VALUE")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--movetime", type=int, help="ms per move for both engines")
+    parser.add_argument("--nodes", type=int, help="nodes per move for both engines")
+    parser.add_argument("--depth", type=int, help="depth limit for both engines")
+    parser.add_argument("--openings", help="file of FEN/EPD lines or coordinate move lines")
+    parser.add_argument("--pgn", default="match.pgn")
+    parser.add_argument("--jsonl", default="match.jsonl")
+    args = parser.parse_args()
+
+    defaults = dict(DEFAULT_ENGINE, time_ms=args.movetime, nodes=args.nodes)
+    if args.depth:
+        defaults["depth"] = args.depth
+    engine_a = parse_engine(args.engine_a, defaults)
+    engine_b = parse_engine(args.engine_b, defaults)
+    openings = list(load_openings(args.openings)) if args.openings else DEFAULT_OPENINGS
+    summary = run_match(engine_a, engine_b, openings, args.games, args.workers,
+                        args.pgn, args.jsonl)
+    print(f"A vs B: +{summary['wins']} ={summary['draws']} -{summary['losses']} "
+          f"(score {summary['score']:.1%})")
+    print(f"Elo difference: {summary['elo']:+.1f} "
+          f"(95% interval {summary['elo_low']:+.1f} to {summary['elo_high']:+.1f})")
+    print(f"{summary['nodes']} nodes at {summary['nps']} nps, "
+          f"{summary['wall_seconds']}s wall time; games in {args.pgn} and {args.jsonl}")
+
+if __name__ == "__main__":
+    main()
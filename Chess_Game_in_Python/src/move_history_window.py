@@ -1,35 +1,70 @@
+import queue
 import tkinter as tk
-from tkinter.scrolledtext import ScrolledText
 
-# Global move history list (shared with main.py)
-move_history = []
+# Moves are handed to the window through this queue; Tk widgets may only be
+# touched from the thread running the Tk main loop.
+move_queue = queue.Queue()
 
-def start_move_history_window():
-    """Starts a Tkinter window that continuously updates with the move history."""
-    # Create the main window for move history
+# How often the window checks the queue, in milliseconds
+POLL_MS = 50
+
+def publish_move(move_str):
+    """Sends one move to the history window. Safe to call from any thread."""
+    move_queue.put(move_str)
+
+def format_row(move_no, white_move, black_move=""):
+    return f"{move_no:3}.  {white_move:12}  {black_move:12}"
+
+def start_move_history_window(moves=move_queue):
+    """
+    Starts a Tkinter window that shows the moves published to the queue.
+    Each full move is one row of a Listbox, which only draws the rows in
+    view, so new moves cost the same however long the game gets.
+    """
     root = tk.Tk()
     root.title("Move History")
     root.geometry("300x400")  # You can adjust the width/height as needed
 
-    # Create a scrolled text widget for displaying moves
-    text_area = ScrolledText(root, wrap=tk.WORD, width=40, height=20, font=("Courier New", 12))
-    text_area.pack(expand=True, fill="both")
-
-    def update_text():
-        """Clear and update the move history text area with extra spacing for black moves."""
-        text_area.delete("1.0", tk.END)
-        # Insert a header
-        text_area.insert(tk.END, "No.   White Move                Black Move\n")
-        # Display moves in pairs (white and black)
-        for idx in range(0, len(move_history), 2):
-            move_no = (idx // 2) + 1
-            white_move = move_history[idx]
-            black_move = move_history[idx + 1] if idx + 1 < len(move_history) else ""
-            # Increase spacing between the white and black move columns
-            line = f"{move_no:2}.   {white_move:12}                  {black_move:12}\n"
-            text_area.insert(tk.END, line)
-        # Schedule next update after 500 milliseconds.
-        root.after(500, update_text)
-
-    update_text()
+    header = tk.Label(root, text=f"{'No':>3}   {'White':12}  {'Black':12}",
+                      font=("Courier New", 12), anchor="w")
+    header.pack(fill="x")
+    frame = tk.Frame(root)
+    frame.pack(expand=True, fill="both")
+    scrollbar = tk.Scrollbar(frame)
+    scrollbar.pack(side="right", fill="y")
+    listbox = tk.Listbox(frame, font=("Courier New", 12), activestyle="none",
+                         yscrollcommand=scrollbar.set)
+    listbox.pack(side="left", expand=True, fill="both")
+    scrollbar.config(command=listbox.yview)
+
+    # White's move of the row still waiting for Black's reply
+    pending = {"white": None, "count": 0}
+
+    def add_move(move_str):
+        move_no = pending["count"] // 2 + 1
+        if pending["count"] % 2 == 0:
+            pending["white"] = move_str
+            listbox.insert(tk.END, format_row(move_no, move_str))
+        else:
+            # Complete the last row in place
+            listbox.delete(tk.END)
+            listbox.insert(tk.END, format_row(move_no, pending["white"], move_str))
+        pending["count"] += 1
+
+    def drain():
+        """Appends whatever arrived since the last check."""
+        # Only follow the end if the user has not scrolled up to look back.
+        at_end = listbox.yview()[1] >= 1.0
+        added = False
+        while True:
+            try:
+                add_move(moves.get_nowait())
+            except queue.Empty:
+                break
+            added = True
+        if added and at_end:
+            listbox.see(tk.END)
+        root.after(POLL_MS, drain)
+
+    drain()
     root.mainloop()
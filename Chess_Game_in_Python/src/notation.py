@@ -0,0 +1,202 @@
+"""
+Standard algebraic notation (SAN), PGN and EPD for Position moves and
+positions.
+
+PGN files are read lazily: read_pgn yields one game at a time from any
+iterable of lines, so arbitrarily large collections can be streamed.
+"""
+import re
+
+from position import PAWN, KING, PIECE_CHARS, parse_square, square_name
+
+# Movetext tokens: comments, variations, NAGs, move numbers, results, moves
+_PGN_TOKEN = re.compile(r"\{[^}]*\}|;[^\n]*|\(|\)|\$\d+|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s(){};]+")
+_TAG = re.compile(r'^\[(\w+)\s+"(.*)"\]\s*$')
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+# SAN other than castling: piece, from file, from rank, target, promotion
+_SAN_MOVE = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$")
+
+def move_to_san(pos, move, legal=None):
+    """
+    SAN for a legal move in pos, e.g. 'Nbd7', 'exd6', 'e8=Q+', 'O-O'.
+    legal, the legal moves of pos, saves generating them again.
+    """
+    san = _san_body(pos, move, legal)
+    undo = pos.make_move(move)
+    if pos.in_check():
+        san += "#" if not pos.legal_moves() else "+"
+    pos.unmake_move(move, undo)
+    return san
+
+def _san_body(pos, move, legal=None):
+    # SAN without the check/mate suffix
+    board = pos.board
+    frm = move & 63
+    to = (move >> 6) & 63
+    promo = move >> 12
+    kind = board[frm] & 7
+    if kind == KING and (to - frm == 2 or frm - to == 2):
+        san = "O-O" if to > frm else "O-O-O"
+    else:
+        capture = board[to] or (kind == PAWN and to == pos.ep)
+        if kind == PAWN:
+            san = square_name(frm)[0] + "x" if capture else ""
+        else:
+            san = PIECE_CHARS[kind]
+            # Disambiguate against other pieces of the same kind reaching to.
+            if legal is None:
+                legal = pos.legal_moves()
+            rivals = [m & 63 for m in legal
+                      if (m >> 6) & 63 == to and m & 63 != frm and board[m & 63] == board[frm]]
+            if rivals:
+                if all((r & 7) != (frm & 7) for r in rivals):
+                    san += square_name(frm)[0]
+                elif all((r >> 3) != (frm >> 3) for r in rivals):
+                    san += square_name(frm)[1]
+                else:
+                    san += square_name(frm)
+            if capture:
+                san += "x"
+        san += square_name(to)
+        if promo:
+            san += "=" + PIECE_CHARS[promo]
+    return san
+
+def san_to_move(pos, san, legal=None):
+    """
+    Legal move in pos for a SAN string. Check marks and annotations are
+    ignored, and '0-0', a promotion without '=' or more disambiguation than
+    needed ('Ngf3') are accepted. legal, the legal moves of pos, saves
+    generating them again. Raises ValueError unless exactly one legal move
+    matches.
+    """
+    text = san.rstrip("+#!?").replace("0", "O")
+    if legal is None:
+        legal = pos.legal_moves()
+    board = pos.board
+    if text in ("O-O", "O-O-O"):
+        step = 2 if text == "O-O" else -2
+        matches = [m for m in legal
+                   if board[m & 63] & 7 == KING and ((m >> 6) & 63) - (m & 63) == step]
+    else:
+        parsed = _SAN_MOVE.match(text)
+        if parsed is None:
+            raise ValueError(f"Not a SAN move: {san}")
+        piece, file, rank, target, promo = parsed.groups()
+        kind = PIECE_CHARS.index(piece) if piece else PAWN
+        to = parse_square(target)
+        promo = PIECE_CHARS.index(promo) if promo else 0
+        matches = [m for m in legal
+                   if (m >> 6) & 63 == to and m >> 12 == promo and board[m & 63] & 7 == kind
+                   and (file is None or square_name(m & 63)[0] == file)
+                   and (rank is None or square_name(m & 63)[1] == rank)]
+    if len(matches) != 1:
+        raise ValueError(f"Illegal or ambiguous move: {san}")
+    return matches[0]
+
+def san_line(pos, moves):
+    """SAN for a sequence of moves played from pos; pos is left unchanged."""
+    pos = pos.copy()
+    sans = []
+    for move in moves:
+        sans.append(move_to_san(pos, move))
+        pos.make_move(move)
+    return sans
+
+def format_pgn(headers, sans, result, first_move_number=1, black_first=False):
+    """One PGN game as text: tag pairs, movetext wrapped at 80 columns, result."""
+    lines = [f'[{name} "{value}"]' for name, value in headers.items()]
+    tokens = []
+    number = first_move_number
+    for i, san in enumerate(sans):
+        white_to_move = (i % 2 == 0) != black_first
+        if white_to_move:
+            tokens.append(f"{number}.")
+        elif i == 0:
+            tokens.append(f"{number}...")
+        tokens.append(san)
+        if not white_to_move:
+            number += 1
+    tokens.append(result)
+    movetext = []
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > 80:
+            movetext.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    movetext.append(line)
+    return "\n".join(lines) + "\n\n" + "\n".join(movetext) + "\n"
+
+def read_pgn(lines):
+    """
+    Yields (headers, movetext) for each game in an iterable of PGN lines,
+    holding only one game in memory at a time.
+    """
+    headers = {}
+    movetext = []
+    for line in lines:
+        line = line.strip()
+        match = _TAG.match(line)
+        if match:
+            if movetext:
+                yield headers, " ".join(movetext)
+                headers, movetext = {}, []
+            headers[match.group(1)] = match.group(2)
+        elif line and not line.startswith("%"):
+            movetext.append(line)
+            if line.split()[-1] in RESULTS:
+                yield headers, " ".join(movetext)
+                headers, movetext = {}, []
+    if headers or movetext:
+        yield headers, " ".join(movetext)
+
+def parse_movetext(pos, movetext):
+    """
+    Moves of the main line of a PGN movetext, played from pos (which is left
+    unchanged). Comments, variations and NAGs are skipped.
+    """
+    pos = pos.copy()
+    moves = []
+    depth = 0
+    for token in _PGN_TOKEN.findall(movetext):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth or token[0] in "{;$" or token[0].isdigit() and token.endswith(".") \
+                or token in RESULTS:
+            continue
+        else:
+            move = san_to_move(pos, token)
+            pos.make_move(move)
+            moves.append(move)
+    return moves
+
+def parse_epd(line):
+    """
+    Splits an EPD line into (fen, operations). The FEN gets halfmove and
+    fullmove counters from the hmvc/fmvn operations, or 0 and 1.
+    operations maps each opcode to its operand string, quotes removed.
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError(f"EPD needs four position fields: {line}")
+    operations = {}
+    for op in (fields[4] if len(fields) > 4 else "").split(";"):
+        op = op.strip()
+        if op:
+            opcode, _, operand = op.partition(" ")
+            operations[opcode] = operand.strip().strip('"')
+    fen = " ".join(fields[:4] + [operations.get("hmvc", "0"), operations.get("fmvn", "1")])
+    return fen, operations
+
+def format_epd(pos, operations=None):
+    """EPD for pos: the first four FEN fields followed by 'opcode operand;' pairs."""
+    epd = " ".join(pos.to_fen().split()[:4])
+    for opcode, operand in (operations or {}).items():
+        if " " in str(operand) and not str(operand).startswith('"'):
+            operand = f'"{operand}"'
+        epd += f" {opcode} {operand};"
+    return epd
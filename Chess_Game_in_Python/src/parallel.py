@@ -0,0 +1,249 @@
+"""
+Parallel root search across CPU cores.
+
+Root moves are shared out to a pool of worker processes, one move per task.
+The best score found so far is kept in a shared Value, so every root move
+starts with the tightest window known when it is picked up. The first root
+move is searched on its own before the rest are handed out, so the others
+never start with an open window ("young brothers wait"). Each worker keeps
+its own transposition table between tasks and moves.
+
+A node limit covers all workers together: the nodes searched so far are
+kept in another shared Value, and each task may use what is left (the
+first root move all of it, the others a share per worker). A task that
+runs out stops the whole depth, as running out of time does.
+
+Run this file directly for a scaling benchmark:
+
+    python src/parallel.py --depth 4 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import time
+
+from engine import BACKENDS, SELECTIVITY, Search, SearchAborted, mvv_lva
+from game import init_board, make_move, algebraic_to_index
+from game_state import GameState
+from position import Position, WHITE, move_to_tuple
+from tablebase import Tablebases
+from transposition import TranspositionTable
+
+# Per-process state set up by _init_worker
+_worker = {}
+
+def _init_worker(bound, best_index, nodes_used, lock, stop_event, options):
+    _worker.update(bound=bound, best_index=best_index, nodes_used=nodes_used, lock=lock,
+                   stop_event=stop_event, options=options)
+    _worker["tt"] = TranspositionTable(options["tt_size_mb"], options["tt_replacement"])
+    path = options.get("tablebase_path")
+    _worker["tablebases"] = Tablebases(path) if path else None
+
+def _search_root_move(task):
+    fen, history, index, move, depth, node_limit = task
+    options = _worker["options"]
+    bound = _worker["bound"]
+    nodes_used = _worker["nodes_used"]
+    pos = BACKENDS[options["backend"]].from_fen(fen)
+    maximizing = pos.side == WHITE
+    nodes = None
+    if node_limit:
+        nodes = max(1, int(node_limit - nodes_used.value))
+        if index:
+            nodes = max(1, nodes // options["search_workers"])
+    search = Search(_worker["tt"], nodes=nodes, ordering=options["ordering"],
+                    quiescence=options["quiescence"], stop_event=_worker["stop_event"],
+                    tablebases=_worker["tablebases"],
+                    **{key: options.get(key, True) for key in SELECTIVITY})
+    # The search starts below the root, so the root counts as played.
+    search.set_history(list(history) + [pos.key])
+    # Depth 1 always completes so there is a move to fall back on.
+    search.abortable = depth > 1
+    pos.make_move(move)
+    try:
+        if maximizing:
+            score, _ = search.alphabeta(pos, depth - 1, bound.value, float("inf"), False, 1)
+        else:
+            score, _ = search.alphabeta(pos, depth - 1, -float("inf"), bound.value, True, 1)
+    except SearchAborted:
+        with _worker["lock"]:
+            nodes_used.value += search.nodes
+        # Out of nodes: the other tasks of this depth stop too.
+        _worker["stop_event"].set()
+        return index, None, search.nodes, search.cutoffs, search.first_move_cutoffs
+    with _worker["lock"]:
+        nodes_used.value += search.nodes
+        if (score > bound.value) if maximizing else (score < bound.value):
+            bound.value = score
+            _worker["best_index"].value = index
+    return index, score, search.nodes, search.cutoffs, search.first_move_cutoffs
+
+class ParallelSearch:
+    """
+    Pool of search processes. options takes the same keys as the
+    search_worker options (backend, ordering, quiescence, tt_size_mb,
+    tt_replacement, tablebase_path and the engine.SELECTIVITY switches);
+    unknown keys are ignored. workers is also stored in the options as
+    search_workers.
+    """
+
+    def __init__(self, workers, options):
+        self.workers = workers
+        self.options = options = dict(options, search_workers=workers)
+        self.bound = multiprocessing.Value("d", 0.0, lock=False)
+        self.best_index = multiprocessing.Value("i", -1, lock=False)
+        self.nodes_used = multiprocessing.Value("d", 0.0, lock=False)
+        self.lock = multiprocessing.Lock()
+        self.stop_event = multiprocessing.Event()
+        self.pool = multiprocessing.Pool(
+            workers, initializer=_init_worker,
+            initargs=(self.bound, self.best_index, self.nodes_used, self.lock, self.stop_event,
+                      options),
+        )
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def search(self, board, max_depth, maximizing, time_ms=None, info=None, stop_event=None,
+               root_moves=None, nodes=None):
+        """
+        Iterative deepening over parallel root searches. Returns the score and
+        ((row, col), (row, col)) move of the last completed depth. root_moves
+        are the legal moves of the root if the caller already has them.
+        nodes limits the nodes searched by all workers together.
+
+        board is a list-of-lists board or a GameState. The workers are sent
+        the FEN, so a GameState keeps its castling rights, en passant square
+        and halfmove clock, and its earlier positions count as repetitions;
+        maximizing is then taken from it.
+        """
+        if isinstance(board, GameState):
+            fen, history = board.to_fen(), board.previous_keys()
+            maximizing = board.pos.side == WHITE
+        else:
+            fen = Position.from_board(board, "white" if maximizing else "black").to_fen()
+            history = []
+        color = "white" if maximizing else "black"
+        pos = BACKENDS[self.options["backend"]].from_fen(fen)
+        root_moves = list(root_moves) if root_moves is not None else pos.legal_moves()
+        if not root_moves:
+            return None, None
+        root_moves.sort(key=lambda m: mvv_lva(pos.board[(m >> 6) & 63], pos.board[m & 63]), reverse=True)
+
+        start = time.perf_counter()
+        deadline = start + time_ms / 1000 if time_ms else None
+        best_score, best_move = None, None
+        self.nodes_used.value = 0
+        for depth in range(1, max_depth + 1):
+            if depth > 1 and nodes and self.nodes_used.value >= nodes:
+                break
+            result = self._search_depth(fen, history, color, root_moves, depth, deadline,
+                                        stop_event, nodes)
+            if result is None:
+                break
+            score, index, cutoffs, first_cutoffs = result
+            searched = int(self.nodes_used.value)
+            best_score, best_move = score, root_moves[index]
+            # The best move is searched first (and alone) at the next depth.
+            root_moves.insert(0, root_moves.pop(index))
+            elapsed = time.perf_counter() - start
+            if info is not None:
+                info({
+                    "depth": depth,
+                    "score": score,
+                    "nodes": searched,
+                    "time_ms": int(elapsed * 1000),
+                    "nps": int(searched / elapsed) if elapsed > 0 else 0,
+                    "pv": [best_move],
+                    "first_move_cutoff_rate": first_cutoffs / cutoffs if cutoffs else 0.0,
+                })
+            if time_ms and elapsed * 1000 > time_ms / 2:
+                break
+        return best_score, (move_to_tuple(best_move) if best_move is not None else None)
+
+    def _search_depth(self, fen, history, color, root_moves, depth, deadline, stop_event,
+                      nodes):
+        maximizing = color == "white"
+        self.bound.value = -float("inf") if maximizing else float("inf")
+        self.best_index.value = -1
+        self.stop_event.clear()
+        tasks = [(fen, history, index, move, depth, nodes) for index, move in enumerate(root_moves)]
+
+        results = []
+        for batch in (tasks[:1], tasks[1:]):
+            if not batch:
+                continue
+            pending = self.pool.map_async(_search_root_move, batch)
+            while True:
+                remaining = 0.05
+                if deadline is not None:
+                    remaining = min(remaining, max(0.0, deadline - time.perf_counter()))
+                pending.wait(remaining)
+                if pending.ready():
+                    break
+                out_of_time = deadline is not None and time.perf_counter() >= deadline
+                if out_of_time or (stop_event is not None and stop_event.is_set()):
+                    self.stop_event.set()
+                    pending.wait()
+                    break
+            results.extend(pending.get())
+            if self.stop_event.is_set() and depth > 1:
+                return None
+
+        if self.best_index.value < 0:
+            return None
+        cutoffs = sum(r[3] for r in results)
+        first_cutoffs = sum(r[4] for r in results)
+        return int(self.bound.value), self.best_index.value, cutoffs, first_cutoffs
+
+# -----------------------------------------------------------------------------
+# Scaling benchmark
+# -----------------------------------------------------------------------------
+
+# Openings played from the initial position, white to move after each
+BENCH_OPENINGS = [
+    [],
+    ["e2e4", "e7e5", "g1f3", "b8c6", "f1c4", "g8f6"],
+    ["d2d4", "d7d5", "c2c4", "e7e6", "b1c3", "g8f6"],
+    ["e2e4", "c7c5", "g1f3", "d7d6", "d2d4", "c5d4", "f3d4", "g8f6"],
+]
+
+def bench_boards():
+    boards = []
+    for moves in BENCH_OPENINGS:
+        board = init_board()
+        for move in moves:
+            board = make_move(board, (algebraic_to_index(move[:2]), algebraic_to_index(move[2:])))
+        boards.append(board)
+    return boards
+
+def scaling_benchmark(depth=4, worker_counts=(1, 2, 4, 8)):
+    options = {"backend": "mailbox", "ordering": True, "quiescence": True,
+               "tt_size_mb": 16, "tt_replacement": "depth"}
+    boards = bench_boards()
+    baseline = None
+    print(f"{'workers':>7} {'time (s)':>9} {'nodes':>9} {'nps':>8} {'speedup':>8}")
+    for workers in worker_counts:
+        search = ParallelSearch(workers, options)
+        nodes = 0
+
+        def count(info):
+            nonlocal nodes
+            if info["depth"] == depth:
+                nodes += info["nodes"]
+
+        start = time.perf_counter()
+        for board in boards:
+            search.search(board, depth, True, info=count)
+        elapsed = time.perf_counter() - start
+        search.close()
+        if baseline is None:
+            baseline = elapsed
+        print(f"{workers:>7} {elapsed:>9.2f} {nodes:>9} {int(nodes / elapsed):>8} {baseline / elapsed:>7.2f}x")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel root search scaling benchmark")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+    scaling_benchmark(args.depth, args.workers)
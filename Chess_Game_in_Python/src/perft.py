@@ -0,0 +1,128 @@
+"""
+Perft: counts the leaf nodes of the legal move tree and compares them with the
+published numbers for a set of reference positions. A mismatch means the move
+generator or make/unmake is wrong; the timings double as a generator benchmark.
+
+    python src/perft.py                                   # whole suite, depth 3
+    python src/perft.py --depth 4 --backend bitboard --output perft.json
+    python src/perft.py --divide "<fen>" --depth 3        # per-move counts
+
+Results are written as JSON (default perft_results.json) and the exit status
+is non-zero if any count is wrong.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from engine import BACKENDS
+from position import START_FEN, move_to_uci
+
+# (name, FEN, node counts for depth 1, 2, ...) from the Chess Programming Wiki
+REFERENCE_POSITIONS = [
+    ("startpos", START_FEN,
+     [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+def perft(pos, depth):
+    """Number of leaf nodes depth plies below pos. The last ply is bulk-counted."""
+    if depth == 0:
+        return 1
+    moves = pos.legal_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        undo = pos.make_move(move)
+        nodes += perft(pos, depth - 1)
+        pos.unmake_move(move, undo)
+    return nodes
+
+def divide(pos, depth):
+    """Perft split by root move, as {uci_move: nodes}, for tracking down bugs."""
+    counts = {}
+    for move in pos.legal_moves():
+        undo = pos.make_move(move)
+        counts[move_to_uci(move)] = perft(pos, depth - 1)
+        pos.unmake_move(move, undo)
+    return counts
+
+def run_suite(depth, backend="mailbox"):
+    """
+    Runs every reference position to depth (or its deepest known count, if
+    smaller) and returns one result dict per position.
+    """
+    results = []
+    for name, fen, expected_counts in REFERENCE_POSITIONS:
+        position_depth = min(depth, len(expected_counts))
+        pos = BACKENDS[backend].from_fen(fen)
+        start = time.perf_counter()
+        nodes = perft(pos, position_depth)
+        elapsed = time.perf_counter() - start
+        expected = expected_counts[position_depth - 1]
+        results.append({
+            "name": name,
+            "fen": fen,
+            "depth": position_depth,
+            "nodes": nodes,
+            "expected": expected,
+            "passed": nodes == expected,
+            "seconds": round(elapsed, 4),
+            "nps": int(nodes / elapsed) if elapsed > 0 else 0,
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft move generator test and benchmark")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mailbox")
+    parser.add_argument("--output", default="perft_results.json",
+                        help="JSON results file (suite mode only)")
+    parser.add_argument("--divide", metavar="FEN", help="print per-move counts for FEN")
+    args = parser.parse_args()
+
+    if args.divide:
+        counts = divide(BACKENDS[args.backend].from_fen(args.divide), args.depth)
+        for move, nodes in sorted(counts.items()):
+            print(f"{move}: {nodes}")
+        print(f"\nMoves: {len(counts)}\nNodes: {sum(counts.values())}")
+        return 0
+
+    results = run_suite(args.depth, args.backend)
+    print(f"{'position':<10} {'depth':>5} {'nodes':>10} {'expected':>10} {'seconds':>8} {'nps':>8}")
+    for r in results:
+        status = "ok" if r["passed"] else "FAIL"
+        print(f"{r['name']:<10} {r['depth']:>5} {r['nodes']:>10} {r['expected']:>10} "
+              f"{r['seconds']:>8.2f} {r['nps']:>8}  {status}")
+    total_nodes = sum(r["nodes"] for r in results)
+    total_seconds = sum(r["seconds"] for r in results)
+    summary = {
+        "backend": args.backend,
+        "depth": args.depth,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "passed": all(r["passed"] for r in results),
+        "total_nodes": total_nodes,
+        "total_seconds": round(total_seconds, 4),
+        "nps": int(total_nodes / total_seconds) if total_seconds > 0 else 0,
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"\nTotal: {total_nodes} nodes in {total_seconds:.2f}s ({summary['nps']} nps), "
+          f"written to {args.output}")
+    return 0 if summary["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,721 @@
+"""
+Compact board representation used by the engine.
+
+The board is a flat 64-entry bytearray indexed by ``row * 8 + col`` with the
+same orientation as the list-of-lists board in game.py (row 0 is black's back
+rank). Pieces are small integers: the low three bits hold the piece type and
+bit 3 holds the colour. Moves are plain integers packing the from square, the
+to square and an optional promotion piece type, and are applied in place with
+make_move()/unmake_move() instead of copying the board.
+"""
+import random
+
+from evaluation import MG_TABLE, EG_TABLE, PHASE_TABLE, compute_terms
+
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+WHITE, BLACK = 0, 1
+
+COLOR_NAMES = ("white", "black")
+PIECE_CHARS = ".PNBRQK..pnbrqk"
+CHAR_TO_PIECE = {c: i for i, c in enumerate(PIECE_CHARS) if c != '.'}
+
+# Castling rights bits
+WHITE_KINGSIDE, WHITE_QUEENSIDE = 1, 2
+BLACK_KINGSIDE, BLACK_QUEENSIDE = 4, 8
+CASTLING_CHARS = (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                  ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE))
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# Promotion pieces, already shifted into place in the move encoding
+PROMOTION_FLAGS = (QUEEN << 12, ROOK << 12, BISHOP << 12, KNIGHT << 12)
+
+def square(row, col):
+    return row * 8 + col
+
+def make_piece(color, kind):
+    return kind | (color << 3)
+
+def encode_move(frm, to, promo=0):
+    return frm | (to << 6) | (promo << 12)
+
+def move_from(move):
+    return move & 63
+
+def move_to(move):
+    return (move >> 6) & 63
+
+def move_promo(move):
+    return move >> 12
+
+def square_name(sq):
+    return "abcdefgh"[sq & 7] + str(8 - (sq >> 3))
+
+def parse_square(name):
+    if len(name) != 2 or name[0] not in "abcdefgh" or name[1] not in "12345678":
+        raise ValueError(f"Invalid square: {name}")
+    return square(8 - int(name[1]), ord(name[0]) - ord('a'))
+
+def move_to_uci(move):
+    """Coordinate notation, e.g. 'e2e4' or 'e7e8q'."""
+    promo = move >> 12
+    text = square_name(move & 63) + square_name((move >> 6) & 63)
+    return text + PIECE_CHARS[promo + 8] if promo else text
+
+def move_to_tuple(move):
+    """Converts an encoded move into the ((row, col), (row, col)) form used by game.py."""
+    frm = move & 63
+    to = (move >> 6) & 63
+    return ((frm >> 3, frm & 7), (to >> 3, to & 7))
+
+# -----------------------------------------------------------------------------
+# Precomputed tables
+# -----------------------------------------------------------------------------
+
+KNIGHT_OFFSETS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1)]
+KING_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+def _leaper_targets(offsets):
+    table = []
+    for sq in range(64):
+        row, col = sq >> 3, sq & 7
+        table.append(tuple(square(row + dr, col + dc) for dr, dc in offsets
+                           if 0 <= row + dr < 8 and 0 <= col + dc < 8))
+    return table
+
+def _rays(directions):
+    table = []
+    for sq in range(64):
+        rays = []
+        for dr, dc in directions:
+            ray = []
+            row, col = (sq >> 3) + dr, (sq & 7) + dc
+            while 0 <= row < 8 and 0 <= col < 8:
+                ray.append(square(row, col))
+                row += dr
+                col += dc
+            if ray:
+                rays.append(tuple(ray))
+        table.append(tuple(rays))
+    return table
+
+KNIGHT_TARGETS = _leaper_targets(KNIGHT_OFFSETS)
+KING_TARGETS = _leaper_targets(KING_OFFSETS)
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+QUEEN_RAYS = [b + r for b, r in zip(BISHOP_RAYS, ROOK_RAYS)]
+SLIDER_RAYS = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}
+DIAGONAL_SLIDERS = (BISHOP, QUEEN)
+STRAIGHT_SLIDERS = (ROOK, QUEEN)
+
+# Squares a pawn of the given colour captures on, indexed [color][square]
+PAWN_CAPTURES = (
+    _leaper_targets([(-1, -1), (-1, 1)]),
+    _leaper_targets([(1, -1), (1, 1)]),
+)
+
+ALL_SQUARES = (1 << 64) - 1
+
+E1, H1, A1, E8, H8, A8 = 60, 63, 56, 4, 7, 0
+
+# Rights that survive a move touching the square (king or rook leaving/captured)
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[E1] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLING_MASK[H1] = 15 & ~WHITE_KINGSIDE
+CASTLING_MASK[A1] = 15 & ~WHITE_QUEENSIDE
+CASTLING_MASK[E8] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLING_MASK[H8] = 15 & ~BLACK_KINGSIDE
+CASTLING_MASK[A8] = 15 & ~BLACK_QUEENSIDE
+
+# King destination -> (rook from, rook to)
+CASTLING_ROOKS = {62: (63, 61), 58: (56, 59), 6: (7, 5), 2: (0, 3)}
+
+# Zobrist keys, from a fixed seed so keys are stable between runs
+_zobrist_rng = random.Random(20240601)
+ZOBRIST_PIECES = [[0] * 64 if piece_char == '.' else [_zobrist_rng.getrandbits(64) for _ in range(64)]
+                  for piece_char in PIECE_CHARS]
+ZOBRIST_SIDE = _zobrist_rng.getrandbits(64)
+ZOBRIST_CASTLING = [_zobrist_rng.getrandbits(64) for _ in range(16)]
+ZOBRIST_EP = [_zobrist_rng.getrandbits(64) for _ in range(64)]
+
+# -----------------------------------------------------------------------------
+# Position
+# -----------------------------------------------------------------------------
+
+class Position:
+    __slots__ = ("board", "side", "castling", "ep", "halfmove", "fullmove",
+                 "king_sq", "key", "mg", "eg", "phase")
+
+    def __init__(self):
+        self.board = bytearray(64)
+        self.side = WHITE
+        self.castling = 0
+        self.ep = -1          # en passant target square, -1 if no pawn can capture there
+        self.halfmove = 0     # plies since the last capture or pawn move
+        self.fullmove = 1
+        self.king_sq = [-1, -1]
+        self.key = 0
+        self.mg = 0
+        self.eg = 0
+        self.phase = 0
+
+    @classmethod
+    def from_board(cls, board, color="white"):
+        """Builds a position from a list-of-lists board and the side to move."""
+        pos = cls()
+        for row in range(8):
+            for col in range(8):
+                piece = CHAR_TO_PIECE.get(board[row][col], EMPTY)
+                pos.board[square(row, col)] = piece
+        pos.side = WHITE if color == "white" else BLACK
+        pos._infer_castling()
+        pos._setup()
+        return pos
+
+    @classmethod
+    def from_fen(cls, fen):
+        """Builds a position from a FEN string; missing trailing fields take defaults."""
+        fields = fen.split()
+        if not fields:
+            raise ValueError("Empty FEN")
+        fields += ["w", "-", "-", "0", "1"][len(fields) - 1:]
+        placement, side, castling, ep, halfmove, fullmove = fields[:6]
+        pos = cls()
+        rows = placement.split("/")
+        if len(rows) != 8:
+            raise ValueError(f"FEN needs 8 ranks: {fen}")
+        for row, text in enumerate(rows):
+            col = 0
+            for ch in text:
+                if ch.isdigit():
+                    col += int(ch)
+                elif ch in CHAR_TO_PIECE and col < 8:
+                    pos.board[square(row, col)] = CHAR_TO_PIECE[ch]
+                    col += 1
+                else:
+                    raise ValueError(f"Invalid FEN rank '{text}': {fen}")
+            if col != 8:
+                raise ValueError(f"Invalid FEN rank '{text}': {fen}")
+        if side not in ("w", "b"):
+            raise ValueError(f"Invalid side to move '{side}': {fen}")
+        pos.side = WHITE if side == "w" else BLACK
+        for ch, right in CASTLING_CHARS:
+            if ch in castling:
+                pos.castling |= right
+        pos.ep = -1 if ep == "-" else parse_square(ep)
+        if pos.ep >= 0:
+            # As in make_move, the square is kept only if a pawn can capture on it.
+            pawn_sq = pos.ep + 8 if pos.side == WHITE else pos.ep - 8
+            if not 0 <= pawn_sq < 64 or not pos._ep_capturable(pawn_sq, pos.side):
+                pos.ep = -1
+        pos.halfmove = int(halfmove)
+        pos.fullmove = int(fullmove)
+        pos._setup()
+        return pos
+
+    def to_fen(self):
+        board = self.board
+        rows = []
+        for row in range(8):
+            text = ""
+            empty = 0
+            for col in range(8):
+                piece = board[row * 8 + col]
+                if piece:
+                    if empty:
+                        text += str(empty)
+                        empty = 0
+                    text += PIECE_CHARS[piece]
+                else:
+                    empty += 1
+            if empty:
+                text += str(empty)
+            rows.append(text)
+        castling = "".join(ch for ch, right in CASTLING_CHARS if self.castling & right) or "-"
+        ep = square_name(self.ep) if self.ep >= 0 else "-"
+        return (f"{'/'.join(rows)} {'w' if self.side == WHITE else 'b'} {castling} {ep} "
+                f"{self.halfmove} {self.fullmove}")
+
+    def _setup(self):
+        """Derives king squares, the Zobrist key and evaluation terms from the board."""
+        self._find_kings()
+        self.key = self.compute_key()
+        self.mg, self.eg, self.phase = compute_terms(self.board)
+
+    def to_board(self):
+        """Returns the position as a list-of-lists board."""
+        board = self.board
+        return [[PIECE_CHARS[board[row * 8 + col]] for col in range(8)] for row in range(8)]
+
+    def copy(self):
+        pos = Position.__new__(type(self))
+        pos.board = bytearray(self.board)
+        pos.side = self.side
+        pos.castling = self.castling
+        pos.ep = self.ep
+        pos.halfmove = self.halfmove
+        pos.fullmove = self.fullmove
+        pos.king_sq = list(self.king_sq)
+        pos.key = self.key
+        pos.mg = self.mg
+        pos.eg = self.eg
+        pos.phase = self.phase
+        return pos
+
+    def _infer_castling(self):
+        # A list board carries no history, so king and rook on their home
+        # squares is taken to mean the right is still available.
+        board = self.board
+        rights = 0
+        if board[E1] == make_piece(WHITE, KING):
+            if board[H1] == make_piece(WHITE, ROOK):
+                rights |= WHITE_KINGSIDE
+            if board[A1] == make_piece(WHITE, ROOK):
+                rights |= WHITE_QUEENSIDE
+        if board[E8] == make_piece(BLACK, KING):
+            if board[H8] == make_piece(BLACK, ROOK):
+                rights |= BLACK_KINGSIDE
+            if board[A8] == make_piece(BLACK, ROOK):
+                rights |= BLACK_QUEENSIDE
+        self.castling = rights
+
+    def _ep_capturable(self, pawn_sq, side):
+        """
+        Whether a pawn of side stands beside pawn_sq, where a pawn has just
+        moved two squares. Only then is the en passant square set and hashed
+        (the Polyglot rule), so a position reached by a double push has the
+        same key as when it is reached by other moves.
+        """
+        board = self.board
+        pawn = make_piece(side, PAWN)
+        col = pawn_sq & 7
+        return (col > 0 and board[pawn_sq - 1] == pawn) or (col < 7 and board[pawn_sq + 1] == pawn)
+
+    def _find_kings(self):
+        self.king_sq = [-1, -1]
+        for sq, piece in enumerate(self.board):
+            if piece & 7 == KING:
+                self.king_sq[piece >> 3] = sq
+
+    def compute_key(self):
+        """Zobrist key computed from scratch; make_move keeps self.key in step."""
+        key = ZOBRIST_CASTLING[self.castling]
+        if self.side == BLACK:
+            key ^= ZOBRIST_SIDE
+        if self.ep >= 0:
+            key ^= ZOBRIST_EP[self.ep]
+        for sq, piece in enumerate(self.board):
+            if piece:
+                key ^= ZOBRIST_PIECES[piece][sq]
+        return key
+
+    @property
+    def color(self):
+        return COLOR_NAMES[self.side]
+
+    def move_from_tuple(self, move):
+        """Encodes a ((row, col), (row, col)) move, promoting pawns to queens."""
+        (start, end) = move
+        frm = square(start[0], start[1])
+        to = square(end[0], end[1])
+        promo = 0
+        if self.board[frm] & 7 == PAWN and (to < 8 or to >= 56):
+            promo = QUEEN
+        return encode_move(frm, to, promo)
+
+    def move_from_uci(self, text):
+        """Legal move for coordinate notation such as 'e2e4' or 'a7a8n'."""
+        for move in self.legal_moves():
+            if move_to_uci(move) == text:
+                return move
+        raise ValueError(f"Illegal move: {text}")
+
+    # -------------------------------------------------------------------------
+    # Make / unmake
+    # -------------------------------------------------------------------------
+
+    def make_move(self, move):
+        """Plays move in place and returns the record needed to undo it."""
+        board = self.board
+        frm = move & 63
+        to = (move >> 6) & 63
+        promo = move >> 12
+        piece = board[frm]
+        captured = board[to]
+        castling = self.castling
+        ep = self.ep
+        undo = (captured, castling, self.key, self.mg, self.eg, self.phase, ep, self.halfmove)
+
+        placed = (piece & 8) | promo if promo else piece
+        board[frm] = EMPTY
+        board[to] = placed
+        key = self.key ^ ZOBRIST_PIECES[piece][frm] ^ ZOBRIST_PIECES[placed][to] ^ ZOBRIST_SIDE
+        self.mg += MG_TABLE[placed][to] - MG_TABLE[piece][frm] - MG_TABLE[captured][to]
+        self.eg += EG_TABLE[placed][to] - EG_TABLE[piece][frm] - EG_TABLE[captured][to]
+        self.halfmove += 1
+        if captured:
+            key ^= ZOBRIST_PIECES[captured][to]
+            self.phase -= PHASE_TABLE[captured]
+            self.halfmove = 0
+        if promo:
+            self.phase += PHASE_TABLE[placed]
+        if ep >= 0:
+            key ^= ZOBRIST_EP[ep]
+            self.ep = -1
+
+        kind = piece & 7
+        if kind == PAWN:
+            self.halfmove = 0
+            if to == ep:
+                victim_sq = to + 8 if piece >> 3 == WHITE else to - 8
+                victim = board[victim_sq]
+                board[victim_sq] = EMPTY
+                key ^= ZOBRIST_PIECES[victim][victim_sq]
+                self.mg -= MG_TABLE[victim][victim_sq]
+                self.eg -= EG_TABLE[victim][victim_sq]
+            elif (to - frm == 16 or frm - to == 16) and self._ep_capturable(to, (piece >> 3) ^ 1):
+                self.ep = (frm + to) >> 1
+                key ^= ZOBRIST_EP[self.ep]
+        elif kind == KING:
+            self.king_sq[piece >> 3] = to
+            if to - frm == 2 or frm - to == 2:
+                rook_from, rook_to = CASTLING_ROOKS[to]
+                rook = board[rook_from]
+                board[rook_to] = rook
+                board[rook_from] = EMPTY
+                key ^= ZOBRIST_PIECES[rook][rook_from] ^ ZOBRIST_PIECES[rook][rook_to]
+                self.mg += MG_TABLE[rook][rook_to] - MG_TABLE[rook][rook_from]
+                self.eg += EG_TABLE[rook][rook_to] - EG_TABLE[rook][rook_from]
+        self.castling = castling & CASTLING_MASK[frm] & CASTLING_MASK[to]
+        if self.castling != castling:
+            key ^= ZOBRIST_CASTLING[castling] ^ ZOBRIST_CASTLING[self.castling]
+        self.key = key
+        if self.side == BLACK:
+            self.fullmove += 1
+        self.side ^= 1
+        return undo
+
+    def unmake_move(self, move, undo):
+        board = self.board
+        frm = move & 63
+        to = (move >> 6) & 63
+        self.side ^= 1
+        if self.side == BLACK:
+            self.fullmove -= 1
+        piece = board[to]
+        if move >> 12:
+            piece = make_piece(self.side, PAWN)
+        board[frm] = piece
+        board[to] = undo[0]
+        self.castling = undo[1]
+        self.key = undo[2]
+        self.mg = undo[3]
+        self.eg = undo[4]
+        self.phase = undo[5]
+        self.ep = undo[6]
+        self.halfmove = undo[7]
+        kind = piece & 7
+        if kind == PAWN:
+            if to == self.ep:
+                victim_sq = to + 8 if self.side == WHITE else to - 8
+                board[victim_sq] = make_piece(self.side ^ 1, PAWN)
+        elif kind == KING:
+            self.king_sq[piece >> 3] = frm
+            if to - frm == 2 or frm - to == 2:
+                rook_from, rook_to = CASTLING_ROOKS[to]
+                board[rook_from] = board[rook_to]
+                board[rook_to] = EMPTY
+
+    def make_null_move(self):
+        """Passes the turn, for null-move pruning. Returns the record to undo it."""
+        undo = (self.ep, self.key)
+        key = self.key ^ ZOBRIST_SIDE
+        if self.ep >= 0:
+            key ^= ZOBRIST_EP[self.ep]
+            self.ep = -1
+        self.key = key
+        self.side ^= 1
+        return undo
+
+    def unmake_null_move(self, undo):
+        self.side ^= 1
+        self.ep, self.key = undo
+
+    def has_non_pawn_material(self, color):
+        """Whether color has a knight, bishop, rook or queen."""
+        for piece in self.board:
+            if piece and piece >> 3 == color and KNIGHT <= piece & 7 <= QUEEN:
+                return True
+        return False
+
+    # -------------------------------------------------------------------------
+    # Move generation
+    # -------------------------------------------------------------------------
+
+    def pseudo_legal_moves(self):
+        board = self.board
+        side = self.side
+        ep = self.ep
+        moves = []
+        append = moves.append
+        for frm in range(64):
+            piece = board[frm]
+            if not piece or piece >> 3 != side:
+                continue
+            kind = piece & 7
+            if kind == PAWN:
+                if side == WHITE:
+                    to = frm - 8
+                    last_rank = to < 8
+                    double = frm >= 48 and to - 8
+                else:
+                    to = frm + 8
+                    last_rank = to >= 56
+                    double = frm < 16 and to + 8
+                if not board[to]:
+                    if last_rank:
+                        for promo in PROMOTION_FLAGS:
+                            append(frm | to << 6 | promo)
+                    else:
+                        append(frm | to << 6)
+                        if double and not board[double]:
+                            append(frm | double << 6)
+                for to in PAWN_CAPTURES[side][frm]:
+                    target = board[to]
+                    if target and target >> 3 != side:
+                        if last_rank:
+                            for promo in PROMOTION_FLAGS:
+                                append(frm | to << 6 | promo)
+                        else:
+                            append(frm | to << 6)
+                    elif to == ep:
+                        append(frm | to << 6)
+            elif kind == KNIGHT:
+                for to in KNIGHT_TARGETS[frm]:
+                    target = board[to]
+                    if not target or target >> 3 != side:
+                        append(frm | to << 6)
+            elif kind == KING:
+                for to in KING_TARGETS[frm]:
+                    target = board[to]
+                    if not target or target >> 3 != side:
+                        append(frm | to << 6)
+                self._castling_moves(frm, append)
+            else:
+                for ray in SLIDER_RAYS[kind][frm]:
+                    for to in ray:
+                        target = board[to]
+                        if not target:
+                            append(frm | to << 6)
+                        else:
+                            if target >> 3 != side:
+                                append(frm | to << 6)
+                            break
+        return moves
+
+    def pseudo_legal_captures(self):
+        """
+        Pseudo-legal captures plus pawn pushes that promote; no quiet moves are
+        built. Promotions are to a queen only, which is all the quiescence
+        search looks at.
+        """
+        board = self.board
+        side = self.side
+        ep = self.ep
+        moves = []
+        append = moves.append
+        for frm in range(64):
+            piece = board[frm]
+            if not piece or piece >> 3 != side:
+                continue
+            kind = piece & 7
+            if kind == PAWN:
+                to = frm - 8 if side == WHITE else frm + 8
+                promo = QUEEN << 12 if to < 8 or to >= 56 else 0
+                if promo and not board[to]:
+                    append(frm | to << 6 | promo)
+                for to in PAWN_CAPTURES[side][frm]:
+                    target = board[to]
+                    if target and target >> 3 != side:
+                        append(frm | to << 6 | promo)
+                    elif to == ep:
+                        append(frm | to << 6)
+            elif kind == KNIGHT or kind == KING:
+                for to in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[frm]:
+                    target = board[to]
+                    if target and target >> 3 != side:
+                        append(frm | to << 6)
+            else:
+                for ray in SLIDER_RAYS[kind][frm]:
+                    for to in ray:
+                        target = board[to]
+                        if target:
+                            if target >> 3 != side:
+                                append(frm | to << 6)
+                            break
+        return moves
+
+    def _castling_moves(self, frm, append):
+        board = self.board
+        rights = self.castling
+        if self.side == WHITE:
+            if frm != E1:
+                return
+            if rights & WHITE_KINGSIDE and not board[61] and not board[62]:
+                append(E1 | 62 << 6)
+            if rights & WHITE_QUEENSIDE and not board[59] and not board[58] and not board[57]:
+                append(E1 | 58 << 6)
+        else:
+            if frm != E8:
+                return
+            if rights & BLACK_KINGSIDE and not board[5] and not board[6]:
+                append(E8 | 6 << 6)
+            if rights & BLACK_QUEENSIDE and not board[3] and not board[2] and not board[1]:
+                append(E8 | 2 << 6)
+
+    def legal_moves(self):
+        """
+        Legal moves for the side to move. Check and pin masks restrict the
+        pseudo-legal moves so only king moves need an attack test.
+        """
+        return self._legal(self.pseudo_legal_moves())
+
+    def legal_captures(self):
+        """Legal captures and promotions only, for the quiescence search."""
+        return self._legal(self.pseudo_legal_captures())
+
+    def _legal(self, pseudo_legal):
+        side = self.side
+        opp = side ^ 1
+        king = self.king_sq[side]
+        if king < 0:
+            return []
+        board = self.board
+        ep = self.ep
+        evasion, pins = self.check_and_pin_masks()
+        in_check = evasion != ALL_SQUARES
+        moves = []
+        append = moves.append
+        for move in pseudo_legal:
+            frm = move & 63
+            to = (move >> 6) & 63
+            if frm == king:
+                if to - frm == 2 or frm - to == 2:
+                    # No castling out of, through or into check.
+                    if (not in_check and not self.is_square_attacked((frm + to) >> 1, opp)
+                            and not self.is_square_attacked(to, opp)):
+                        append(move)
+                elif not self._attacked_without_king(to, opp, king):
+                    append(move)
+            elif to == ep and board[frm] & 7 == PAWN:
+                # En passant removes a pawn off the move's line, which the
+                # masks do not cover, so it is tested by playing it.
+                undo = self.make_move(move)
+                if not self.is_square_attacked(king, opp):
+                    append(move)
+                self.unmake_move(move, undo)
+            elif (evasion & pins.get(frm, ALL_SQUARES)) >> to & 1:
+                append(move)
+        return moves
+
+    def check_and_pin_masks(self):
+        """
+        Returns (evasion, pins). evasion is a bitmask of squares a non-king
+        move must land on (all squares when not in check, none in double
+        check); pins maps each pinned square to the line it may move along.
+        """
+        board = self.board
+        side = self.side
+        opp = side ^ 1
+        king = self.king_sq[side]
+        evasion = ALL_SQUARES
+        checkers = 0
+        pins = {}
+        for sliders, rays in ((DIAGONAL_SLIDERS, BISHOP_RAYS[king]), (STRAIGHT_SLIDERS, ROOK_RAYS[king])):
+            for ray in rays:
+                line = 0
+                blocker = -1
+                for sq in ray:
+                    line |= 1 << sq
+                    piece = board[sq]
+                    if not piece:
+                        continue
+                    if piece >> 3 == side:
+                        if blocker >= 0:
+                            break
+                        blocker = sq
+                        continue
+                    if piece & 7 in sliders:
+                        if blocker >= 0:
+                            pins[blocker] = line
+                        else:
+                            checkers += 1
+                            evasion &= line
+                    break
+        knight = make_piece(opp, KNIGHT)
+        for sq in KNIGHT_TARGETS[king]:
+            if board[sq] == knight:
+                checkers += 1
+                evasion &= 1 << sq
+        pawn = make_piece(opp, PAWN)
+        for sq in PAWN_CAPTURES[side][king]:
+            if board[sq] == pawn:
+                checkers += 1
+                evasion &= 1 << sq
+        if checkers > 1:
+            evasion = 0
+        return evasion, pins
+
+    # -------------------------------------------------------------------------
+    # Attacks
+    # -------------------------------------------------------------------------
+
+    def is_square_attacked(self, sq, by):
+        """True if any piece of colour by attacks sq, looking outward from sq."""
+        if sq < 0:
+            return True
+        board = self.board
+        base = by << 3
+        pawn = base | PAWN
+        for frm in PAWN_CAPTURES[by ^ 1][sq]:
+            if board[frm] == pawn:
+                return True
+        knight = base | KNIGHT
+        for frm in KNIGHT_TARGETS[sq]:
+            if board[frm] == knight:
+                return True
+        king = base | KING
+        for frm in KING_TARGETS[sq]:
+            if board[frm] == king:
+                return True
+        bishop, rook, queen = base | BISHOP, base | ROOK, base | QUEEN
+        for ray in BISHOP_RAYS[sq]:
+            for frm in ray:
+                piece = board[frm]
+                if piece:
+                    if piece == bishop or piece == queen:
+                        return True
+                    break
+        for ray in ROOK_RAYS[sq]:
+            for frm in ray:
+                piece = board[frm]
+                if piece:
+                    if piece == rook or piece == queen:
+                        return True
+                    break
+        return False
+
+    def _attacked_without_king(self, sq, by, king):
+        # The king is lifted off the board so sliders see through its old square.
+        board = self.board
+        piece = board[king]
+        board[king] = EMPTY
+        attacked = self.is_square_attacked(sq, by)
+        board[king] = piece
+        return attacked
+
+    def in_check(self):
+        return self.is_square_attacked(self.king_sq[self.side], self.side ^ 1)
@@ -0,0 +1,175 @@
+"""
+Search instrumentation: a per-search statistics object and an opt-in
+cProfile hook.
+
+Search keeps cheap counters all the time and builds a SearchStats from them
+when asked (Search.stats()). Timing the hot paths costs a perf_counter call
+around every move generation, make/unmake and evaluation, so it is only done
+when the search is created with timing=True; the position being searched is
+then switched to a subclass whose methods record their time (see
+timed_position_class).
+
+Profiles written by profile_call can be read with
+
+    python -m pstats profiles/search-0001.prof
+"""
+import cProfile
+import os
+import time
+
+# Buckets of SearchStats.timers
+TIMERS = ("movegen", "legality", "make_move", "eval")
+
+class SearchStats:
+    """
+    Counters and timings for one search. nodes counts every node including
+    quiescence; qnodes the quiescence part alone. expanded and children count
+    interior nodes and the moves searched from them, iteration_nodes the
+    nodes used by each completed depth.
+    """
+
+    def __init__(self, nodes=0, qnodes=0, seconds=0.0, cutoffs=0, first_move_cutoffs=0,
+                 expanded=0, children=0, tt_probes=0, tt_hits=0, iteration_nodes=(),
+                 timers=None):
+        self.nodes = nodes
+        self.qnodes = qnodes
+        self.seconds = seconds
+        self.cutoffs = cutoffs
+        self.first_move_cutoffs = first_move_cutoffs
+        self.expanded = expanded
+        self.children = children
+        self.tt_probes = tt_probes
+        self.tt_hits = tt_hits
+        self.iteration_nodes = list(iteration_nodes)
+        self.timers = timers
+
+    def nps(self):
+        return int(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+    def branching_factor(self):
+        """Effective branching factor: node growth between the last two depths."""
+        if len(self.iteration_nodes) < 2 or not self.iteration_nodes[-2]:
+            return 0.0
+        return self.iteration_nodes[-1] / self.iteration_nodes[-2]
+
+    def moves_per_node(self):
+        """Moves actually searched per interior node, after cutoffs."""
+        return self.children / self.expanded if self.expanded else 0.0
+
+    def cutoff_rate(self):
+        """Share of interior nodes that ended in a beta cutoff."""
+        return self.cutoffs / self.expanded if self.expanded else 0.0
+
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    def tt_hit_rate(self):
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    # Constructor arguments, which as_dict writes out alongside the rates
+    FIELDS = ("nodes", "qnodes", "seconds", "cutoffs", "first_move_cutoffs", "expanded",
+              "children", "tt_probes", "tt_hits", "iteration_nodes", "timers")
+
+    def as_dict(self):
+        data = {name: getattr(self, name) for name in self.FIELDS}
+        data.update(
+            nps=self.nps(),
+            branching_factor=round(self.branching_factor(), 2),
+            moves_per_node=round(self.moves_per_node(), 2),
+            cutoff_rate=round(self.cutoff_rate(), 4),
+            first_move_cutoff_rate=round(self.first_move_cutoff_rate(), 4),
+            tt_hit_rate=round(self.tt_hit_rate(), 4),
+        )
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data[name] for name in cls.FIELDS if name in data})
+
+    def report(self):
+        lines = [
+            f"Search: {self.nodes} nodes ({self.qnodes} quiescence) in {self.seconds:.2f}s, "
+            f"{self.nps()} nps",
+            f"  branching factor {self.branching_factor():.2f}, "
+            f"{self.moves_per_node():.2f} moves searched per node",
+            f"  cutoffs {self.cutoff_rate():.1%} of nodes, "
+            f"{self.first_move_cutoff_rate():.1%} on the first move",
+            f"  TT hits {self.tt_hits}/{self.tt_probes} ({self.tt_hit_rate():.1%})",
+        ]
+        if self.timers is not None:
+            total = self.seconds or 1.0
+            lines.append("  time: " + ", ".join(
+                f"{name} {self.timers[name]:.3f}s ({self.timers[name] / total:.0%})"
+                for name in TIMERS))
+        return "\n".join(lines)
+
+def new_timers():
+    return dict.fromkeys(TIMERS, 0.0)
+
+def timed_position_class(cls, timers):
+    """
+    Subclass of the position class cls whose move generation, legality
+    filter and make/unmake add their running time to timers.
+    Legality includes the trial make/unmake used for en passant moves, which
+    is counted under make_move as well.
+    """
+    clock = time.perf_counter
+
+    class TimedPosition(cls):
+        __slots__ = ()
+
+        def pseudo_legal_moves(self):
+            start = clock()
+            moves = cls.pseudo_legal_moves(self)
+            timers["movegen"] += clock() - start
+            return moves
+
+        def pseudo_legal_captures(self):
+            start = clock()
+            moves = cls.pseudo_legal_captures(self)
+            timers["movegen"] += clock() - start
+            return moves
+
+        def _legal(self, pseudo_legal):
+            start = clock()
+            moves = cls._legal(self, pseudo_legal)
+            timers["legality"] += clock() - start
+            return moves
+
+        def make_move(self, move):
+            start = clock()
+            undo = cls.make_move(self, move)
+            timers["make_move"] += clock() - start
+            return undo
+
+        def unmake_move(self, move, undo):
+            start = clock()
+            cls.unmake_move(self, move, undo)
+            timers["make_move"] += clock() - start
+
+    TimedPosition.__name__ = "Timed" + cls.__name__
+    return TimedPosition
+
+def timed_evaluate(evaluate, timers):
+    """evaluate(pos, debug) wrapped to add its running time to timers["eval"]."""
+    clock = time.perf_counter
+
+    def timed(pos, debug=False):
+        start = clock()
+        score = evaluate(pos, debug)
+        timers["eval"] += clock() - start
+        return score
+
+    return timed
+
+def profile_call(directory, name, func, *args, **kwargs):
+    """
+    Calls func under cProfile and writes the profile to directory/name.prof.
+    Returns func's result.
+    """
+    os.makedirs(directory, exist_ok=True)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(os.path.join(directory, name + ".prof"))
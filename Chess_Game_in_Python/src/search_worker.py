@@ -0,0 +1,172 @@
+"""
+Runs the engine in a separate process so the pygame loop keeps drawing and
+handling events while the computer thinks.
+
+The worker process lives for the whole game and keeps its transposition
+table between moves. Commands go in over one queue, progress and results come
+back over another, and a shared Event stops the current search early.
+
+While the player thinks, the worker can ponder: search the position after
+the reply it expects, with the clock held until a second Event, ponder
+hit, says the reply was played. The table it fills is the one the next
+search uses, so even a wrong guess is not wasted.
+"""
+import atexit
+import functools
+import multiprocessing
+import queue
+
+from engine import iterative_deepening
+from position import WHITE
+from parallel import ParallelSearch
+from search_stats import profile_call
+from tablebase import Tablebases
+from transposition import TranspositionTable
+
+def _worker_main(commands, results, stop_event, ponder_event, options):
+    workers = options.get("search_workers", 1)
+    tt = None
+    parallel = None
+    if workers > 1:
+        parallel = ParallelSearch(workers, options)
+    else:
+        tt = TranspositionTable(options["tt_size_mb"], options["tt_replacement"])
+    tablebases = Tablebases(options["tablebase_path"]) if options.get("tablebase_path") else None
+    profile_dir = options.get("profile_dir")
+    search_options = {k: v for k, v in options.items()
+                      if k not in ("max_depth", "tt_size_mb", "tt_replacement", "search_workers",
+                                   "tablebase_path", "profile_dir")}
+    while True:
+        command = commands.get()
+        if command[0] == "quit":
+            break
+        kind, search_id, state, root_moves = command
+        maximizing = state.pos.side == WHITE
+
+        def info(data):
+            results.put(("info", search_id, data))
+
+        stats = []
+        if parallel is not None:
+            # The parallel search cannot hold its clock, so a ponder search
+            # there simply runs on its normal budget.
+            score, move = parallel.search(state, options["max_depth"], maximizing,
+                                          options.get("time_ms"), info, stop_event, root_moves,
+                                          options.get("nodes"))
+            report = f"Parallel search with {workers} workers"
+        else:
+            search = iterative_deepening
+            if profile_dir:
+                # One cProfile dump per search: search-0001.prof, search-0002.prof, ...
+                search = functools.partial(profile_call, profile_dir, f"search-{search_id:04}",
+                                           iterative_deepening)
+            score, move = search(state, options["max_depth"], maximizing, tt=tt, info=info,
+                                 stop_event=stop_event, tablebases=tablebases,
+                                 on_stats=stats.append, root_moves=root_moves,
+                                 ponder_hit=ponder_event if kind == "ponder" else None,
+                                 **search_options)
+            report = tt.report()
+        stats = stats[0].as_dict() if stats else None
+        results.put(("done", search_id, (score, move, report, stats)))
+    if parallel is not None:
+        parallel.close()
+
+class SearchWorker:
+    """
+    Handle on the engine process. options holds max_depth, tt_size_mb,
+    tt_replacement, search_workers, tablebase_path, profile_dir (write a
+    cProfile dump of every search there) and any keyword accepted by
+    engine.iterative_deepening. With search_workers above 1 only time_ms,
+    nodes and the keys parallel.ParallelSearch takes apply; there is no
+    profile and no statistics. on_info is called from poll() with each
+    iteration's info dict.
+    """
+
+    def __init__(self, options, on_info=None):
+        self.on_info = on_info
+        self.commands = multiprocessing.Queue()
+        self.results = multiprocessing.Queue()
+        self.stop_event = multiprocessing.Event()
+        self.ponder_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=_worker_main,
+            args=(self.commands, self.results, self.stop_event, self.ponder_event, options),
+        )
+        # Not a daemon, since it may start its own pool for parallel search,
+        # so make sure it is shut down when the game exits.
+        self.process.start()
+        atexit.register(self.close)
+        self.search_id = 0
+        self.searching = False
+
+    def start_search(self, state, root_moves=None):
+        """
+        Starts searching a game_state.GameState in the background, for its
+        side to move. root_moves, the legal moves (position.py encoding) if
+        already known, saves the worker generating them and limits the
+        search to them.
+        """
+        self._start("go", state, root_moves)
+
+    def start_ponder(self, state, root_moves=None):
+        """
+        Like start_search, but the search's time limit does not run until
+        ponder_hit() is called. Its result is collected with poll() as usual.
+        """
+        self.ponder_event.clear()
+        self._start("ponder", state, root_moves)
+
+    def _start(self, kind, state, root_moves):
+        self.stop_event.clear()
+        self.search_id += 1
+        self.searching = True
+        self.commands.put((kind, self.search_id, state, root_moves))
+
+    def ponder_hit(self):
+        """The pondered move was played: the ponder search becomes the real one."""
+        self.ponder_event.set()
+
+    def stop(self):
+        """Asks the current search to return the best move found so far."""
+        self.stop_event.set()
+
+    def cancel(self):
+        """Stops the current search and waits for it to end, dropping its result."""
+        if not self.searching:
+            return
+        self.stop()
+        while True:
+            kind, search_id, _ = self.results.get()
+            if kind == "done" and search_id == self.search_id:
+                break
+        self.searching = False
+
+    def poll(self):
+        """
+        Handles any messages from the worker without blocking. Returns
+        (score, move, tt_report, stats) once the current search has finished,
+        otherwise None. stats is a SearchStats.as_dict() dict, or None for a
+        parallel search.
+        """
+        while True:
+            try:
+                kind, search_id, payload = self.results.get_nowait()
+            except queue.Empty:
+                return None
+            if search_id != self.search_id:
+                continue  # left over from a search that was abandoned
+            if kind == "info":
+                if self.on_info is not None:
+                    self.on_info(payload)
+            elif kind == "done":
+                self.searching = False
+                return payload
+
+    def close(self):
+        if not self.process.is_alive():
+            return
+        self.stop()
+        self.commands.put(("quit",))
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,101 @@
+"""
+Node-count and fixed-time comparisons of the selective search techniques
+(engine.SELECTIVITY: pvs, aspiration, null_move, lmr, futility).
+
+Every configuration searches the same positions (the match openings) with a
+fresh transposition table. "nodes" searches each to a fixed depth and shows
+the node count against plain alpha-beta; "time" gives each position a fixed
+time and shows the depth reached; "match" plays all techniques on against
+all off with match.py at a fixed time per move.
+
+    python src/selectivity.py nodes --depth 5
+    python src/selectivity.py time --movetime 1000
+    python src/selectivity.py match --games 100 --movetime 200 --workers 4
+"""
+import argparse
+import multiprocessing
+import time
+
+from engine import BACKENDS, MAX_PLY, SELECTIVITY, Search
+from match import DEFAULT_ENGINE, DEFAULT_OPENINGS, run_match
+from position import START_FEN
+from transposition import TranspositionTable
+
+def configurations():
+    """(name, switches) pairs: none, each technique alone, all, and all but each."""
+    none = dict.fromkeys(SELECTIVITY, False)
+    every = dict.fromkeys(SELECTIVITY, True)
+    configs = [("none", none)]
+    configs += [("+" + key, dict(none, **{key: True})) for key in SELECTIVITY]
+    configs.append(("all", every))
+    configs += [("-" + key, dict(every, **{key: False})) for key in SELECTIVITY]
+    return configs
+
+def bench_positions(backend="mailbox"):
+    positions = []
+    for opening in DEFAULT_OPENINGS:
+        pos = BACKENDS[backend].from_fen(START_FEN)
+        for text in opening.split():
+            pos.make_move(pos.move_from_uci(text))
+        positions.append(pos)
+    return positions
+
+def run_config(positions, switches, depth=MAX_PLY, time_ms=None, tt_size_mb=16):
+    """Searches every position; returns (nodes, seconds, deepest depth per position)."""
+    nodes = 0
+    depths = []
+    started = time.perf_counter()
+    for pos in positions:
+        reached = []
+        search = Search(TranspositionTable(tt_size_mb), time_ms,
+                        info=lambda info: reached.append(info["depth"]), **switches)
+        search.iterate(pos, depth)
+        nodes += search.nodes
+        depths.append(reached[-1] if reached else 0)
+    return nodes, time.perf_counter() - started, depths
+
+def compare_nodes(depth, backend="mailbox"):
+    positions = bench_positions(backend)
+    print(f"{'config':<12} {'nodes':>10} {'vs none':>8} {'time (s)':>9} {'nps':>8}")
+    baseline = None
+    for name, switches in configurations():
+        nodes, seconds, _ = run_config(positions, switches, depth)
+        baseline = baseline or nodes
+        print(f"{name:<12} {nodes:>10} {nodes / baseline:>8.1%} {seconds:>9.2f} "
+              f"{int(nodes / seconds):>8}")
+
+def compare_depth(time_ms, backend="mailbox"):
+    positions = bench_positions(backend)
+    print(f"{'config':<12} {'mean depth':>10} {'min':>4} {'max':>4} {'nodes':>10}")
+    for name, switches in configurations():
+        nodes, _, depths = run_config(positions, switches, time_ms=time_ms)
+        print(f"{name:<12} {sum(depths) / len(depths):>10.2f} {min(depths):>4} "
+              f"{max(depths):>4} {nodes:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the selective search techniques")
+    parser.add_argument("mode", choices=("nodes", "time", "match"))
+    parser.add_argument("--depth", type=int, default=5, help="nodes: fixed search depth")
+    parser.add_argument("--movetime", type=int, default=1000, help="time/match: ms per move")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="mailbox")
+    parser.add_argument("--games", type=int, default=100, help="match: number of games")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--pgn", default="selectivity.pgn")
+    parser.add_argument("--jsonl", default="selectivity.jsonl")
+    args = parser.parse_args()
+
+    if args.mode == "nodes":
+        compare_nodes(args.depth, args.backend)
+    elif args.mode == "time":
+        compare_depth(args.movetime, args.backend)
+    else:
+        engine = dict(DEFAULT_ENGINE, time_ms=args.movetime, backend=args.backend)
+        summary = run_match(dict(engine, **dict.fromkeys(SELECTIVITY, True)),
+                            dict(engine, **dict.fromkeys(SELECTIVITY, False)),
+                            DEFAULT_OPENINGS, args.games, args.workers, args.pgn, args.jsonl)
+        print(f"All techniques vs none: +{summary['wins']} ={summary['draws']} "
+              f"-{summary['losses']}, Elo {summary['elo']:+.0f} "
+              f"[{summary['elo_low']:+.0f}, {summary['elo_high']:+.0f}]")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Game session for the pygame front end: a small state machine driven by
+pygame events.
+
+    HUMAN   waiting for the player's clicks
+    ENGINE  the computer is choosing a move (book or background search)
+    OVER    checkmate, a draw or the window was closed
+
+The loop sleeps in pygame.event.wait() and only wakes for input, or for a
+timer event every POLL_MS while the engine is thinking, and only the
+squares that changed are redrawn. The legal moves of each position are
+generated once and cached by Zobrist key; the same list serves the
+game-over check, click highlighting and the engine's root move list.
+The game itself is a game_state.GameState, so draws by repetition and the
+fifty-move rule are detected and the engine is given the game's history.
+
+With pondering on, the engine keeps searching during the player's turn:
+the position after the reply its last principal variation expects, or
+the player's own position when it has no guess. If the player makes the
+expected move (a ponder hit) that search simply carries on as the
+engine's search, and has often already finished; otherwise it is
+stopped and only the transposition table it filled is kept.
+"""
+import logging
+import time
+
+import pygame
+
+from game import get_move_string, user_move_text
+from game_state import GameState
+from position import QUEEN, move_to_tuple
+
+log = logging.getLogger("chess")
+
+HUMAN, ENGINE, OVER = "human", "engine", "over"
+
+# Timer event that checks the search worker for progress while it thinks
+SEARCH_POLL = pygame.USEREVENT + 1
+POLL_MS = 50
+
+def format_search_info(info):
+    pv = " ".join(get_move_string(move_to_tuple(move)) for move in info["pv"])
+    return f"depth {info['depth']} score {info['score']} pv {pv}"
+
+class LegalMoveCache:
+    """Legal moves by position key, so each position generates them only once."""
+
+    def __init__(self, size=64):
+        self.size = size
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def moves(self, pos):
+        """
+        Legal moves of pos in position.py encoding. The board always promotes
+        to a queen, so underpromotions are left out.
+        """
+        moves = self.entries.get(pos.key)
+        if moves is not None:
+            self.hits += 1
+            return moves
+        self.misses += 1
+        if len(self.entries) >= self.size:
+            self.entries.clear()
+        moves = [move for move in pos.legal_moves() if move >> 12 in (0, QUEEN)]
+        self.entries[pos.key] = moves
+        return moves
+
+class PonderStats:
+    """
+    Ponder predictions, hits and the engine thinking time they saved. Each
+    hit, miss and saving is also logged to the "chess" logger.
+    """
+
+    def __init__(self):
+        self.predictions = 0
+        self.hits = 0
+        self.seconds_saved = 0.0
+
+    def predicted(self):
+        self.predictions += 1
+
+    def hit(self):
+        self.hits += 1
+        log.info("ponder hit %d/%d", self.hits, self.predictions)
+
+    def miss(self):
+        log.info("ponder miss %d/%d", self.hits, self.predictions)
+
+    def saved(self, seconds):
+        self.seconds_saved += seconds
+        log.info("ponder saved=%.2fs total=%.2fs", seconds, self.seconds_saved)
+
+    def hit_rate(self):
+        return self.hits / self.predictions if self.predictions else 0.0
+
+    def report(self):
+        return (f"Ponder hits {self.hits}/{self.predictions} ({self.hit_rate():.0%}), "
+                f"{self.seconds_saved:.1f}s of thinking saved")
+
+class GameSession:
+    """
+    One game of human (white) against the computer. on_move(ply, side, move)
+    is called for every move played, on_search_info(info) for each engine
+    progress report and on_search_done(tt_report, stats) when a search ends.
+    ponder lets the engine search during the player's turn; see ponder_stats.
+    """
+
+    def __init__(self, ui, worker, book=None, on_move=None, on_search_info=None,
+                 on_search_done=None, ponder=False):
+        self.ui = ui
+        self.worker = worker
+        self.book = book
+        self.on_move = on_move
+        self.on_search_info = on_search_info
+        self.on_search_done = on_search_done
+        self.ponder = ponder
+        self.ponder_stats = PonderStats()
+        # Reply the engine expects, from its principal variation
+        self.predicted = None
+        # Key of the position being pondered, None when not pondering
+        self.ponder_key = None
+        # Whether that position follows a predicted reply
+        self.ponder_predicted = False
+        self.ponder_started = None
+        self.ponder_hit_at = None
+        self.last_pv = []
+        worker.on_info = self._search_info
+        self.cache = LegalMoveCache()
+        self.game = GameState.from_fen()
+        self.ply = 0
+        self.state = None
+        self.result = None
+        self.status = None
+        self._enter_position()
+
+    # -------------------------------------------------------------------------
+    # Positions and moves
+    # -------------------------------------------------------------------------
+
+    def _enter_position(self):
+        """Sets up the state for the side to move in the current position."""
+        self.pos = self.game.pos
+        self.board = self.game.to_board()
+        self.turn = self.game.color
+        self.legal_moves = self.cache.moves(self.pos)
+        self.legal_tuples = [move_to_tuple(move) for move in self.legal_moves]
+        over, reason = self.is_game_over()
+        if over:
+            self._stop_pondering()
+            self.state = OVER
+            self.result = reason
+        elif self.turn == "white":
+            self.state = HUMAN
+            self._start_ponder()
+        else:
+            self.state = ENGINE
+            self._start_engine()
+
+    def is_game_over(self):
+        """(over, reason) for the current position, from the cached move list."""
+        return self.game.game_over(self.legal_moves)
+
+    def play(self, move):
+        """Plays a ((row, col), (row, col)) move and moves on to the next position."""
+        if self.on_move is not None:
+            self.on_move(self.ply, self.turn, move)
+        self.game.push_tuple(move)
+        self.ply += 1
+        self._enter_position()
+
+    def end_message(self):
+        if self.result == "checkmate":
+            return "Checkmate! Black wins!" if self.turn == "white" else "Checkmate! White wins!"
+        if self.result == "stalemate":
+            return "Stalemate! The game is drawn."
+        if self.result is not None:
+            return f"Draw by {self.result}!"
+        return None
+
+    # -------------------------------------------------------------------------
+    # Engine
+    # -------------------------------------------------------------------------
+
+    def _start_engine(self):
+        if self.ponder_key == self.pos.key:
+            self._ponder_hit()
+            return
+        self._stop_pondering()
+        if self.book is not None:
+            move = self.book.choose(self.pos)
+            if move is not None and move in self.legal_moves:
+                log.info("book move=%s", get_move_string(move_to_tuple(move)))
+                self.predicted = None
+                self.play(move_to_tuple(move))
+                return
+        self.status = "Computer is thinking..."
+        self.last_pv = []
+        self.worker.start_search(self.game, self.legal_moves)
+        pygame.time.set_timer(SEARCH_POLL, POLL_MS)
+
+    def _start_ponder(self):
+        """Starts searching in the background while the player thinks."""
+        if not self.ponder:
+            return
+        state = self.game.copy()
+        predicted, self.predicted = self.predicted, None
+        if predicted in self.legal_moves:
+            state.push(predicted)
+        root_moves = self.cache.moves(state.pos)
+        if not root_moves:
+            return  # the expected reply ends the game
+        self.ponder_predicted = predicted in self.legal_moves
+        if self.ponder_predicted:
+            self.ponder_stats.predicted()
+        self.ponder_key = state.pos.key
+        self.ponder_started = time.perf_counter()
+        self.last_pv = []
+        self.worker.start_ponder(state, root_moves)
+
+    def _ponder_hit(self):
+        """The player made the expected move: the ponder search carries on as ours."""
+        self.ponder_key = None
+        self.ponder_hit_at = time.perf_counter()
+        self.ponder_stats.hit()
+        self.worker.ponder_hit()
+        self.status = "Computer is thinking..."
+        pygame.time.set_timer(SEARCH_POLL, POLL_MS)
+        # A ponder search that already finished is answered at once.
+        self._poll_engine()
+
+    def _stop_pondering(self):
+        if self.ponder_key is None:
+            return
+        self.ponder_key = None
+        if self.ponder_predicted:
+            self.ponder_stats.miss()
+        self.worker.cancel()
+
+    def _search_info(self, info):
+        self.last_pv = info["pv"]
+        self.status = "Thinking: " + format_search_info(info)
+        if self.on_search_info is not None:
+            self.on_search_info(info)
+
+    def _poll_engine(self):
+        result = self.worker.poll()
+        if result is None:
+            return
+        pygame.time.set_timer(SEARCH_POLL, 0)
+        self.status = None
+        self.ui.clear_search_status()
+        _, move, tt_report, stats = result
+        if self.ponder_hit_at is not None:
+            # Saved: the search time that was spent before the player moved.
+            now = time.perf_counter()
+            searched = stats["seconds"] if stats is not None else now - self.ponder_started
+            self.ponder_stats.saved(max(0.0, searched - (now - self.ponder_hit_at)))
+            self.ponder_hit_at = None
+        pv = self.last_pv
+        self.predicted = pv[1] if len(pv) > 1 and move_to_tuple(pv[0]) == move else None
+        if self.on_search_done is not None:
+            self.on_search_done(tt_report, stats)
+        self.play(move)
+
+    # -------------------------------------------------------------------------
+    # Event loop
+    # -------------------------------------------------------------------------
+
+    def handle(self, event):
+        if event.type == pygame.QUIT:
+            pygame.time.set_timer(SEARCH_POLL, 0)
+            self.state = OVER
+        elif self.state == ENGINE:
+            if event.type == SEARCH_POLL:
+                self._poll_engine()
+        elif self.state == HUMAN:
+            move = None
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                move = self.ui.click(self.ui.square_at(event.pos), self.board, self.legal_tuples)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
+                move = user_move_text()
+                if move not in self.legal_tuples:
+                    move = None
+            if move is not None:
+                self.play(move)
+
+    def redraw(self):
+        dirty = self.ui.draw_board(self.board)
+        if self.status is not None:
+            dirty += self.ui.draw_search_status(self.status)
+        if dirty:
+            pygame.display.update(dirty)
+
+    def run(self):
+        """Plays until the game ends. Returns the end message, or None if the window was closed."""
+        # Mouse movement does not change anything on screen.
+        pygame.event.set_blocked(pygame.MOUSEMOTION)
+        while self.state != OVER:
+            self.redraw()
+            self.handle(pygame.event.wait())
+        self.redraw()
+        return self.end_message()
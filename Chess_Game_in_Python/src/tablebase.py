@@ -0,0 +1,478 @@
+"""
+Endgame tablebases for up to four pieces, generated locally by retrograde
+analysis with the engine's own move rules.
+
+Each ending (e.g. "KQvK", "KRvKN") is stored in its own file as one signed
+byte per position: v > 0 means the side to move mates in v plies, v < 0
+means it is mated in -v - 1 plies (-1 is checkmate on the board), 0 is a
+draw. Files are memory-mapped when probed, so looking a position up reads a
+single byte.
+
+    python src/tablebase.py generate                  # all 3-piece endings
+    python src/tablebase.py generate KQvKR KRvKB      # 4-piece, takes a while
+    python src/tablebase.py probe "8/8/8/4k3/8/8/8/KQ6 w - - 0 1"
+
+Tables are written for the stronger side as white and probed in either
+colour. Positions are reduced by symmetry: the white king is kept on files
+a-d, and for pawnless endings on ranks 5-8 as well. Castling is never
+possible in these endings and en passant is not modelled, so positions where
+an en passant capture is available are not probed.
+"""
+import argparse
+import mmap
+import os
+import sys
+import time
+from array import array
+
+from position import (
+    Position, PAWN, KNIGHT, KING, WHITE, BLACK, PIECE_CHARS,
+    KNIGHT_TARGETS, KING_TARGETS, SLIDER_RAYS, PAWN_CAPTURES, make_piece, move_to_uci,
+)
+
+MAX_PIECES = 4
+DEFAULT_DIRECTORY = "tablebases"
+THREE_PIECE_ENDINGS = ("KQvK", "KRvK", "KBvK", "KNvK", "KPvK")
+
+# Order of piece letters within a side of a signature
+PIECE_ORDER = "KQRBNP"
+_MATERIAL = {"K": 0, "Q": 9, "R": 5, "B": 3, "N": 3, "P": 1}
+_KINDS = {c: PIECE_CHARS.index(c) for c in PIECE_ORDER}
+
+# Generation states
+_UNKNOWN, _RESOLVED, _INVALID = 0, 1, 2
+
+def normalize(white, black):
+    """
+    Signature for the given piece letters with the stronger side first, and
+    whether the colours had to be swapped to get it.
+    """
+    white = "".join(sorted(white, key=PIECE_ORDER.index))
+    black = "".join(sorted(black, key=PIECE_ORDER.index))
+    strength = lambda side: (sum(_MATERIAL[c] for c in side), [-PIECE_ORDER.index(c) for c in side])
+    if strength(white) >= strength(black):
+        return f"{white}v{black}", False
+    return f"{black}v{white}", True
+
+def child_value(value):
+    """Value for the side that moved into a position with the given value."""
+    if value < 0:
+        return -value
+    if value > 0:
+        return -value - 2
+    return 0
+
+def _rank(value):
+    # Sort key, better for the side to move first: quick wins, draws, slow losses
+    if value > 0:
+        return (2, -value)
+    if value == 0:
+        return (1, 0)
+    return (0, -value)
+
+class Layout:
+    """Maps the positions of one ending to table indices and back."""
+
+    def __init__(self, signature):
+        white, black = signature.split("v")
+        self.signature = signature
+        self.pieces = ([make_piece(WHITE, _KINDS[c]) for c in white]
+                       + [make_piece(BLACK, _KINDS[c]) for c in black])
+        self.pawnless = "P" not in signature
+        self.king_squares = [sq for sq in range(64)
+                             if sq & 7 < 4 and (not self.pawnless or sq >> 3 < 4)]
+        self.king_index = [-1] * 64
+        for i, sq in enumerate(self.king_squares):
+            self.king_index[sq] = i
+        # Runs of identical pieces, kept in ascending square order
+        self.groups = []
+        start = 0
+        for i in range(1, len(self.pieces) + 1):
+            if i == len(self.pieces) or self.pieces[i] != self.pieces[start]:
+                if i - start > 1:
+                    self.groups.append((start, i))
+                start = i
+        self.size = 2 * len(self.king_squares) * 64 ** (len(self.pieces) - 1)
+
+    def index(self, squares, side):
+        """Table index for piece squares (in self.pieces order) and side to move."""
+        king = squares[0]
+        flip = 7 if king & 7 > 3 else 0
+        if self.pawnless and king >> 3 > 3:
+            flip |= 56
+        squares = [sq ^ flip for sq in squares]
+        for start, end in self.groups:
+            squares[start:end] = sorted(squares[start:end])
+        index = side * len(self.king_squares) + self.king_index[squares[0]]
+        for sq in squares[1:]:
+            index = index * 64 + sq
+        return index
+
+    def decode(self, index):
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            index, sq = divmod(index, 64)
+            squares.append(sq)
+        side, king = divmod(index, len(self.king_squares))
+        squares.append(self.king_squares[king])
+        squares.reverse()
+        return squares, side
+
+    def squares_of(self, board):
+        """Piece squares of board in self.pieces order."""
+        by_piece = {}
+        for sq, piece in enumerate(board):
+            if piece:
+                by_piece.setdefault(piece, []).append(sq)
+        return [by_piece[piece].pop() for piece in self.pieces]
+
+class Tablebases:
+    """Probes the table files found in directory, mapping each on first use."""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.tables = {}
+        self.max_pieces = 0
+        self.hits = 0
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if name.endswith(".tb"):
+                    self.max_pieces = max(self.max_pieces, len(name) - 4)
+
+    def path(self, signature):
+        return os.path.join(self.directory, signature + ".tb")
+
+    def _table(self, signature):
+        if signature not in self.tables:
+            path = self.path(signature)
+            table = None
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    table = (Layout(signature), mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            self.tables[signature] = table
+        return self.tables[signature]
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table[1].close()
+        self.tables = {}
+
+    def probe(self, pos):
+        """Value of pos for the side to move (see module docstring), or None if not covered."""
+        board = pos.board
+        if 64 - board.count(0) > self.max_pieces or pos.castling:
+            return None
+        if pos.ep >= 0:
+            pawn = make_piece(pos.side, PAWN)
+            if any(board[sq] == pawn for sq in PAWN_CAPTURES[pos.side ^ 1][pos.ep]):
+                return None
+        value = self.probe_board(board, pos.side)
+        if value is not None:
+            self.hits += 1
+        return value
+
+    def probe_board(self, board, side):
+        white = [PIECE_CHARS[p] for p in board if p and p >> 3 == WHITE]
+        black = [PIECE_CHARS[p & 7] for p in board if p and p >> 3 == BLACK]
+        signature, flipped = normalize(white, black)
+        if signature == "KvK":
+            return 0
+        table = self._table(signature)
+        if table is None:
+            return None
+        layout, data = table
+        if flipped:
+            mirrored = bytearray(64)
+            for sq, piece in enumerate(board):
+                if piece:
+                    mirrored[sq ^ 56] = piece ^ 8
+            board = mirrored
+            side ^= 1
+        value = data[layout.index(layout.squares_of(board), side)]
+        return value - 256 if value > 127 else value
+
+    def best_move(self, pos):
+        """
+        (move, value) of the best move in pos by the tables, or None when pos or
+        any position after a legal move is not covered.
+        """
+        best = None
+        for move in pos.legal_moves():
+            undo = pos.make_move(move)
+            value = self.probe(pos)
+            pos.unmake_move(move, undo)
+            if value is None:
+                return None
+            value = child_value(value)
+            if best is None or _rank(value) > _rank(best[1]):
+                best = (move, value)
+        return best
+
+# -----------------------------------------------------------------------------
+# Generation
+# -----------------------------------------------------------------------------
+
+def dependencies(signature):
+    """Endings reachable by one capture or promotion, which must be built first."""
+    white, black = signature.split("v")
+    found = set()
+    for i, c in enumerate(white):
+        if c != "K":
+            found.add(normalize(white[:i] + white[i + 1:], black)[0])
+        if c == "P":
+            for promo in "QRBN":
+                found.add(normalize(white[:i] + promo + white[i + 1:], black)[0])
+    for i, c in enumerate(black):
+        if c != "K":
+            found.add(normalize(white, black[:i] + black[i + 1:])[0])
+        if c == "P":
+            for promo in "QRBN":
+                found.add(normalize(white, black[:i] + promo + black[i + 1:])[0])
+    found.discard("KvK")
+    return sorted(found)
+
+def _place(pos, layout, squares, side):
+    """Sets pos up from squares; False for illegal or non-canonical positions."""
+    if len(set(squares)) != len(squares):
+        return False
+    board = bytearray(64)
+    for piece, sq in zip(layout.pieces, squares):
+        if piece & 7 == PAWN and (sq < 8 or sq >= 56):
+            return False
+        board[sq] = piece
+        if piece & 7 == KING:
+            pos.king_sq[piece >> 3] = sq
+    pos.board = board
+    pos.side = side
+    # The side that just moved cannot be in check.
+    return not pos.is_square_attacked(pos.king_sq[side ^ 1], side)
+
+def _unmove_targets(board, piece, sq):
+    """Empty squares piece could have come from with a quiet move to sq."""
+    kind = piece & 7
+    if kind == KNIGHT or kind == KING:
+        return [t for t in (KNIGHT_TARGETS if kind == KNIGHT else KING_TARGETS)[sq] if not board[t]]
+    if kind == PAWN:
+        step = 8 if piece >> 3 == WHITE else -8
+        start_row = 4 if step == 8 else 3
+        back = sq + step
+        if not 8 <= back < 56 or board[back]:
+            return []
+        if sq >> 3 == start_row and not board[back + step]:
+            return [back, back + step]
+        return [back]
+    targets = []
+    for ray in SLIDER_RAYS[kind][sq]:
+        for t in ray:
+            if board[t]:
+                break
+            targets.append(t)
+    return targets
+
+def _predecessors(pos, layout, index):
+    """Table indices of the positions with a quiet move leading to index."""
+    squares, side = layout.decode(index)
+    _place(pos, layout, squares, side)
+    board = pos.board
+    mover = side ^ 1
+    king = pos.king_sq[side]
+    found = []
+    for i, piece in enumerate(layout.pieces):
+        if piece >> 3 != mover:
+            continue
+        sq = squares[i]
+        for t in _unmove_targets(board, piece, sq):
+            board[sq] = 0
+            board[t] = piece
+            if not pos.is_square_attacked(king, mover):
+                before = list(squares)
+                before[i] = t
+                found.append(layout.index(before, mover))
+            board[t] = 0
+            board[sq] = piece
+    return found
+
+def generate(signature, tablebases, log=print):
+    """
+    Builds the table for signature into tablebases.directory. The endings it
+    converts into must already be available. Returns the number of won,
+    drawn and lost positions.
+    """
+    layout = Layout(signature)
+    size = layout.size
+    values = array("b", bytes(size))
+    state = bytearray(size)
+    remaining = bytearray(size)   # quiet moves not yet known to lose
+    exit_win = bytearray(size)    # fastest win through a capture or promotion
+    exit_loss = bytearray(size)   # slowest loss through a capture or promotion
+    exit_draw = bytearray(size)
+    pending = {}                  # plies -> (wins, losses) to settle at that distance
+
+    def schedule(plies, index, win):
+        pending.setdefault(plies, (array("I"), array("I")))[0 if win else 1].append(index)
+
+    pos = Position()
+    started = time.perf_counter()
+    for index in range(size):
+        squares, side = layout.decode(index)
+        if layout.index(squares, side) != index or not _place(pos, layout, squares, side):
+            state[index] = _INVALID
+            continue
+        moves = pos.legal_moves()
+        if not moves:
+            if pos.in_check():
+                schedule(0, index, False)
+            else:
+                state[index] = _RESOLVED
+            continue
+        quiet = 0
+        board = pos.board
+        for move in moves:
+            if not board[(move >> 6) & 63] and not move >> 12:
+                quiet += 1
+                continue
+            undo = pos.make_move(move)
+            value = tablebases.probe_board(pos.board, pos.side)
+            pos.unmake_move(move, undo)
+            if value is None:
+                raise RuntimeError(f"{signature} needs the tables {dependencies(signature)}")
+            value = child_value(value)
+            if value > 0:
+                if not exit_win[index] or value < exit_win[index]:
+                    exit_win[index] = value
+            elif value < 0:
+                exit_loss[index] = max(exit_loss[index], -value - 1)
+            else:
+                exit_draw[index] = 1
+        remaining[index] = quiet
+        if exit_win[index]:
+            schedule(exit_win[index], index, True)
+        elif not quiet:
+            if exit_draw[index]:
+                state[index] = _RESOLVED
+            else:
+                schedule(exit_loss[index], index, False)
+    log(f"{signature}: {size} positions set up in {time.perf_counter() - started:.1f}s")
+
+    plies = 0
+    while pending:
+        if plies not in pending:
+            plies += 1
+            continue
+        wins, losses = pending.pop(plies)
+        settled_wins = []
+        for index in wins:
+            if state[index] == _UNKNOWN:
+                state[index] = _RESOLVED
+                values[index] = plies
+                settled_wins.append(index)
+        settled_losses = []
+        for index in losses:
+            if state[index] == _UNKNOWN:
+                state[index] = _RESOLVED
+                values[index] = -plies - 1
+                settled_losses.append(index)
+        for index in settled_losses:
+            for before in _predecessors(pos, layout, index):
+                if state[before] == _UNKNOWN:
+                    schedule(plies + 1, before, True)
+        for index in settled_wins:
+            for before in _predecessors(pos, layout, index):
+                if state[before] == _UNKNOWN and remaining[before]:
+                    remaining[before] -= 1
+                    if not remaining[before] and not exit_win[before] and not exit_draw[before]:
+                        schedule(max(plies + 1, exit_loss[before]), before, False)
+        plies += 1
+
+    with open(tablebases.path(signature), "wb") as f:
+        f.write(values.tobytes())
+    tablebases.tables.pop(signature, None)
+    tablebases.max_pieces = max(tablebases.max_pieces, len(layout.pieces))
+    wins = sum(1 for v in values if v > 0)
+    losses = sum(1 for v in values if v < 0)
+    draws = sum(1 for s in state if s != _INVALID) - wins - losses
+    log(f"{signature}: {wins} won, {draws} drawn, {losses} lost, longest mate "
+        f"{max(values)} plies, {time.perf_counter() - started:.1f}s")
+    return wins, draws, losses
+
+def generate_all(signatures, directory=DEFAULT_DIRECTORY, log=print):
+    """Builds signatures and any missing endings they depend on, smallest first."""
+    os.makedirs(directory, exist_ok=True)
+    tablebases = Tablebases(directory)
+    done = set()
+
+    def build(signature):
+        if signature in done:
+            return
+        done.add(signature)
+        for needed in dependencies(signature):
+            build(needed)
+        if not os.path.exists(tablebases.path(signature)):
+            generate(signature, tablebases, log)
+
+    for signature in signatures:
+        white, black = signature.upper().split("V")
+        signature = normalize(white, black)[0]
+        if len(signature) - 1 > MAX_PIECES:
+            raise ValueError(f"Only endings of up to {MAX_PIECES} pieces are supported: {signature}")
+        build(signature)
+    return tablebases
+
+def verify(signature, tablebases):
+    """
+    Checks every position of a generated table against one ply of search
+    over the tables. Raises AssertionError on the first mismatch.
+    """
+    layout = Layout(signature)
+    pos = Position()
+    for index in range(layout.size):
+        squares, side = layout.decode(index)
+        if layout.index(squares, side) != index or not _place(pos, layout, squares, side):
+            continue
+        stored = tablebases.probe_board(pos.board, side)
+        moves = pos.legal_moves()
+        if not moves:
+            expected = -1 if pos.in_check() else 0
+        else:
+            expected = None
+            for move in moves:
+                undo = pos.make_move(move)
+                value = child_value(tablebases.probe_board(pos.board, pos.side))
+                pos.unmake_move(move, undo)
+                if expected is None or _rank(value) > _rank(expected):
+                    expected = value
+        if stored != expected:
+            raise AssertionError(f"{signature} index {index}: stored {stored}, expected {expected}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate or probe endgame tablebases")
+    parser.add_argument("--dir", default=DEFAULT_DIRECTORY)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("generate", help="build tables (default: all 3-piece endings)")
+    build.add_argument("endings", nargs="*", default=list(THREE_PIECE_ENDINGS))
+    build.add_argument("--verify", action="store_true", help="check each table after building")
+    probe = commands.add_parser("probe", help="look up a FEN and its best move")
+    probe.add_argument("fen")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        tablebases = generate_all(args.endings, args.dir)
+        if args.verify:
+            for name in sorted(os.listdir(args.dir)):
+                if name.endswith(".tb"):
+                    verify(name[:-3], tablebases)
+                    print(f"{name[:-3]}: verified")
+        return
+    tablebases = Tablebases(args.dir)
+    pos = Position.from_fen(args.fen)
+    value = tablebases.probe(pos)
+    if value is None:
+        sys.exit("Position not covered by the available tables")
+    best = tablebases.best_move(pos)
+    outcome = ("draw" if value == 0 else f"mate in {value} plies" if value > 0
+               else f"mated in {-value - 1} plies")
+    print(f"{outcome}, best move {move_to_uci(best[0]) if best else 'none'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Bounded transposition table for the engine.
+
+Entries live in a fixed-size list indexed by the Zobrist key, so memory use is
+fixed up front from the configured size in MB. Each slot holds a tuple
+(key, depth, score, flag, move, generation).
+"""
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Rough footprint of one stored entry: the tuple, its ints and the list slot.
+ENTRY_BYTES = 160
+
+REPLACEMENT_POLICIES = ("always", "depth")
+
+class TranspositionTable:
+    def __init__(self, size_mb=16, replacement="depth"):
+        if replacement not in REPLACEMENT_POLICIES:
+            raise ValueError(f"Unknown replacement policy: {replacement}")
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_BYTES)
+        self.replacement = replacement
+        self.entries = [None] * self.size
+        self.generation = 0
+        self.filled = 0
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Starts a new search: ages existing entries and resets the counters."""
+        self.generation += 1
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+
+    def clear(self):
+        self.entries = [None] * self.size
+        self.filled = 0
+        self.new_search()
+
+    def probe(self, key):
+        self.probes += 1
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def best_move(self, key):
+        """Stored move for key without touching the hit counters (PV walks)."""
+        entry = self.entries[key % self.size]
+        if entry is not None and entry[0] == key:
+            return entry[4]
+        return None
+
+    def store(self, key, depth, score, flag, move):
+        index = key % self.size
+        old = self.entries[index]
+        if old is None:
+            self.filled += 1
+        elif self.replacement == "depth":
+            # Keep deeper results for other positions unless they are left
+            # over from an earlier search.
+            if old[0] != key and old[5] == self.generation and old[1] > depth:
+                return
+        self.entries[index] = (key, depth, score, flag, move, self.generation)
+        self.stores += 1
+
+    def hit_rate(self):
+        return self.hits / self.probes if self.probes else 0.0
+
+    def occupancy(self):
+        return self.filled / self.size
+
+    def report(self):
+        return (f"TT: {self.hits}/{self.probes} hits ({self.hit_rate():.1%}), "
+                f"occupancy {self.filled}/{self.size} ({self.occupancy():.1%})")
@@ -0,0 +1,243 @@
+"""
+Headless UCI front end, so the engine can be driven by GUIs, tournament
+managers and match scripts without pygame or tkinter.
+
+    python src/uci.py
+
+Supported commands: uci, isready, setoption, ucinewgame,
+position [startpos | fen <fen>] [moves ...],
+go [depth N] [movetime MS] [nodes N] [wtime/btime/winc/binc MS] [infinite] [ponder],
+ponderhit, stop and quit, plus bench [depth] (see bench.py), which prints
+the bench signature, time and nps. The search runs in a background thread so
+stop and isready are answered while it thinks.
+
+go ponder searches on the opponent's time: the limits are held until
+ponderhit (the opponent played the expected move, named after "ponder" in
+the last bestmove) and bestmove waits for ponderhit or stop.
+"""
+import sys
+import threading
+
+from bench import DEFAULT_DEPTH, run_bench
+from engine import BACKENDS, MAX_PLY, MATE_BOUND, TB_WIN, Search
+from game_state import GameState
+from position import START_FEN, WHITE, move_to_uci
+from tablebase import Tablebases
+from transposition import TranspositionTable
+
+ENGINE_NAME = "Chess_Game_in_Python"
+
+# Share of the remaining clock spent on one move when playing with wtime/btime
+MOVES_TO_GO = 30
+
+# name -> (UCI declaration, default); values are parsed in setoption
+OPTIONS = {
+    "Hash": ("type spin default 16 min 1 max 1024", 16),
+    "MoveGenerator": ("type combo default mailbox var mailbox var bitboard", "mailbox"),
+    "MoveOrdering": ("type check default true", True),
+    "Quiescence": ("type check default true", True),
+    "TablebasePath": ("type string default <empty>", ""),
+    "PVS": ("type check default true", True),
+    "AspirationWindows": ("type check default true", True),
+    "NullMove": ("type check default true", True),
+    "LMR": ("type check default true", True),
+    "FutilityPruning": ("type check default true", True),
+    # Tells the GUI that go ponder is supported; nothing to switch here
+    "Ponder": ("type check default false", False),
+}
+
+# Check options switching the selective search, by Search keyword
+SELECTIVITY_OPTIONS = {"pvs": "PVS", "aspiration": "AspirationWindows", "null_move": "NullMove",
+                       "lmr": "LMR", "futility": "FutilityPruning"}
+
+def _parse_go(tokens):
+    """go arguments as a dict of ints, plus 'infinite' and 'ponder': True if given."""
+    limits = {}
+    i = 0
+    while i < len(tokens):
+        name = tokens[i]
+        if name in ("infinite", "ponder"):
+            limits[name] = True
+        elif i + 1 < len(tokens) and tokens[i + 1].lstrip("-").isdigit():
+            limits[name] = int(tokens[i + 1])
+            i += 1
+        i += 1
+    return limits
+
+class UciEngine:
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.out_lock = threading.Lock()
+        self.options = {name: default for name, (_, default) in OPTIONS.items()}
+        self.tt = TranspositionTable(self.options["Hash"])
+        self.pos = BACKENDS[self.options["MoveGenerator"]].from_fen(START_FEN)
+        # Keys of the positions before self.pos that can still repeat
+        self.history = []
+        self.stop_event = threading.Event()
+        self.ponder_event = threading.Event()
+        self.thread = None
+        self.last_pv = []
+        self.root_side = WHITE
+        self.tablebases = None
+
+    def send(self, line):
+        with self.out_lock:
+            self.out.write(line + "\n")
+            self.out.flush()
+
+    def handle(self, line):
+        """Runs one command line. Returns False when the engine should exit."""
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send("id author Chess_Game_in_Python contributors")
+            for name, (declaration, _) in OPTIONS.items():
+                self.send(f"option name {name} {declaration}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self.wait_search()
+            self.set_option(args)
+        elif command == "ucinewgame":
+            self.wait_search()
+            self.tt.clear()
+        elif command == "position":
+            self.wait_search()
+            self.set_position(args)
+        elif command == "go":
+            self.wait_search()
+            self.go(_parse_go(args))
+        elif command == "ponderhit":
+            self.ponder_event.set()
+        elif command == "bench":
+            self.wait_search()
+            self.bench(args)
+        elif command == "stop":
+            self.stop_search()
+        elif command == "quit":
+            self.stop_search()
+            return False
+        return True
+
+    def set_option(self, args):
+        if "name" not in args:
+            return
+        value_at = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_at])
+        value = " ".join(args[value_at + 1:])
+        if name not in OPTIONS:
+            self.send(f"info string unknown option {name}")
+            return
+        default = OPTIONS[name][1]
+        if isinstance(default, bool):
+            self.options[name] = value.lower() == "true"
+        elif isinstance(default, int):
+            self.options[name] = int(value)
+        elif name != "MoveGenerator" or value in BACKENDS:
+            self.options[name] = value
+        if name == "Hash":
+            self.tt = TranspositionTable(self.options["Hash"])
+        elif name == "MoveGenerator":
+            self.pos = BACKENDS[self.options[name]].from_fen(self.pos.to_fen())
+        elif name == "TablebasePath":
+            path = self.options[name]
+            self.tablebases = Tablebases(path) if path and path != "<empty>" else None
+
+    def set_position(self, args):
+        backend = BACKENDS[self.options["MoveGenerator"]]
+        moves_at = args.index("moves") if "moves" in args else len(args)
+        try:
+            if args and args[0] == "fen":
+                state = GameState.from_fen(" ".join(args[1:moves_at]), backend)
+            else:
+                state = GameState.from_fen(START_FEN, backend)
+            for text in args[moves_at + 1:]:
+                state.push(state.pos.move_from_uci(text))
+        except ValueError as e:
+            self.send(f"info string {e}")
+            return
+        self.pos = state.pos
+        self.history = state.previous_keys()
+
+    def go(self, limits):
+        time_ms = limits.get("movetime")
+        clock = limits.get("wtime" if self.pos.side == WHITE else "btime")
+        if time_ms is None and clock is not None:
+            increment = limits.get("winc" if self.pos.side == WHITE else "binc", 0)
+            time_ms = max(1, min(clock - 50, clock // MOVES_TO_GO + increment // 2))
+        search = Search(self.tt, time_ms, limits.get("nodes"), self.send_info,
+                        ordering=self.options["MoveOrdering"],
+                        quiescence=self.options["Quiescence"], stop_event=self.stop_event,
+                        tablebases=self.tablebases,
+                        ponder_hit=self.ponder_event if limits.get("ponder") else None,
+                        **{key: self.options[name] for key, name in SELECTIVITY_OPTIONS.items()})
+        depth = min(limits.get("depth", MAX_PLY), MAX_PLY)
+        self.stop_event.clear()
+        self.ponder_event.clear()
+        self.last_pv = []
+        self.root_side = self.pos.side
+        self.thread = threading.Thread(target=self._search, args=(search, self.pos.copy(), list(self.history),
+                                                                  depth, limits.get("infinite", False),
+                                                                  limits.get("ponder", False)),
+                                       daemon=True)
+        self.thread.start()
+
+    def _search(self, search, pos, history, depth, infinite, ponder):
+        _, move = search.iterate(pos, depth, history=history)
+        if infinite:
+            # UCI: in infinite mode bestmove waits for "stop".
+            self.stop_event.wait()
+        elif ponder:
+            # And when pondering for "ponderhit" or "stop" (which sets both).
+            self.ponder_event.wait()
+        if move is None:
+            self.send("bestmove 0000")
+        elif len(self.last_pv) > 1 and self.last_pv[0] == move:
+            self.send(f"bestmove {move_to_uci(move)} ponder {move_to_uci(self.last_pv[1])}")
+        else:
+            self.send(f"bestmove {move_to_uci(move)}")
+
+    def bench(self, args):
+        depth = int(args[0]) if args and args[0].isdigit() else DEFAULT_DEPTH
+        summary = run_bench(depth, self.options["MoveGenerator"], self.options["Hash"])
+        self.send(f"info string bench depth {depth} signature {summary['signature']} "
+                  f"time {int(summary['total_seconds'] * 1000)} nps {summary['nps']}")
+
+    def send_info(self, info):
+        self.last_pv = info["pv"]
+        score = info["score"] if self.root_side == WHITE else -info["score"]
+        if abs(score) > MATE_BOUND:
+            # Mate on the board or in the tablebases: TB_WIN less the plies to mate
+            plies = TB_WIN - abs(score)
+            score_text = f"mate {(plies + 1) // 2 if score > 0 else -((plies + 1) // 2)}"
+        else:
+            score_text = f"cp {int(score)}"
+        pv = " ".join(move_to_uci(move) for move in info["pv"])
+        self.send(f"info depth {info['depth']} score {score_text} nodes {info['nodes']} "
+                  f"nps {info['nps']} time {info['time_ms']} pv {pv}")
+
+    def wait_search(self):
+        """Lets a running search finish, so scripted input can be piped in one go."""
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def stop_search(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.ponder_event.set()
+            self.wait_search()
+
+def main():
+    engine = UciEngine()
+    for line in sys.stdin:
+        if not engine.handle(line):
+            break
+    engine.wait_search()
+
+if __name__ == "__main__":
+    main()
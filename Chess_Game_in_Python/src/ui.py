@@ -1,5 +1,4 @@
 import pygame
-from game import algebraic_to_index, make_move, generate_moves
 
 # Define colors
 WHITE = (245, 245, 220)
@@ -8,6 +7,37 @@ HIGHLIGHT = (186, 202, 68)
 MESSAGE_BG = (50, 50, 50)
 MESSAGE_FG = (255, 255, 255)
 
+# Fonts, rendered text and translucent overlays are created once and reused;
+# making them is far more expensive than blitting them.
+_fonts = {}
+_texts = {}
+_overlays = {}
+
+# Rendered strings kept before the text cache is emptied
+TEXT_CACHE_SIZE = 512
+
+def get_font(size):
+    if size not in _fonts:
+        _fonts[size] = pygame.font.SysFont("arial", size)
+    return _fonts[size]
+
+def render_text(text, size, color=MESSAGE_FG):
+    key = (text, size, color)
+    if key not in _texts:
+        if len(_texts) >= TEXT_CACHE_SIZE:
+            _texts.clear()
+        _texts[key] = get_font(size).render(text, True, color)
+    return _texts[key]
+
+def get_overlay(size, alpha, color=MESSAGE_BG):
+    key = (size, alpha, color)
+    if key not in _overlays:
+        surface = pygame.Surface(size)
+        surface.set_alpha(alpha)
+        surface.fill(color)
+        _overlays[key] = surface
+    return _overlays[key]
+
 def load_piece_images(square_size):
     pieces = {}
     piece_ids = ['wP', 'wN', 'wB', 'wR', 'wQ', 'wK',
@@ -21,111 +51,160 @@ def load_piece_images(square_size):
     return pieces
 
 class GameUI:
+    """
+    Board view that only redraws what changed. draw_board compares each
+    square with what is already on screen and returns the rectangles it
+    repainted, for pygame.display.update(rects).
+    """
+
     def __init__(self, screen, square_size):
         self.screen = screen
         self.square_size = square_size
         self.piece_images = load_piece_images(square_size)
         self.selected_square = None
         self.possible_moves = []
+        self.board_surface = self._render_empty_board()
+        # (piece, selected, target) currently on screen per square; None = repaint
+        self.on_screen = [[None] * 8 for _ in range(8)]
+        self.last_board = None
+        self.status_rect = None
+        self.status_text = None
 
-    def draw_board(self, board):
+    def _render_empty_board(self):
+        surface = pygame.Surface((8 * self.square_size, 8 * self.square_size))
         for row in range(8):
             for col in range(8):
                 color = WHITE if (row + col) % 2 == 0 else BLACK
-                rect = pygame.Rect(col * self.square_size, row * self.square_size,
-                                   self.square_size, self.square_size)
-                pygame.draw.rect(self.screen, color, rect)
-
-                if self.selected_square and (row, col) == self.selected_square:
-                    pygame.draw.rect(self.screen, HIGHLIGHT, rect, 4)
-
-                piece = board[row][col]
-                if piece != '.':
-                    img_key = ("w" if piece.isupper() else "b") + piece.upper()
-                    if img_key in self.piece_images:
-                        self.screen.blit(self.piece_images[img_key], rect)
-                    else:
-                        font = pygame.font.SysFont("arial", 36)
-                        text = font.render(piece, True, (0, 0, 0))
-                        self.screen.blit(text, rect)
-
-    def get_square_under_mouse(self):
-        pos = pygame.mouse.get_pos()
-        col = pos[0] // self.square_size
-        row = pos[1] // self.square_size
-        return (row, col)
-
-    def get_player_move(self, board):
-        move = None
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                row, col = self.get_square_under_mouse()
-                if self.selected_square is None:
-                    piece = board[row][col]
-                    if piece != '.' and piece.isupper():
-                        self.selected_square = (row, col)
-                        self.possible_moves = [
-                            move for move in generate_moves(board, "white")
-                            if move[0] == self.selected_square
-                        ]
-                else:
-                    dest_square = (row, col)
-                    for m in self.possible_moves:
-                        if m[1] == dest_square:
-                            move = m
-                            break
-                    self.selected_square = None
-                    self.possible_moves = []
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    from game import user_move_text
-                    move = user_move_text()
+                pygame.draw.rect(surface, color, self._square_rect(row, col))
+        return surface
+
+    def _square_rect(self, row, col):
+        return pygame.Rect(col * self.square_size, row * self.square_size,
+                           self.square_size, self.square_size)
+
+    def invalidate(self, rect=None):
+        """Forces the squares under rect (default: all) to be repainted next time."""
+        for row in range(8):
+            for col in range(8):
+                if rect is None or rect.colliderect(self._square_rect(row, col)):
+                    self.on_screen[row][col] = None
+        if rect is None or (self.status_rect is not None and rect.colliderect(self.status_rect)):
+            self.status_text = None
+
+    def draw_board(self, board):
+        """Repaints the squares that changed since the last call and returns their rects."""
+        self.last_board = board
+        targets = {move[1] for move in self.possible_moves}
+        dirty = []
+        for row in range(8):
+            for col in range(8):
+                state = (board[row][col], (row, col) == self.selected_square, (row, col) in targets)
+                if self.on_screen[row][col] != state:
+                    self.on_screen[row][col] = state
+                    dirty.append(self._draw_square(row, col, *state))
+        if self.status_rect is not None and self.status_rect.collidelist(dirty) != -1:
+            # The status bar sits on top of these squares and must follow them.
+            self.status_text = None
+        return dirty
+
+    def _draw_square(self, row, col, piece, selected, target):
+        rect = self._square_rect(row, col)
+        self.screen.blit(self.board_surface, rect, rect)
+        if selected:
+            pygame.draw.rect(self.screen, HIGHLIGHT, rect, 4)
+        if target:
+            pygame.draw.circle(self.screen, HIGHLIGHT, rect.center, self.square_size // 6)
+        if piece != '.':
+            img_key = ("w" if piece.isupper() else "b") + piece.upper()
+            if img_key in self.piece_images:
+                self.screen.blit(self.piece_images[img_key], rect)
+            else:
+                self.screen.blit(render_text(piece, 36, (0, 0, 0)), rect)
+        return rect
+
+    def square_at(self, pixel):
+        """(row, col) of the square under a pixel position, or None off the board."""
+        row, col = pixel[1] // self.square_size, pixel[0] // self.square_size
+        return (row, col) if 0 <= row < 8 and 0 <= col < 8 else None
+
+    def click(self, square, board, legal_moves):
+        """
+        Handles a click on square for the human (white) player. legal_moves
+        are the ((row, col), (row, col)) moves of the position. Returns the
+        move once a piece and a destination have been picked, else None.
+        """
+        if self.selected_square is None:
+            if square is not None and board[square[0]][square[1]].isupper():
+                self.selected_square = square
+                self.possible_moves = [m for m in legal_moves if m[0] == square]
+            return None
+        move = next((m for m in self.possible_moves if m[1] == square), None)
+        self.selected_square = None
+        self.possible_moves = []
         return move
 
+    def draw_search_status(self, status, font_size=20):
+        """
+        Draws the thinking bar along the bottom if its text changed or the
+        board under it was repainted. Returns the rects to update.
+        """
+        if status == self.status_text:
+            return []
+        height = font_size + 10
+        width = self.screen.get_width()
+        y = self.screen.get_height() - height
+        self.status_rect = pygame.Rect(0, y, width, height)
+        # Repaint the squares underneath first so the translucent bar does
+        # not darken with every redraw.
+        if self.last_board is not None:
+            self.invalidate(self.status_rect)
+            self.draw_board(self.last_board)
+        self.status_text = status
+        self.screen.blit(get_overlay((width, height), 180), (0, y))
+        self.screen.blit(render_text(status, font_size), (10, y + 5))
+        return [self.status_rect]
+
+    def clear_search_status(self):
+        """Removes the thinking bar; the board under it is repainted on the next draw."""
+        if self.status_rect is not None:
+            rect = self.status_rect
+            self.status_rect = None
+            self.invalidate(rect)
+        self.status_text = None
+
     def show_message(self, message, delay_sec=1):
-        font = pygame.font.SysFont("arial", 32)
-        text = font.render(message, True, MESSAGE_FG)
+        text = render_text(message, 32)
         text_rect = text.get_rect(center=(self.screen.get_width() // 2,
                                           self.screen.get_height() // 2))
-        s = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
-        s.set_alpha(180)
-        s.fill(MESSAGE_BG)
-        self.screen.blit(s, (0, 0))
+        self.screen.blit(get_overlay(self.screen.get_size(), 180), (0, 0))
         self.screen.blit(text, text_rect)
         pygame.display.flip()
         pygame.time.wait(delay_sec * 1000)
+        self.invalidate()
 
     def show_end_message(self, message):
-        font = pygame.font.SysFont("arial", 40)
-        text = font.render(message, True, MESSAGE_FG)
+        text = render_text(message, 40)
         text_rect = text.get_rect(center=(self.screen.get_width() // 2,
                                           self.screen.get_height() // 2))
-        s = pygame.Surface((self.screen.get_width(), self.screen.get_height()))
-        s.set_alpha(200)
-        s.fill(MESSAGE_BG)
-        self.screen.blit(s, (0, 0))
+        self.screen.blit(get_overlay(self.screen.get_size(), 200), (0, 0))
         self.screen.blit(text, text_rect)
         pygame.display.flip()
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type in (pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
-                    waiting = False
+        self.invalidate()
+        # Sleep until the player dismisses the message.
+        while pygame.event.wait().type not in (pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            pass
 
     def draw_move_history(self, move_history, font_size=20):
-        font = pygame.font.SysFont("arial", font_size)
         x_offset = self.screen.get_width() - 150
         y_offset = 10
         background_rect = pygame.Rect(x_offset - 5, y_offset - 5,
                                       140, self.screen.get_height() - 20)
         pygame.draw.rect(self.screen, (50, 50, 50), background_rect)
         for move in move_history:
-            text = font.render(move, True, (255, 255, 255))
-            self.screen.blit(text, (x_offset, y_offset))
+            self.screen.blit(render_text(move, font_size), (x_offset, y_offset))
             y_offset += font_size + 5
+        self.invalidate(background_rect)
+        return background_rect
 
 def show_instructions(screen, width, height):
     instructions = [
@@ -139,23 +218,21 @@ def show_instructions(screen, width, height):
         "",
         "Press any key to start the game."
     ]
-    font = pygame.font.SysFont("arial", 28)
     screen.fill((30, 30, 30))
 
     y_offset = height // 4
     for line in instructions:
-        text = font.render(line, True, (255, 255, 255))
+        text = render_text(line, 28)
         text_rect = text.get_rect(center=(width // 2, y_offset))
         screen.blit(text, text_rect)
         y_offset += 40
 
     pygame.display.flip()
 
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
-                waiting = False
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
+    while True:
+        event = pygame.event.wait()
+        if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            break
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            exit()